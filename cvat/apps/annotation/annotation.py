@@ -402,7 +402,7 @@ class Annotation:
         for idx, track in enumerate(self._annotation_ir.tracks):
             tracked_shapes = TrackManager.get_interpolated_shapes(track, 0, self._db_task.data.size)
             for tracked_shape in tracked_shapes:
-                tracked_shape["attributes"] += track["attributes"]
+                tracked_shape["attributes"] = tracked_shape["attributes"] + track["attributes"]
                 tracked_shape["track_id"] = idx
                 tracked_shape["group"] = track["group"]
                 tracked_shape["label_id"] = track["label_id"]
@@ -3,20 +3,18 @@
 #
 # SPDX-License-Identifier: MIT
 
-import cv2
-import numpy as np
-
 class ImageLoader():
-    def __init__(self, frame_provider):
+    def __init__(self, frame_provider, start_frame=0):
         self._frame_provider = frame_provider
+        self._start_frame = start_frame
 
     def __iter__(self):
-        for frame, _ in self._frame_provider.get_frames(self._frame_provider.Quality.ORIGINAL):
-            yield self._load_image(frame)
+        # frames are decoded in a background thread
+        frames = self._frame_provider.get_frame_range(self._start_frame,
+            len(self._frame_provider) - 1, self._frame_provider.Quality.ORIGINAL,
+            prefetch=True)
+        for _, image in frames:
+            yield image
 
     def __len__(self):
         return len(self._frame_provider)
-
-    @staticmethod
-    def _load_image(image):
-        return cv2.imdecode(np.fromstring(image.read(), np.uint8), cv2.IMREAD_COLOR)
@@ -97,11 +97,16 @@ class Results():
 
 class InferenceAnnotationRunner:
     def __init__(self, data, model_file, weights_file, labels_mapping,
-    attribute_spec, convertation_file):
+    attribute_spec, convertation_file, num_requests=2, batch_size=1, preprocess_workers=2,
+    start_frame=0):
+        # data yields frames starting from start_frame, its length is
+        # the number of all frames
         self.data = iter(data)
         self.data_len = len(data)
-        self.model = ModelLoader(model=model_file, weights=weights_file)
-        self.frame_counter = 0
+        self.model = ModelLoader(model=model_file, weights=weights_file,
+            num_requests=num_requests, batch_size=batch_size,
+            preprocess_workers=preprocess_workers)
+        self.frame_counter = start_frame
         self.attribute_spec = attribute_spec
         self.convertation_file = convertation_file
         self.iteration_size = 128
@@ -117,19 +122,13 @@ class InferenceAnnotationRunner:
         }
 
         detections = []
-        for _ in range(self.iteration_size):
-            try:
-                frame = next(self.data)
-            except StopIteration:
-                break
-
-            orig_rows, orig_cols = frame.shape[:2]
-
+        frames = itertools.islice(self.data, self.iteration_size)
+        for (orig_rows, orig_cols), frame_detections in self.model.infer_images(frames):
             detections.append({
                 "frame_id": self.frame_counter,
                 "frame_height": orig_rows,
                 "frame_width": orig_cols,
-                "detections": self.model.infer(frame),
+                "detections": frame_detections,
             })
 
             self.frame_counter += 1
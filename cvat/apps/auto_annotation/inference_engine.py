@@ -7,8 +7,16 @@ from openvino.inference_engine import IENetwork, IEPlugin, IECore, get_version
 import subprocess
 import os
 import platform
+import threading
+import time
+
+from cvat.apps.engine.frame_provider import ChunkCache
+from cvat.apps.engine.log import slogger
 
 _IE_PLUGINS_PATH = os.getenv("IE_PLUGINS_PATH", None)
+# Memory budget of compiled networks which are kept by a process,
+# a network is accounted by the size of its weights
+_NETWORK_CACHE_SIZE = int(os.getenv("CVAT_OPENVINO_NETWORK_CACHE_SIZE", 1024 * 1024 * 1024))
 
 def _check_instruction(instruction):
     return instruction == str.strip(
@@ -50,3 +58,100 @@ def make_plugin_or_core():
 
 def make_network(model, weights):
     return IENetwork(model = model, weights = weights)
+
+
+class CompiledNetwork:
+    """
+    A network loaded to the CPU plugin. It is shared by all users in the
+    process, so its infer requests must not be used concurrently.
+    """
+
+    def __init__(self, exec_network, inputs, outputs, batch_size, load_time, size):
+        self.exec_network = exec_network
+        self.inputs = inputs # name: shape
+        self.outputs = outputs # name: shape
+        self.batch_size = batch_size
+        self.load_time = load_time
+        self.size = size
+
+def _get_shape(data):
+    return data if isinstance(data, list) else data.shape
+
+def _set_batch_size(network, batch_size):
+    # A batch can be used only if all outputs are split by images along
+    # the first axis, e.g. it isn't so for DetectionOutput layers
+    if batch_size <= 1:
+        return 1
+    try:
+        network.batch_size = batch_size
+        if all(_get_shape(output)[0] == batch_size for output in network.outputs.values()):
+            return batch_size
+    except Exception:
+        pass
+    network.batch_size = 1
+    return 1
+
+_plugin_or_core = None
+_network_cache = None
+_network_cache_lock = threading.Lock()
+_network_load_stats = { 'loads': 0, 'load_time': 0.0 }
+
+def _get_network_cache():
+    global _network_cache
+    with _network_cache_lock:
+        if _network_cache is None:
+            _network_cache = ChunkCache(_NETWORK_CACHE_SIZE)
+    return _network_cache
+
+def _compile_network(model, weights, num_requests, batch_size):
+    global _plugin_or_core
+    start_time = time.time()
+    with _network_cache_lock:
+        if _plugin_or_core is None:
+            _plugin_or_core = make_plugin_or_core()
+    core_or_plugin = _plugin_or_core
+    network = make_network(model, weights)
+
+    if getattr(core_or_plugin, 'get_supported_layers', False):
+        supported_layers = core_or_plugin.get_supported_layers(network)
+        not_supported_layers = [l for l in network.layers.keys() if l not in supported_layers]
+        if len(not_supported_layers) != 0:
+            raise Exception("Following layers are not supported by the plugin for specified device {}:\n {}".
+                      format(core_or_plugin.device, ", ".join(not_supported_layers)))
+
+    batch_size = _set_batch_size(network, batch_size)
+    if getattr(core_or_plugin, 'load_network', False):
+        exec_network = core_or_plugin.load_network(network, "CPU", num_requests=num_requests)
+    else:
+        exec_network = core_or_plugin.load(network=network, num_requests=num_requests)
+
+    load_time = time.time() - start_time
+    with _network_cache_lock:
+        _network_load_stats['loads'] += 1
+        _network_load_stats['load_time'] += load_time
+    slogger.glob.info("OpenVINO network {} has been loaded in {:.2f} s".format(model, load_time))
+    return CompiledNetwork(
+        exec_network=exec_network,
+        inputs={name: _get_shape(data) for name, data in network.inputs.items()},
+        outputs={name: _get_shape(data) for name, data in network.outputs.items()},
+        batch_size=batch_size,
+        load_time=load_time,
+        size=os.path.getsize(weights),
+    )
+
+def load_network(model, weights, num_requests=1, batch_size=1):
+    """
+    Returns a CompiledNetwork from the process-wide LRU cache. Networks are
+    compiled again if their files have been changed. The batch size is used
+    only if all outputs of the network are batched.
+    """
+
+    key = (model, os.stat(model).st_mtime_ns, weights, num_requests, batch_size)
+    return _get_network_cache().get(key, weights,
+        lambda path: _compile_network(model, path, num_requests, batch_size))
+
+def get_network_cache_stats():
+    stats = _get_network_cache().get_stats()
+    with _network_cache_lock:
+        stats.update(_network_load_stats)
+    return stats
@@ -5,25 +5,34 @@
 
 import json
 import cv2
+import itertools
 import os
 import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-from cvat.apps.auto_annotation.inference_engine import make_plugin_or_core, make_network
+from cvat.apps.auto_annotation.inference_engine import load_network
+
+def _map_ordered(executor, func, iterable, window):
+    # Unlike executor.map(), items are submitted lazily,
+    # no more than window items are processed at once
+    pending = deque()
+    for item in iterable:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
 
 class ModelLoader():
-    def __init__(self, model, weights):
+    def __init__(self, model, weights, num_requests=2, batch_size=1, preprocess_workers=2):
         self._model = model
         self._weights = weights
+        self._preprocess_workers = max(1, preprocess_workers)
 
-        core_or_plugin = make_plugin_or_core()
-        network = make_network(self._model, self._weights)
-
-        if getattr(core_or_plugin, 'get_supported_layers', False):
-            supported_layers = core_or_plugin.get_supported_layers(network)
-            not_supported_layers = [l for l in network.layers.keys() if l not in supported_layers]
-            if len(not_supported_layers) != 0:
-                raise Exception("Following layers are not supported by the plugin for specified device {}:\n {}".
-                          format(core_or_plugin.device, ", ".join(not_supported_layers)))
+        # compiled networks are shared by all loaders of the same model
+        network = load_network(self._model, self._weights,
+            num_requests=num_requests, batch_size=batch_size)
 
         iter_inputs = iter(network.inputs)
         self._input_blob_name = next(iter_inputs)
@@ -42,33 +51,84 @@ class ModelLoader():
         if self._input_blob_name in info_names:
             self._input_blob_name = next(iter_inputs)
 
-        if getattr(core_or_plugin, 'load_network', False):
-            self._net = core_or_plugin.load_network(network,
-                                                    "CPU",
-                                                    num_requests=2)
-        else:
-            self._net = core_or_plugin.load(network=network, num_requests=2)
-        input_type = network.inputs[self._input_blob_name]
-        self._input_layout = input_type if isinstance(input_type, list) else input_type.shape
+        self._batch_size = network.batch_size
+        self._net = network.exec_network
+        self._input_layout = network.inputs[self._input_blob_name]
 
-    def infer(self, image):
+    def _prepare_image(self, image):
         _, _, h, w = self._input_layout
         in_frame = image if image.shape[:-1] == (h, w) else cv2.resize(image, (w, h))
         in_frame = in_frame.transpose((2, 0, 1))  # Change data layout from HWC to CHW
-        inputs = {self._input_blob_name: in_frame}
+        return image.shape[:2], in_frame
+
+    def _make_inputs(self, in_frames):
+        _, _, h, w = self._input_layout
+        inputs = {self._input_blob_name: np.stack(in_frames)}
         if self._require_image_info:
-            info = np.zeros([1, 3])
-            info[0, 0] = h
-            info[0, 1] = w
+            info = np.zeros([len(in_frames), 3])
+            info[:, 0] = h
+            info[:, 1] = w
             # frame number
-            info[0, 2] = 1
+            info[:, 2] = 1
             inputs[self._input_info_name] = info
+        return inputs
 
-        results = self._net.infer(inputs)
+    def _split_results(self, results, count):
         if len(results) == 1:
-            return results[self._output_blob_name].copy()
+            output = results[self._output_blob_name]
+            return [output[idx : idx + 1].copy() for idx in range(count)]
         else:
-            return results.copy()
+            return [{name: output[idx : idx + 1].copy() for name, output in results.items()}
+                for idx in range(count)]
+
+    def infer(self, image):
+        _, in_frame = self._prepare_image(image)
+        inputs = self._make_inputs([in_frame] * self._batch_size)
+
+        results = self._net.infer(inputs)
+        return self._split_results(results, 1)[0]
+
+    def infer_images(self, images):
+        """
+        Yields ((height, width), results) for each of images in their order.
+        Images are resized in a thread pool, batches of them are inferred by
+        several asynchronous requests at once.
+        """
+
+        free_requests = list(self._net.requests)
+        pending = deque()
+
+        def wait(request, sizes):
+            request.wait(-1)
+            results = self._split_results(request.outputs, len(sizes))
+            free_requests.append(request)
+            return zip(sizes, results)
+
+        with ThreadPoolExecutor(max_workers=self._preprocess_workers) as executor:
+            prepared = _map_ordered(executor, self._prepare_image, images,
+                window=self._batch_size * (len(free_requests) + 1))
+            try:
+                while True:
+                    batch = list(itertools.islice(prepared, self._batch_size))
+                    if not batch:
+                        break
+                    if not free_requests:
+                        yield from wait(*pending.popleft())
+
+                    sizes, in_frames = zip(*batch)
+                    in_frames = list(in_frames)
+                    # the last batch is padded to the size of the network input
+                    in_frames += in_frames[-1:] * (self._batch_size - len(in_frames))
+                    request = free_requests.pop()
+                    request.async_infer(self._make_inputs(in_frames))
+                    pending.append((request, sizes))
+
+                while pending:
+                    yield from wait(*pending.popleft())
+            finally:
+                # a request can't be reused or released before it is completed
+                for request, _ in pending:
+                    request.wait(-1)
 
 
 def load_labelmap(labels_path):
@@ -3,6 +3,7 @@
 # SPDX-License-Identifier: MIT
 
 import django_rq
+import json
 import numpy as np
 import os
 import rq
@@ -17,7 +18,7 @@ from cvat.apps.engine.log import slogger
 from cvat.apps.engine.models import Task as TaskModel
 from cvat.apps.authentication.auth import has_admin_role
 from cvat.apps.engine.serializers import LabeledDataSerializer
-from cvat.apps.engine.annotation import put_task_data, patch_task_data
+from cvat.apps.engine.annotation import delete_task_data, patch_task_data
 from cvat.apps.engine.frame_provider import FrameProvider
 
 from .models import AnnotationModel, FrameworkChoice
@@ -223,7 +224,37 @@ def delete(dl_model_id):
     else:
         raise Exception("Requested DL model {} doesn't exist".format(dl_model_id))
 
-def run_inference_thread(tid, model_file, weights_file, labels_mapping, attributes, convertation_file, reset, user, restricted=True):
+def _get_checkpoint_path(db_task):
+    return os.path.join(db_task.get_task_dirname(), "auto_annotation.checkpoint.json")
+
+def _load_checkpoint(db_task, model_file):
+    # Returns the first frame which hasn't been annotated by the model yet
+    try:
+        with open(_get_checkpoint_path(db_task)) as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+    except (OSError, ValueError):
+        return None
+
+    if checkpoint.get("model") != model_file or \
+            not 0 < checkpoint.get("frame", 0) < db_task.data.size:
+        return None
+    return checkpoint["frame"]
+
+def _save_checkpoint(db_task, model_file, frame):
+    checkpoint_path = _get_checkpoint_path(db_task)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(checkpoint_path))
+    with os.fdopen(fd, "w") as checkpoint_file:
+        json.dump({"model": model_file, "frame": frame}, checkpoint_file)
+    os.replace(tmp_path, checkpoint_path)
+
+def _remove_checkpoint(db_task):
+    try:
+        os.remove(_get_checkpoint_path(db_task))
+    except FileNotFoundError:
+        pass
+
+def run_inference_thread(tid, model_file, weights_file, labels_mapping, attributes, convertation_file, reset, user, restricted=True,
+        resume=False):
     def update_progress(job, progress):
         job.refresh()
         if "cancel" in job.meta:
@@ -238,18 +269,34 @@ def run_inference_thread(tid, model_file, weights_file, labels_mapping, attribut
         job = rq.get_current_job()
         job.meta["progress"] = 0
         job.save_meta()
-        db_task = TaskModel.objects.get(pk=tid)
+        db_task = TaskModel.objects.select_related("data").get(pk=tid)
+
+        # A cancelled or failed run can be continued from the last saved window,
+        # annotations of the previous windows are kept
+        start_frame = _load_checkpoint(db_task, model_file) if resume else None
+        if start_frame is not None:
+            slogger.glob.info("auto annotation for task {} is resumed from frame {}".format(tid, start_frame))
+            reset = False
+        else:
+            start_frame = 0
+            _remove_checkpoint(db_task)
+        if reset:
+            delete_task_data(tid, user)
 
         result = None
         slogger.glob.info("auto annotation with openvino toolkit for task {}".format(tid))
         more_data = True
         runner = InferenceAnnotationRunner(
-            data=ImageLoader(FrameProvider(db_task.data)),
+            data=ImageLoader(FrameProvider(db_task.data), start_frame),
             model_file=model_file,
             weights_file=weights_file,
             labels_mapping=labels_mapping,
             attribute_spec=attributes,
-            convertation_file= convertation_file)
+            convertation_file= convertation_file,
+            num_requests=settings.AUTO_ANNOTATION_INFER_REQUESTS,
+            batch_size=settings.AUTO_ANNOTATION_BATCH_SIZE,
+            preprocess_workers=settings.AUTO_ANNOTATION_PREPROCESS_WORKERS,
+            start_frame=start_frame)
         while more_data:
             result, more_data = runner.run(
                 job=job,
@@ -260,14 +307,17 @@ def run_inference_thread(tid, model_file, weights_file, labels_mapping, attribut
                 slogger.glob.info("auto annotation for task {} canceled by user".format(tid))
                 return
 
+            # Only jobs with frames of the window are changed
             serializer = LabeledDataSerializer(data = result)
             if serializer.is_valid(raise_exception=True):
-                if reset:
-                    put_task_data(tid, user, result)
-                else:
-                    patch_task_data(tid, user, result, "create")
+                patch_task_data(tid, user, result, "create")
+
+            _save_checkpoint(db_task, model_file, runner.frame_counter)
+            job.meta["checkpoint"] = runner.frame_counter
+            job.save_meta()
 
-            slogger.glob.info("auto annotation for task {} done".format(tid))
+        _remove_checkpoint(db_task)
+        slogger.glob.info("auto annotation for task {} done".format(tid))
     except Exception as e:
         try:
             slogger.task[tid].exception("exception was occurred during auto annotation of the task", exc_info=True)
@@ -25,7 +25,7 @@ from .models import AnnotationModel
     fn=objectgetter(TaskModel, "tid"), raise_exception=True)
 def cancel(request, tid):
     try:
-        queue = django_rq.get_queue("low")
+        queue = django_rq.get_queue("inference")
         job = queue.fetch_job("auto_annotation.run.{}".format(tid))
         if job is None or job.is_finished or job.is_failed:
             raise Exception("Task is not being annotated currently")
@@ -194,7 +194,7 @@ def get_meta_info(request):
                 "framework":dl_model.framework,
             })
 
-        queue = django_rq.get_queue("low")
+        queue = django_rq.get_queue("inference")
         for tid in tids:
             rq_id = "auto_annotation.run.{}".format(tid)
             job = queue.fetch_job(rq_id)
@@ -217,7 +217,7 @@ def start_annotation(request, mid, tid):
     slogger.glob.info("auto annotation create request for task {} via DL model {}".format(tid, mid))
     try:
         db_task = TaskModel.objects.get(pk=tid)
-        queue = django_rq.get_queue("low")
+        queue = django_rq.get_queue("inference")
         job = queue.fetch_job("auto_annotation.run.{}".format(tid))
         if job is not None and (job.is_started or job.is_queued):
             raise Exception("The process is already running")
@@ -225,6 +225,8 @@ def start_annotation(request, mid, tid):
         data = json.loads(request.body.decode('utf-8'))
 
         should_reset = data["reset"]
+        # continue a cancelled or failed run of the same model
+        should_resume = data.get("resume", False)
         user_defined_labels_mapping = data["labels"]
 
         dl_model = AnnotationModel.objects.get(pk=mid)
@@ -262,6 +264,7 @@ def start_annotation(request, mid, tid):
                 should_reset,
                 request.user,
                 restricted,
+                should_resume,
             ),
             job_id = rq_id,
             timeout=604800)     # 7 days
@@ -280,7 +283,7 @@ def start_annotation(request, mid, tid):
 @login_required
 def check(request, rq_id):
     try:
-        target_queue = "low" if "auto_annotation.run" in rq_id else "default"
+        target_queue = "inference" if "auto_annotation.run" in rq_id else "default"
         queue = django_rq.get_queue(target_queue)
         job = queue.fetch_job(rq_id)
         if job is not None and "cancel" in job.meta:
@@ -15,7 +15,6 @@ from cvat.apps.engine.frame_provider import FrameProvider
 
 from cvat.apps.engine.annotation import put_task_data, patch_task_data
 from tensorflow.python.client import device_lib
-from cvat.settings.base import DATA_ROOT
 
 from tensorflow.python.client import device_lib
 import django_rq
@@ -23,10 +22,12 @@ import fnmatch
 import json
 import os
 import rq
-from PIL import Image
 
 import numpy as np
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 from cvat.apps.engine.log import slogger
 import sys
 sys.path.append(os.environ.get('AUTO_SEGMENTATION_PATH'))
@@ -34,6 +35,13 @@ from mrcnn.config import Config
 import skimage.io
 from skimage.measure import find_contours, approximate_polygon
 
+# Number of images which are processed by the model at once on each GPU
+BATCH_SIZE = int(os.environ.get('AUTO_SEGMENTATION_BATCH_SIZE', 1))
+# Number of threads which convert masks to polygons
+POSTPROCESSING_WORKERS = 4
+# Number of frames after which found polygons are saved to the task
+COMMIT_WINDOW = 128
+
 class CocoConfig(Config):
 	"""Configuration for training on MS COCO.
 	Derives from the base Config class and overrides values specific
@@ -49,21 +57,34 @@ def load_image_into_numpy(image):
 	return np.array(image.getdata()).reshape((im_height, im_width, 3)).astype(np.uint8)
 
 
-def run_tensorflow_auto_segmentation(image_list, labels_mapping, treshold, model_path, num_c):
-	def _convert_to_int(boolean_mask):
-		return boolean_mask.astype(np.uint8)
-
-	def _convert_to_segmentation(mask):
-		contours = find_contours(mask, 0.5)
-		if not contours:
-			return []
-		# only one contour exist in our case
-		contour = contours[0]
-		contour = np.flip(contour, axis=1)
-		# Approximate the contour and reduce the number of points
-		contour = approximate_polygon(contour, tolerance=2.5)
-		segmentation = contour.ravel().tolist()
-		return segmentation
+def _convert_to_segmentation(mask):
+	contours = find_contours(mask.astype(np.uint8), 0.5)
+	if not contours:
+		return []
+	# only one contour exist in our case
+	contour = contours[0]
+	contour = np.flip(contour, axis=1)
+	# Approximate the contour and reduce the number of points
+	contour = approximate_polygon(contour, tolerance=2.5)
+	segmentation = contour.ravel().tolist()
+	return segmentation
+
+def _make_batches(frames, batch_size):
+	batch = []
+	for frame in frames:
+		batch.append(frame)
+		if len(batch) == batch_size:
+			yield batch
+			batch = []
+	if batch:
+		yield batch
+
+def run_tensorflow_auto_segmentation(frames, frame_count, labels_mapping, treshold, model_path, num_c, commit):
+	"""
+	Detects objects on (frame number, BGR image) pairs from frames. Found
+	polygons are passed to commit() every COMMIT_WINDOW frames and at the end.
+	Returns False if the run has been canceled.
+	"""
 
 	## INITIALIZATION
 
@@ -95,10 +116,9 @@ def run_tensorflow_auto_segmentation(image_list, labels_mapping, treshold, model
 	#num_gpus = len([x.name for x in local_device_protos if x.device_type == 'GPU'])
 
 	class InferenceConfig(CocoConfig):
-		# Set batch size to 1 since we'll be running inference on
-		# one image at a time. Batch size = GPU_COUNT * IMAGES_PER_GPU
+		# Batch size = GPU_COUNT * IMAGES_PER_GPU
 		GPU_COUNT = 1
-		IMAGES_PER_GPU = 1
+		IMAGES_PER_GPU = BATCH_SIZE
 		NUM_CLASSES = num_c
 		local_device_protos = device_lib.list_local_devices()
 		num_gpus = len([x.name for x in local_device_protos if x.device_type == 'GPU'])
@@ -118,50 +138,58 @@ def run_tensorflow_auto_segmentation(image_list, labels_mapping, treshold, model
 
 	## RUN OBJECT DETECTION
 	result = {}
-	image_num = 0
-	slogger.glob.info("imagelist {}".format(image_list))
-	for images in zip(*[iter(image_list)]*config.GPU_COUNT):
-		job.refresh()
-		if 'cancel' in job.meta:
-			del job.meta['cancel']
-			job.save()
-			return None
-		job.meta['progress'] = image_num * 100 / len(image_list)
-		job.save_meta()
-		images_org = []
-		slogger.glob.info("images {}".format(images))
-
-
-		for i in range(config.GPU_COUNT):
-			images_org.append(np.array(Image.open(images[i][0])))
-
-		# for multiple image detection, "batch size" must be equal to number of images
-		res = model.detect(images_org)
-
-		# r = r[0]
-		# "r['rois'][index]" gives bounding box around the object
-		# temp_img_num = image_num
-		slogger.glob.info("res {}".format(res))
-
-		for r in res:
-			for index, c_id in enumerate(r['class_ids']):
-				if c_id in labels_mapping.keys():
-					if r['scores'][index] >= treshold:
-						mask = _convert_to_int(r['masks'][:,:,index])
-						segmentation = _convert_to_segmentation(mask)
-						if len(segmentation) < 5:
-							continue
-						label = labels_mapping[c_id]
-						if label not in result:
-							result[label] = []
-						result[label].append(
-							[image_num, segmentation])
-			image_num += 1
-		slogger.glob.info("result {}".format(result))
-		slogger.glob.info("l;abel mapping {}".format(labels_mapping))
-
-
-	return result
+	pending = deque()
+	uncommitted_frames = 0
+
+	def collect(segmentations):
+		for frame, label, segmentation in segmentations:
+			segmentation = segmentation.result()
+			if len(segmentation) < 5:
+				continue
+			result.setdefault(label, []).append([frame, segmentation])
+
+	with ThreadPoolExecutor(max_workers=POSTPROCESSING_WORKERS) as executor:
+		for batch in _make_batches(frames, config.BATCH_SIZE):
+			job.refresh()
+			if 'cancel' in job.meta:
+				del job.meta['cancel']
+				job.save()
+				return False
+			job.meta['progress'] = batch[0][0] * 100 / frame_count
+			job.save_meta()
+
+			# Mask R-CNN expects RGB images, the batch must be full
+			images = [image[:, :, ::-1] for _, image in batch]
+			images += images[-1:] * (config.BATCH_SIZE - len(images))
+			res = model.detect(images)
+
+			# "r['rois'][index]" gives bounding box around the object
+			segmentations = []
+			for (frame, _), r in zip(batch, res):
+				for index, c_id in enumerate(r['class_ids']):
+					if c_id in labels_mapping.keys():
+						if r['scores'][index] >= treshold:
+							segmentations.append((frame, labels_mapping[c_id],
+								executor.submit(_convert_to_segmentation, r['masks'][:,:,index])))
+			pending.append(segmentations)
+
+			# masks of a batch are converted while the next batch is processed
+			while len(pending) > 1:
+				collect(pending.popleft())
+
+			uncommitted_frames += len(batch)
+			if uncommitted_frames >= COMMIT_WINDOW:
+				while pending:
+					collect(pending.popleft())
+				commit(result)
+				result.clear()
+				uncommitted_frames = 0
+
+		while pending:
+			collect(pending.popleft())
+	commit(result)
+
+	return True
 
 
 def make_image_list(path_to_data):
@@ -211,31 +239,34 @@ def create_thread(tid, labels_mapping, user, model_path, num_c, reset):
 		job.save_meta()
 		# Get job indexes and segment length
 		db_task = TaskModel.objects.get(pk=tid)
-		# Get image list
-		# image_list = make_image_list(db_task.get_data_dirname())
-		image_list = FrameProvider(db_task.data)
-		image_list = list(image_list.get_frames(image_list.Quality.ORIGINAL))
-		slogger.glob.info("getting data from DATA_ROOT: {}".format(DATA_ROOT))
-		path_to_task_data = os.path.join(DATA_ROOT,"data",str(tid),'raw')
-		# image_list = make_image_list(path_to_task_data)
+		# Frames are decoded in a background thread while the model runs
+		frame_provider = FrameProvider(db_task.data)
+		frames = frame_provider.get_frame_range(0, len(frame_provider) - 1,
+			frame_provider.Quality.ORIGINAL, prefetch=True)
+
+		def commit(result):
+			nonlocal reset
+			if not result and not reset:
+				return
+			# Modify data format and save
+			result = convert_to_cvat_format(result)
+			serializer = LabeledDataSerializer(data = result)
+			if serializer.is_valid(raise_exception=True):
+				if reset:
+					put_task_data(tid, user, result)
+					reset = False
+				else:
+					patch_task_data(tid, user, result, "create")
+
 		# Run auto segmentation by tf
-		result = None
 		slogger.glob.info("auto segmentation with tensorflow framework for task {}".format(tid))
-		result = run_tensorflow_auto_segmentation(image_list, labels_mapping, TRESHOLD, model_path, num_c)
+		finished = run_tensorflow_auto_segmentation(frames, len(frame_provider),
+			labels_mapping, TRESHOLD, model_path, num_c, commit)
 
-		if result is None:
+		if not finished:
 			slogger.glob.info('auto segmentation for task {} canceled by user'.format(tid))
 			return
 
-		# Modify data format and save
-		result = convert_to_cvat_format(result)
-		serializer = LabeledDataSerializer(data = result)
-		slogger.glob.info("serializer valid segmentation {}".format(serializer.is_valid(raise_exception=True)))
-		if serializer.is_valid(raise_exception=True):
-			if reset:
-				put_task_data(tid, user, result)
-			else:
-				patch_task_data(tid, user, result, "create")
 		slogger.glob.info('auto segmentation for task {} done'.format(tid))
 	except Exception as ex:
 		try:
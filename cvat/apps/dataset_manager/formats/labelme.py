@@ -27,8 +27,9 @@ from datumaro.components.converter import Converter
 from datumaro.components.project import ProjectDataset
 
 class CvatLabelMeConverter(Converter):
-    def __init__(self, save_images=False):
+    def __init__(self, save_images=False, jobs=1):
         self._save_images = save_images
+        self._jobs = jobs
 
     def __call__(self, extractor, save_dir):
         from datumaro.components.project import Environment, Dataset
@@ -41,7 +42,8 @@ class CvatLabelMeConverter(Converter):
             orig_sources = extractor
         extractor = extractor.transform(id_from_image)
         extractor = Dataset.from_extractors(orig_sources, extractor) # apply lazy transforms
-        converter = env.make_converter('label_me', save_images=self._save_images)
+        converter = env.make_converter('label_me', save_images=self._save_images,
+            jobs=self._jobs)
         converter(extractor, save_dir=save_dir)
 
 def dump(file_object, annotations):
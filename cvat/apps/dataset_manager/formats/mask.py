@@ -24,8 +24,9 @@ format_spec = {
 
 from datumaro.components.converter import Converter
 class CvatMaskConverter(Converter):
-    def __init__(self, save_images=False):
+    def __init__(self, save_images=False, jobs=1):
         self._save_images = save_images
+        self._jobs = jobs
 
     def __call__(self, extractor, save_dir):
         from datumaro.components.project import Environment, Dataset
@@ -44,7 +45,7 @@ class CvatMaskConverter(Converter):
 
         converter = env.make_converter('voc_segmentation',
             apply_colormap=True, label_map='source',
-            save_images=self._save_images)
+            save_images=self._save_images, jobs=self._jobs)
         converter(extractor, save_dir=save_dir)
 
 def dump(file_object, annotations):
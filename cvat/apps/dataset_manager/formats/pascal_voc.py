@@ -65,8 +65,9 @@ def load(file_object, annotations):
 from datumaro.components.converter import Converter
 from datumaro.components.project import ProjectDataset
 class CvatVocConverter(Converter):
-    def __init__(self, save_images=False):
+    def __init__(self, save_images=False, jobs=1):
         self._save_images = save_images
+        self._jobs = jobs
 
     def __call__(self, extractor, save_dir):
         from datumaro.components.project import Environment, Dataset
@@ -79,7 +80,7 @@ class CvatVocConverter(Converter):
         extractor = extractor.transform(id_from_image)
         extractor = Dataset.from_extractors(orig_sources,extractor) # apply lazy transforms
         converter = env.make_converter('voc', label_map='source',
-            save_images=self._save_images)
+            save_images=self._save_images, jobs=self._jobs)
         converter(extractor, save_dir=save_dir)
 
 def dump(file_object, annotations):
@@ -150,8 +150,10 @@ class TaskProject:
         if dst_format == EXPORT_FORMAT_DATUMARO_PROJECT:
             self._remote_export(save_dir=save_dir, server_url=server_url)
         else:
+            # Items are converted in parallel, image encoding
+            # takes most of the time
             converter = self._dataset.env.make_converter(dst_format,
-                save_images=save_images)
+                save_images=save_images, jobs=os.cpu_count())
             self._dataset.export_project(converter=converter, save_dir=save_dir)
 
     def _remote_image_converter(self, save_dir, server_url=None):
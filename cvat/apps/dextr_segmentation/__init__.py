@@ -4,4 +4,6 @@
 
 from cvat.settings.base import JS_3RDPARTY
 
+default_app_config = 'cvat.apps.dextr_segmentation.apps.DextrSegmentationConfig'
+
 JS_3RDPARTY['engine'] = JS_3RDPARTY.get('engine', []) + ['dextr_segmentation/js/enginePlugin.js']
@@ -1,8 +1,32 @@
-# Copyright (C) 2018 Intel Corporation
+# Copyright (C) 2018-2020 Intel Corporation
 #
 # SPDX-License-Identifier: MIT
 
+import sys
+import threading
+
 from django.apps import AppConfig
+from django.conf import settings
+
+def _is_web_process():
+    # mod_wsgi sets sys.argv to ['mod_wsgi'] in its processes
+    return sys.argv[:1] == ['mod_wsgi'] or sys.argv[1:2] == ['runserver']
 
 class DextrSegmentationConfig(AppConfig):
-    name = 'dextr_segmentation'
+    name = 'cvat.apps.dextr_segmentation'
+
+    def ready(self):
+        from cvat.apps.engine.plugins import add_plugin
+
+        def load_networks(queue_names):
+            if "inference" in queue_names:
+                from .dextr import DEXTR_HANDLER
+                DEXTR_HANDLER.warm_up()
+
+        add_plugin("warm_up_worker", load_networks, "after", exc_ok=True)
+
+        # The web process runs synchronous segmentation requests itself,
+        # the network is loaded in background not to delay the start
+        if settings.DEXTR_WARM_UP and _is_web_process():
+            from .dextr import DEXTR_HANDLER
+            threading.Thread(target=DEXTR_HANDLER.warm_up, daemon=True).start()
@@ -1,14 +1,15 @@
-
 # Copyright (C) 2018-2020 Intel Corporation
 #
 # SPDX-License-Identifier: MIT
 
-from cvat.apps.auto_annotation.inference_engine import make_plugin_or_core, make_network
-from cvat.apps.engine.frame_provider import FrameProvider
+from cvat.apps.auto_annotation.inference_engine import load_network
+from cvat.apps.engine.frame_provider import ChunkCache, FrameProvider
 
+from concurrent.futures import Future
 import os
+import queue
+import threading
 import cv2
-import PIL
 import numpy as np
 
 _IE_CPU_EXTENSION = os.getenv("IE_CPU_EXTENSION", "libcpu_extension_avx2.so")
@@ -18,102 +19,176 @@ _DEXTR_MODEL_DIR = os.getenv("DEXTR_MODEL_DIR", None)
 _DEXTR_PADDING = 50
 _DEXTR_TRESHOLD = 0.9
 _DEXTR_SIZE = 512
+# Max number of requests which are processed by one infer call
+_DEXTR_BATCH_SIZE = int(os.getenv("DEXTR_BATCH_SIZE", 4))
+# Memory budget of decoded frames which are kept for next requests
+_DEXTR_FRAME_CACHE_SIZE = int(os.getenv("DEXTR_FRAME_CACHE_SIZE", 256 * 1024 * 1024))
+
+class _DecodedFrame:
+    def __init__(self, image):
+        image.flags.writeable = False
+        self.image = image
+        self.size = image.nbytes
+
+_frame_cache = ChunkCache(_DEXTR_FRAME_CACHE_SIZE)
+
+def _get_frame(db_data, frame):
+    # Usually several objects are annotated on a frame one after another,
+    # so the decoded frame is kept in memory
+    frame_provider = FrameProvider(db_data)
+    chunk_path = frame_provider.get_chunk(frame // db_data.chunk_size)
+
+    def load(_):
+        image, _ = frame_provider.get_frame(frame,
+            frame_provider.Quality.ORIGINAL, frame_provider.Type.PIL)
+        return _DecodedFrame(np.array(image.convert('RGB')))
+
+    return _frame_cache.get((db_data.id, frame), chunk_path, load).image
+
+def _make_heatmap(points):
+    # A gaussian is a product of gaussians along axes, so a heatmap is
+    # computed for all points at once from their 1D profiles
+    axis = np.arange(_DEXTR_SIZE, dtype=np.float32)
+    x_profiles = np.exp(-4 * np.log(2) * (axis - points[:, :1]) ** 2 / 100)
+    y_profiles = np.exp(-4 * np.log(2) * (axis - points[:, 1:]) ** 2 / 100)
+    heatmap = np.max(y_profiles[:, :, np.newaxis] * x_profiles[:, np.newaxis, :], axis=0)
+    cv2.normalize(heatmap, heatmap, 0, 255, cv2.NORM_MINMAX)
+    return heatmap
+
+def _prepare_input(image, points):
+    # Padding mustn't be more than the closest distance to an edge of an image
+    [height, width] = image.shape[:2]
+    [min_x, min_y] = np.min(points, axis=0)
+    [max_x, max_y] = np.max(points, axis=0)
+    padding = min(min_x, min_y, width - max_x, height - max_y, _DEXTR_PADDING)
+    bounding_box = (
+        max(min_x - padding, 0),
+        max(min_y - padding, 0),
+        min(max_x + padding, width - 1),
+        min(max_y + padding, height - 1)
+    )
+
+    # Prepare an image, only the cropped region is converted
+    cropped = image[bounding_box[1]:bounding_box[3], bounding_box[0]:bounding_box[2]]
+    resized = cv2.resize(cropped, (_DEXTR_SIZE, _DEXTR_SIZE),
+        interpolation = cv2.INTER_CUBIC).astype(np.float32)
+
+    # Make a heatmap
+    points = points - [bounding_box[0], bounding_box[1]]
+    points = (points * [_DEXTR_SIZE / cropped.shape[1], _DEXTR_SIZE / cropped.shape[0]]).astype(int)
+    heatmap = _make_heatmap(points)
+
+    # Concat an image and a heatmap
+    input_dextr = np.concatenate((resized, heatmap[:, :, np.newaxis]), axis=2)
+    return input_dextr.transpose((2,0,1)), bounding_box
+
+def _make_polygon(pred, bounding_box):
+    [x, y, max_x, max_y] = bounding_box
+    pred = cv2.resize(pred, (max_x - x, max_y - y), interpolation = cv2.INTER_CUBIC)
+    result = np.array(pred > _DEXTR_TRESHOLD, dtype=np.uint8) * 255
+
+    # Convert a mask to a polygon. The mask is bordered by zeros like
+    # it would be in a full frame.
+    result = cv2.copyMakeBorder(result, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+    contours = None
+    if int(cv2.__version__.split('.')[0]) > 3:
+        contours = cv2.findContours(result, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_TC89_KCOS,
+            offset=(x - 1, y - 1))[0]
+    else:
+        contours = cv2.findContours(result, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_TC89_KCOS,
+            offset=(x - 1, y - 1))[1]
+
+    contours = max(contours, key=lambda arr: arr.size, default=np.empty((0, 2)))
+    contours = contours.reshape(-1, 2)
+    if len(contours) < 3:
+        raise Exception('Less then three point have been detected. Can not build a polygon.')
+
+    return contours
+
+class _InferenceBatcher:
+    """
+    Runs inference in a background thread. Inputs which are submitted while
+    the network is busy (e.g. by concurrent requests) are processed by one
+    infer call.
+    """
+
+    def __init__(self, load_network, max_batch_size):
+        self._load_network = load_network
+        self._max_batch_size = max(1, max_batch_size)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def infer(self, input_blob):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        future = Future()
+        self._queue.put((input_blob, future))
+        return future.result()
+
+    def _get_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self._max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._get_batch()
+            try:
+                outputs = self._infer_batch([input_blob for input_blob, _ in batch])
+                for (_, future), output in zip(batch, outputs):
+                    future.set_result(output)
+            except Exception as ex:
+                for _, future in batch:
+                    future.set_exception(ex)
+
+    def _infer_batch(self, inputs):
+        # Networks are compiled for single inputs and for full batches only,
+        # a partial batch is padded
+        network = self._load_network(1 if len(inputs) == 1 else self._max_batch_size)
+        input_name = next(iter(network.inputs))
+        output_name = next(iter(network.outputs))
+        batch = np.zeros((network.batch_size, ) + inputs[0].shape, dtype=np.float32)
+        batch[:len(inputs)] = inputs
+        outputs = network.exec_network.infer(inputs={input_name: batch})[output_name]
+        return [outputs[idx, 0] for idx in range(len(inputs))]
 
 class DEXTR_HANDLER:
     def __init__(self):
-        self._plugin = None
-        self._network = None
-        self._exec_network = None
-        self._input_blob = None
-        self._output_blob = None
         if not _DEXTR_MODEL_DIR:
             raise Exception("DEXTR_MODEL_DIR is not defined")
-
-
-    def handle(self, db_data, frame, points):
-        # Lazy initialization
-        if not self._plugin:
-            self._plugin = make_plugin_or_core()
-            self._network = make_network(os.path.join(_DEXTR_MODEL_DIR, 'dextr.xml'),
-                os.path.join(_DEXTR_MODEL_DIR, 'dextr.bin'))
-            self._input_blob = next(iter(self._network.inputs))
-            self._output_blob = next(iter(self._network.outputs))
-            if getattr(self._plugin, 'load_network', False):
-                self._exec_network = self._plugin.load_network(self._network, 'CPU')
-            else:
-                self._exec_network = self._plugin.load(network=self._network)
-
-        frame_provider = FrameProvider(db_data)
-        image = frame_provider.get_frame(frame, frame_provider.Quality.ORIGINAL)
-        image = PIL.Image.open(image[0])
-        numpy_image = np.array(image)
+        self._batcher = _InferenceBatcher(self.load_network, _DEXTR_BATCH_SIZE)
+
+    @staticmethod
+    def load_network(batch_size=1):
+        # The compiled network is shared by all handlers of the process,
+        # it can be loaded in advance when a worker starts
+        return load_network(os.path.join(_DEXTR_MODEL_DIR, 'dextr.xml'),
+            os.path.join(_DEXTR_MODEL_DIR, 'dextr.bin'), batch_size=batch_size)
+
+    @classmethod
+    def warm_up(cls):
+        for batch_size in {1, max(1, _DEXTR_BATCH_SIZE)}:
+            cls.load_network(batch_size)
+
+    def segment(self, db_data, frame, points):
+        """
+        Returns a polygon of the object as an array of (x, y) points. It can
+        be called from several threads, their requests are batched.
+        """
+
+        image = _get_frame(db_data, frame)
         points = np.asarray([[int(p["x"]), int(p["y"])] for p in points], dtype=int)
+        input_dextr, bounding_box = _prepare_input(image, points)
+        pred = self._batcher.infer(input_dextr)
+        return _make_polygon(pred, bounding_box)
 
-        # Padding mustn't be more than the closest distance to an edge of an image
-        [height, width] = numpy_image.shape[:2]
-        x_values = points[:, 0]
-        y_values = points[:, 1]
-        [min_x, max_x] = [np.min(x_values), np.max(x_values)]
-        [min_y, max_y] = [np.min(y_values), np.max(y_values)]
-        padding = min(min_x, min_y, width - max_x, height - max_y, _DEXTR_PADDING)
-        bounding_box = (
-            max(min(points[:, 0]) - padding, 0),
-            max(min(points[:, 1]) - padding, 0),
-            min(max(points[:, 0]) + padding, width - 1),
-            min(max(points[:, 1]) + padding, height - 1)
-        )
-
-        # Prepare an image
-        numpy_cropped = np.array(image.crop(bounding_box))
-        resized = cv2.resize(numpy_cropped, (_DEXTR_SIZE, _DEXTR_SIZE),
-            interpolation = cv2.INTER_CUBIC).astype(np.float32)
-
-        # Make a heatmap
-        points = points - [min(points[:, 0]), min(points[:, 1])] + [padding, padding]
-        points = (points * [_DEXTR_SIZE / numpy_cropped.shape[1], _DEXTR_SIZE / numpy_cropped.shape[0]]).astype(int)
-        heatmap = np.zeros(shape=resized.shape[:2], dtype=np.float64)
-        for point in points:
-            gaussian_x_axis = np.arange(0, _DEXTR_SIZE, 1, float) - point[0]
-            gaussian_y_axis = np.arange(0, _DEXTR_SIZE, 1, float)[:, np.newaxis] - point[1]
-            gaussian = np.exp(-4 * np.log(2) * ((gaussian_x_axis ** 2 + gaussian_y_axis ** 2) / 100)).astype(np.float64)
-            heatmap = np.maximum(heatmap, gaussian)
-        cv2.normalize(heatmap,  heatmap, 0, 255, cv2.NORM_MINMAX)
-
-        # Concat an image and a heatmap
-        input_dextr = np.concatenate((resized, heatmap[:, :, np.newaxis].astype(resized.dtype)), axis=2)
-        input_dextr = input_dextr.transpose((2,0,1))
-
-        pred = self._exec_network.infer(inputs={self._input_blob: input_dextr[np.newaxis, ...]})[self._output_blob][0, 0, :, :]
-        pred = cv2.resize(pred, tuple(reversed(numpy_cropped.shape[:2])), interpolation = cv2.INTER_CUBIC)
-        result = np.zeros(numpy_image.shape[:2])
-        result[bounding_box[1]:bounding_box[1] + pred.shape[0], bounding_box[0]:bounding_box[0] + pred.shape[1]] = pred > _DEXTR_TRESHOLD
-
-        # Convert a mask to a polygon
-        result = np.array(result, dtype=np.uint8)
-        cv2.normalize(result,result,0,255,cv2.NORM_MINMAX)
-        contours = None
-        if int(cv2.__version__.split('.')[0]) > 3:
-            contours = cv2.findContours(result, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_TC89_KCOS)[0]
-        else:
-            contours = cv2.findContours(result, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_TC89_KCOS)[1]
-
-        contours = max(contours, key=lambda arr: arr.size)
-        if contours.shape.count(1):
-            contours = np.squeeze(contours)
-        if contours.size < 3 * 2:
-            raise Exception('Less then three point have been detected. Can not build a polygon.')
-
-        result = ""
-        for point in contours:
-            result += "{},{} ".format(int(point[0]), int(point[1]))
-        result = result[:-1]
-
-        return result
-
-    def __del__(self):
-        if self._exec_network:
-            del self._exec_network
-        if self._network:
-            del self._network
-        if self._plugin:
-            del self._plugin
+    def handle(self, db_data, frame, points):
+        polygon = self.segment(db_data, frame, points)
+        return " ".join("{},{}".format(x, y) for x, y in polygon)
@@ -1,5 +1,5 @@
 /*
- * Copyright (C) 2018 Intel Corporation
+ * Copyright (C) 2018-2020 Intel Corporation
  *
  * SPDX-License-Identifier: MIT
  */
@@ -28,21 +28,14 @@ window.addEventListener('DOMContentLoaded', () => {
             </div>
         </div>`).appendTo('body');
 
+    // The polygon is returned in the response of the segmentation request,
+    // so the request is cancelled by aborting it
+    let dextrRequest = null;
     const dextrCancelButton = $(`#${dextrCancelButtonId}`);
     dextrCancelButton.on('click', () => {
-        dextrCancelButton.prop('disabled', true);
-        $.ajax({
-            url: `/dextr/cancel/${window.cvat.job.id}`,
-            type: 'GET',
-            error: (errorData) => {
-                const message = `Can not cancel segmentation. Code: ${errorData.status}.
-                    Message: ${errorData.responseText || errorData.statusText}`;
-                showMessage(message);
-            },
-            complete: () => {
-                dextrCancelButton.prop('disabled', false);
-            },
-        });
+        if (dextrRequest) {
+            dextrRequest.abort();
+        }
     });
 
     function ShapeCreatorModelWrapper(OriginalClass) {
@@ -138,61 +131,36 @@ window.addEventListener('DOMContentLoaded', () => {
                     const area = polybox.width * polybox.height;
 
                     if (area > AREA_TRESHOLD) {
-                        $.ajax({
-                            url: `/dextr/create/${window.cvat.job.id}`,
+                        dextrOverlay.removeClass('hidden');
+                        dextrRequest = $.ajax({
+                            url: `/dextr/segment/${window.cvat.job.id}`,
                             type: 'POST',
                             data: JSON.stringify({
                                 frame: window.cvat.player.frames.current,
                                 points: actualPoints,
                             }),
                             contentType: 'application/json',
-                            success: () => {
-                                function intervalCallback() {
-                                    $.ajax({
-                                        url: `/dextr/check/${window.cvat.job.id}`,
-                                        type: 'GET',
-                                        success: (jobData) => {
-                                            if (['queued', 'started'].includes(jobData.status)) {
-                                                if (jobData.status === 'queued') {
-                                                    dextrCancelButton.prop('disabled', false);
-                                                }
-                                                setTimeout(intervalCallback, 1000);
-                                            } else {
-                                                dextrOverlay.addClass('hidden');
-                                                if (jobData.status === 'finished') {
-                                                    if (jobData.result) {
-                                                        instance._controller.finish({ points: jobData.result }, 'polygon');
-                                                    }
-                                                } else if (jobData.status === 'failed') {
-                                                    const message = `Segmentation has fallen. Error: '${jobData.stderr}'`;
-                                                    showMessage(message);
-                                                } else {
-                                                    let message = `Check segmentation request returned "${jobData.status}" status.`;
-                                                    if (jobData.stderr) {
-                                                        message += ` Error: ${jobData.stderr}`;
-                                                    }
-                                                    showMessage(message);
-                                                }
-                                            }
-                                        },
-                                        error: (errorData) => {
-                                            dextrOverlay.addClass('hidden');
-                                            const message = `Can not check segmentation. Code: ${errorData.status}.`
-                                                + ` Message: ${errorData.responseText || errorData.statusText}`;
-                                            showMessage(message);
-                                        },
-                                    });
+                            success: (result) => {
+                                const points = [];
+                                for (let idx = 0; idx + 1 < result.points.length; idx += 2) {
+                                    points.push(`${result.points[idx]},${result.points[idx + 1]}`);
+                                }
+                                if (points.length) {
+                                    instance._controller.finish({ points: points.join(' ') }, 'polygon');
                                 }
-
-                                dextrCancelButton.prop('disabled', true);
-                                dextrOverlay.removeClass('hidden');
-                                setTimeout(intervalCallback, 1000);
                             },
-                            error: (errorData) => {
-                                const message = `Can not cancel ReID process. Code: ${errorData.status}.`
+                            error: (errorData, textStatus) => {
+                                if (textStatus === 'abort') {
+                                    return;
+                                }
+                                const message = `Segmentation has fallen. Code: ${errorData.status}.`
                                     + ` Message: ${errorData.responseText || errorData.statusText}`;
                                 showMessage(message);
                             },
+                            complete: () => {
+                                dextrRequest = null;
+                                dextrOverlay.addClass('hidden');
+                            },
                         });
                     }
 
@@ -7,6 +7,7 @@ from . import views
 
 urlpatterns = [
     path('create/<int:jid>', views.create),
+    path('segment/<int:jid>', views.segment),
     path('cancel/<int:jid>', views.cancel),
     path('check/<int:jid>', views.check),
     path('enabled', views.enabled)
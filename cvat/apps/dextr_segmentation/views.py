@@ -1,4 +1,4 @@
-# Copyright (C) 2018 Intel Corporation
+# Copyright (C) 2018-2020 Intel Corporation
 #
 # SPDX-License-Identifier: MIT
 
@@ -14,7 +14,7 @@ import django_rq
 import json
 import rq
 
-__RQ_QUEUE_NAME = "default"
+__RQ_QUEUE_NAME = "inference"
 __DEXTR_HANDLER = DEXTR_HANDLER()
 
 def _dextr_thread(db_data, frame, points):
@@ -62,6 +62,31 @@ def create(request, jid):
         return HttpResponseBadRequest(str(ex))
 
 
+@login_required
+@permission_required(perm=["engine.job.change"],
+    fn=objectgetter(Job, "jid"), raise_exception=True)
+def segment(request, jid):
+    # Low latency mode: the polygon is returned in the response without
+    # a job in the queue, concurrent requests are batched by the handler
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+
+        points = data["points"]
+        frame = int(data["frame"])
+        username = request.user.username
+
+        slogger.job[jid].info("segment dextr request for the JOB: {} ".format(jid)
+            + "by the USER: {} on the FRAME: {}".format(username, frame))
+
+        db_data = Job.objects.select_related("segment__task__data").get(id=jid).segment.task.data
+        polygon = __DEXTR_HANDLER.segment(db_data, frame, points)
+
+        return JsonResponse({"points": polygon.ravel().tolist()})
+    except Exception as ex:
+        slogger.job[jid].error("can't segment an object for the job {}".format(jid), exc_info=True)
+        return HttpResponseBadRequest(str(ex))
+
+
 @login_required
 @permission_required(perm=["engine.job.change"],
     fn=objectgetter(Job, "jid"), raise_exception=True)
@@ -9,6 +9,7 @@ from django.utils import timezone
 
 from django.conf import settings
 from django.db import transaction
+from django.db.models import Max
 
 from cvat.apps.profiler import silk_profile
 from cvat.apps.engine.plugins import plugin_decorator
@@ -18,7 +19,6 @@ from cvat.apps.engine.utils import execute_python_code, import_modules
 from . import models
 from .data_manager import DataManager
 from .log import slogger
-from . import serializers
 
 """dot.notation access to dictionary attributes"""
 class dotdict(OrderedDict):
@@ -155,6 +155,8 @@ def bulk_create(db_model, objects, flt_param):
 
     return []
 
+_BULK_UPDATE_BATCH_SIZE = 1000
+
 def _merge_table_rows(rows, keys_for_merge, field_id):
     # It is necessary to keep a stable order of original rows
     # (e.g. for tracked boxes). Otherwise prev_box.frame can be bigger
@@ -183,6 +185,180 @@ def _merge_table_rows(rows, keys_for_merge, field_id):
 
     return list(merged_rows.values())
 
+def _get_db_attributes(db_labels):
+    db_attributes = {}
+    for db_label in db_labels:
+        db_attributes[db_label.id] = {
+            "mutable": OrderedDict(),
+            "immutable": OrderedDict(),
+            "all": OrderedDict(),
+        }
+        for db_attr in db_label.attributespec_set.all():
+            default_value = dotdict([
+                ('spec_id', db_attr.id),
+                ('value', db_attr.default_value),
+            ])
+            if db_attr.mutable:
+                db_attributes[db_label.id]["mutable"][db_attr.id] = default_value
+            else:
+                db_attributes[db_label.id]["immutable"][db_attr.id] = default_value
+
+            db_attributes[db_label.id]["all"][db_attr.id] = default_value
+
+    return db_attributes
+
+class AnnotationLoader:
+    """
+    Loads annotations of several jobs of a task at once. Each kind of objects
+    and of their attributes is fetched for all jobs by a single query. Rows
+    are streamed from the database (server-side cursors are used where it is
+    supported) and assembled into the IR format directly.
+    """
+
+    CHUNK_SIZE = 2000
+
+    def __init__(self, db_jobs, db_attributes):
+        self.job_ids = [db_job.id for db_job in db_jobs]
+        self.db_attributes = db_attributes
+
+    def _fetch(self, db_model, fields, order_by, **filters):
+        queryset = db_model.objects.filter(**filters) \
+            .values_list(*fields).order_by(*order_by)
+        return queryset.iterator(chunk_size=self.CHUNK_SIZE)
+
+    def _fetch_attributes(self, db_model, owner_field, objects, **filters):
+        for owner_id, spec_id, value in self._fetch(db_model,
+                (owner_field, 'spec_id', 'value'), ('id', ), **filters):
+            obj = objects.get(owner_id)
+            if obj is not None:
+                obj["attributes"].append({'spec_id': spec_id, 'value': value})
+
+    @staticmethod
+    def _extend_attributes(attributes, default_attribute_values):
+        shape_attribute_specs_set = set(attr["spec_id"] for attr in attributes)
+        for db_attr in default_attribute_values:
+            if db_attr["spec_id"] not in shape_attribute_specs_set:
+                attributes.append({
+                    'spec_id': db_attr["spec_id"],
+                    'value': db_attr["value"],
+                })
+
+    def _load_tags(self, data):
+        tags = OrderedDict()
+        for tag_id, job_id, frame, label_id, group in self._fetch(models.LabeledImage,
+                ('id', 'job_id', 'frame', 'label_id', 'group'), ('frame', 'id'),
+                job_id__in=self.job_ids):
+            tags[tag_id] = {
+                'id': tag_id,
+                'frame': frame,
+                'label_id': label_id,
+                'group': group,
+                'attributes': [],
+            }
+            data[job_id].tags.append(tags[tag_id])
+
+        self._fetch_attributes(models.LabeledImageAttributeVal, 'image_id', tags,
+            image__job_id__in=self.job_ids)
+
+        for tag in tags.values():
+            self._extend_attributes(tag["attributes"],
+                self.db_attributes[tag["label_id"]]["all"].values())
+
+    def _load_shapes(self, data):
+        shapes = OrderedDict()
+        for shape_id, job_id, label_id, shape_type, frame, group, occluded, \
+                z_order, points in self._fetch(models.LabeledShape,
+                ('id', 'job_id', 'label_id', 'type', 'frame', 'group',
+                'occluded', 'z_order', 'points'), ('frame', 'id'),
+                job_id__in=self.job_ids):
+            shapes[shape_id] = {
+                'type': shape_type,
+                'occluded': occluded,
+                'z_order': z_order,
+                'points': points,
+                'id': shape_id,
+                'frame': frame,
+                'label_id': label_id,
+                'group': group,
+                'attributes': [],
+            }
+            data[job_id].shapes.append(shapes[shape_id])
+
+        self._fetch_attributes(models.LabeledShapeAttributeVal, 'shape_id', shapes,
+            shape__job_id__in=self.job_ids)
+
+        for shape in shapes.values():
+            self._extend_attributes(shape["attributes"],
+                self.db_attributes[shape["label_id"]]["all"].values())
+
+    def _load_tracks(self, data):
+        tracks = OrderedDict()
+        for track_id, job_id, frame, label_id, group in self._fetch(models.LabeledTrack,
+                ('id', 'job_id', 'frame', 'label_id', 'group'), ('id', ),
+                job_id__in=self.job_ids):
+            tracks[track_id] = {
+                'id': track_id,
+                'frame': frame,
+                'label_id': label_id,
+                'group': group,
+                'shapes': [],
+                'attributes': [],
+            }
+            data[job_id].tracks.append(tracks[track_id])
+
+        self._fetch_attributes(models.LabeledTrackAttributeVal, 'track_id', tracks,
+            track__job_id__in=self.job_ids)
+
+        shapes = OrderedDict()
+        for shape_id, track_id, shape_type, occluded, z_order, points, frame, \
+                outside in self._fetch(models.TrackedShape,
+                ('id', 'track_id', 'type', 'occluded', 'z_order', 'points',
+                'frame', 'outside'), ('track_id', 'frame'),
+                track__job_id__in=self.job_ids):
+            shapes[shape_id] = {
+                'type': shape_type,
+                'occluded': occluded,
+                'z_order': z_order,
+                'points': points,
+                'id': shape_id,
+                'frame': frame,
+                'outside': outside,
+                'attributes': [],
+            }
+            tracks[track_id]["shapes"].append(shapes[shape_id])
+
+        self._fetch_attributes(models.TrackedShapeAttributeVal, 'shape_id', shapes,
+            shape__track__job_id__in=self.job_ids)
+
+        for track in tracks.values():
+            self._extend_attributes(track["attributes"],
+                self.db_attributes[track["label_id"]]["immutable"].values())
+
+            default_attribute_values = self.db_attributes[track["label_id"]]["mutable"].values()
+            for shape in track["shapes"]:
+                # in case of trackedshapes need to interpolate attriute values and extend it
+                # by previous shape attribute values (not default values)
+                self._extend_attributes(shape["attributes"], default_attribute_values)
+                default_attribute_values = shape["attributes"]
+
+    def _load_versions(self, data):
+        for job_id, version in models.JobCommit.objects \
+                .filter(job_id__in=self.job_ids).order_by() \
+                .values('job_id').annotate(last_version=Max('version')) \
+                .values_list('job_id', 'last_version'):
+            data[job_id].version = version
+
+    def load(self):
+        """Returns annotations of each job as AnnotationIR, keyed by job id"""
+
+        data = OrderedDict((job_id, AnnotationIR()) for job_id in self.job_ids)
+        self._load_tags(data)
+        self._load_shapes(data)
+        self._load_tracks(data)
+        self._load_versions(data)
+
+        return data
+
 class JobAnnotation:
     def __init__(self, pk, user):
         self.user = user
@@ -197,26 +373,8 @@ class JobAnnotation:
         # pylint: disable=bad-continuation
         self.logger = slogger.job[self.db_job.id]
         self.db_labels = {db_label.id:db_label
-            for db_label in db_segment.task.label_set.all()}
-
-        self.db_attributes = {}
-        for db_label in self.db_labels.values():
-            self.db_attributes[db_label.id] = {
-                "mutable": OrderedDict(),
-                "immutable": OrderedDict(),
-                "all": OrderedDict(),
-            }
-            for db_attr in db_label.attributespec_set.all():
-                default_value = dotdict([
-                    ('spec_id', db_attr.id),
-                    ('value', db_attr.default_value),
-                ])
-                if db_attr.mutable:
-                    self.db_attributes[db_label.id]["mutable"][db_attr.id] = default_value
-                else:
-                    self.db_attributes[db_label.id]["immutable"][db_attr.id] = default_value
-
-                self.db_attributes[db_label.id]["all"][db_attr.id] = default_value
+            for db_label in db_segment.task.label_set.prefetch_related("attributespec_set")}
+        self.db_attributes = _get_db_attributes(self.db_labels.values())
 
     def reset(self):
         self.ir_data.reset()
@@ -386,7 +544,202 @@ class JobAnnotation:
 
         self.ir_data.tags = tags
 
-    def _commit(self):
+    @staticmethod
+    def _diff_objects(db_queryset, fields, objects, delete_missing):
+        # Split objects on new, changed and unchanged ones comparing them
+        # with rows in DB. Also returns ids of rows which aren't in objects
+        # if delete_missing is True.
+        if not delete_missing:
+            db_queryset = db_queryset.filter(id__in=[obj["id"] for obj in objects
+                if obj.get("id") is not None])
+        db_rows = {row[0]: row[1:] for row in db_queryset.values_list('id', *fields)}
+
+        created, updated, unchanged = [], [], []
+        for obj in objects:
+            db_row = db_rows.pop(obj.get("id"), None)
+            if db_row is None:
+                # Ids of objects which don't belong to the job are ignored
+                obj["id"] = None
+                created.append(obj)
+            elif db_row != tuple(obj[field] for field in fields):
+                updated.append(obj)
+            else:
+                unchanged.append(obj)
+
+        deleted_ids = list(db_rows) if delete_missing else []
+        return created, updated, unchanged, deleted_ids
+
+    def _validate_attributes(self, label_id, attributes, attr_type):
+        if label_id not in self.db_labels:
+            raise AttributeError("label_id `{}` is invalid".format(label_id))
+        for attr in attributes:
+            if attr["spec_id"] not in self.db_attributes[label_id][attr_type]:
+                raise AttributeError("spec_id `{}` is invalid".format(attr["spec_id"]))
+
+    @staticmethod
+    def _update_rows(db_model, fields, objects, stats):
+        if objects:
+            db_model.objects.bulk_update([
+                db_model(id=obj["id"], **{field: obj[field] for field in fields})
+                for obj in objects
+            ], fields, batch_size=_BULK_UPDATE_BATCH_SIZE)
+            stats["updated"] += len(objects)
+
+    @staticmethod
+    def _update_attributes(db_model, owner_field, objects, stats):
+        # Only changed attribute values are written, all values of
+        # an object are identified by spec_id
+        if not objects:
+            return
+
+        db_attrvals = {}
+        for attr_id, owner_id, spec_id, value in db_model.objects.filter(
+                **{owner_field + '__in': [obj["id"] for obj in objects]}) \
+                .values_list('id', owner_field, 'spec_id', 'value').order_by('id'):
+            db_attrvals.setdefault(owner_id, {}).setdefault(spec_id, []).append(
+                (attr_id, value))
+
+        db_created, db_updated, deleted_ids = [], [], []
+        for obj in objects:
+            db_values = db_attrvals.get(obj["id"], {})
+            for attr in obj["attributes"]:
+                rows = db_values.pop(attr["spec_id"], None)
+                if not rows:
+                    db_created.append(db_model(**{owner_field: obj["id"]}, **attr))
+                    continue
+                attr_id, value = rows[0]
+                if value != str(attr["value"]):
+                    db_updated.append(db_model(id=attr_id, value=attr["value"]))
+                deleted_ids.extend(attr_id for attr_id, _ in rows[1:])
+            deleted_ids.extend(attr_id for rows in db_values.values()
+                for attr_id, _ in rows)
+
+        if db_created:
+            db_model.objects.bulk_create(db_created)
+            stats["created"] += len(db_created)
+        if db_updated:
+            db_model.objects.bulk_update(db_updated, ['value'],
+                batch_size=_BULK_UPDATE_BATCH_SIZE)
+            stats["updated"] += len(db_updated)
+        if deleted_ids:
+            stats["deleted"] += db_model.objects.filter(id__in=deleted_ids).delete()[0]
+
+    def _save_tracked_shapes_to_db(self, track_shapes, stats):
+        db_shapes = []
+        db_attrvals = []
+        for track_id, shape in track_shapes:
+            attributes = shape.pop("attributes", [])
+            db_shape = models.TrackedShape(**shape)
+            db_shape.track_id = track_id
+            for attr in attributes:
+                db_attrval = models.TrackedShapeAttributeVal(**attr)
+                db_attrval.shape_id = len(db_shapes)
+                db_attrvals.append(db_attrval)
+            db_shapes.append(db_shape)
+            shape["attributes"] = attributes
+
+        db_shapes = bulk_create(
+            db_model=models.TrackedShape,
+            objects=db_shapes,
+            flt_param={"track__job_id": self.db_job.id}
+        )
+
+        for db_attrval in db_attrvals:
+            db_attrval.shape_id = db_shapes[db_attrval.shape_id].id
+        bulk_create(
+            db_model=models.TrackedShapeAttributeVal,
+            objects=db_attrvals,
+            flt_param={}
+        )
+
+        for (_, shape), db_shape in zip(track_shapes, db_shapes):
+            shape["id"] = db_shape.id
+        stats["created"] += len(db_shapes) + len(db_attrvals)
+
+    def _save_changes_to_db(self, data, delete_missing):
+        """
+        Writes only the difference between data and the job annotations in DB.
+        Existing objects keep their ids. If delete_missing is True, objects
+        which are absent in data are deleted, i.e. data replaces all job
+        annotations. Returns numbers of created, updated and deleted rows.
+        """
+
+        self.reset()
+        stats = OrderedDict([("created", 0), ("updated", 0), ("deleted", 0)])
+
+        for tag in data["tags"]:
+            self._validate_attributes(tag["label_id"], tag["attributes"], "all")
+        for shape in data["shapes"]:
+            self._validate_attributes(shape["label_id"], shape["attributes"], "all")
+        for track in data["tracks"]:
+            self._validate_attributes(track["label_id"], track["attributes"], "immutable")
+            for shape in track["shapes"]:
+                self._validate_attributes(track["label_id"], shape["attributes"], "mutable")
+
+        kinds = [
+            ("tags", models.LabeledImage, models.LabeledImageAttributeVal, "image_id",
+                ('frame', 'label_id', 'group'), self._save_tags_to_db),
+            ("shapes", models.LabeledShape, models.LabeledShapeAttributeVal, "shape_id",
+                ('frame', 'label_id', 'group', 'type', 'occluded', 'z_order', 'points'),
+                self._save_shapes_to_db),
+            ("tracks", models.LabeledTrack, models.LabeledTrackAttributeVal, "track_id",
+                ('frame', 'label_id', 'group'), self._save_tracks_to_db),
+        ]
+        for key, db_model, db_attr_model, owner_field, fields, save_to_db in kinds:
+            objects = data[key]
+            created, updated, unchanged, deleted_ids = self._diff_objects(
+                db_model.objects.filter(job_id=self.db_job.id), fields, objects,
+                delete_missing)
+
+            if deleted_ids:
+                stats["deleted"] += db_model.objects.filter(id__in=deleted_ids).delete()[0]
+            self._update_rows(db_model, fields, updated, stats)
+            self._update_attributes(db_attr_model, owner_field, updated + unchanged, stats)
+            if key == "tracks":
+                self._save_track_shape_changes(updated + unchanged, stats)
+                for track in created:
+                    for shape in track["shapes"]:
+                        shape["id"] = None
+            if created:
+                save_to_db(created)
+                stats["created"] += len(created) + sum(len(obj["attributes"])
+                    for obj in created)
+                if key == "tracks":
+                    stats["created"] += sum(len(shape["attributes"]) + 1
+                        for track in created for shape in track["shapes"])
+
+            setattr(self.ir_data, key, objects)
+
+        return stats
+
+    def _save_track_shape_changes(self, tracks, stats):
+        # track_id is compared as well because a shape can be moved to
+        # another track
+        fields = ('track_id', 'frame', 'type', 'occluded', 'z_order', 'points', 'outside')
+        track_shapes = []
+        for track in tracks:
+            for shape in track["shapes"]:
+                shape["track_id"] = track["id"]
+                track_shapes.append(shape)
+
+        created, updated, unchanged, deleted_ids = self._diff_objects(
+            models.TrackedShape.objects.filter(track_id__in=[track["id"] for track in tracks]),
+            fields, track_shapes, delete_missing=True)
+
+        if deleted_ids:
+            stats["deleted"] += models.TrackedShape.objects \
+                .filter(id__in=deleted_ids).delete()[0]
+        self._update_rows(models.TrackedShape, fields, updated, stats)
+        self._update_attributes(models.TrackedShapeAttributeVal, "shape_id",
+            updated + unchanged, stats)
+        if created:
+            self._save_tracked_shapes_to_db([(shape.pop("track_id"), shape)
+                for shape in created], stats)
+
+        for shape in track_shapes:
+            shape.pop("track_id", None)
+
+    def _commit(self, stats=None):
         db_prev_commit = self.db_job.commits.last()
         db_curr_commit = models.JobCommit()
         if db_prev_commit:
@@ -396,6 +749,9 @@ class JobAnnotation:
         db_curr_commit.job = self.db_job
         db_curr_commit.message = "Changes: tags - {}; shapes - {}; tracks - {}".format(
             len(self.ir_data.tags), len(self.ir_data.shapes), len(self.ir_data.tracks))
+        if stats is not None:
+            db_curr_commit.message += "; rows: created - {}; updated - {}; deleted - {}".format(
+                stats["created"], stats["updated"], stats["deleted"])
         db_curr_commit.save()
         self.ir_data.version = db_curr_commit.version
 
@@ -421,15 +777,20 @@ class JobAnnotation:
         self._create(data)
         self._commit()
 
+    def _save_changes(self, data, delete_missing):
+        stats = self._save_changes_to_db(data, delete_missing)
+        if any(stats.values()):
+            self._set_updated_date()
+            self.db_job.save()
+        self.logger.info("Annotations are saved, rows: created - {}; updated - {}; deleted - {}".format(
+            stats["created"], stats["updated"], stats["deleted"]))
+        self._commit(stats)
+
     def put(self, data):
-        self._delete()
-        self._create(data)
-        self._commit()
+        self._save_changes(data, delete_missing=True)
 
     def update(self, data):
-        self._delete(data)
-        self._create(data)
-        self._commit()
+        self._save_changes(data, delete_missing=False)
 
     def _delete(self, data=None):
         deleted_shapes = 0
@@ -466,172 +827,9 @@ class JobAnnotation:
         self._delete(data)
         self._commit()
 
-    @staticmethod
-    def _extend_attributes(attributeval_set, default_attribute_values):
-        shape_attribute_specs_set = set(attr.spec_id for attr in attributeval_set)
-        for db_attr in default_attribute_values:
-            if db_attr.spec_id not in shape_attribute_specs_set:
-                attributeval_set.append(dotdict([
-                    ('spec_id', db_attr.spec_id),
-                    ('value', db_attr.value),
-                ]))
-
-    def _init_tags_from_db(self):
-        db_tags = self.db_job.labeledimage_set.prefetch_related(
-            "label",
-            "labeledimageattributeval_set"
-        ).values(
-            'id',
-            'frame',
-            'label_id',
-            'group',
-            'labeledimageattributeval__spec_id',
-            'labeledimageattributeval__value',
-            'labeledimageattributeval__id',
-        ).order_by('frame')
-
-        db_tags = _merge_table_rows(
-            rows=db_tags,
-            keys_for_merge={
-                "labeledimageattributeval_set": [
-                    'labeledimageattributeval__spec_id',
-                    'labeledimageattributeval__value',
-                    'labeledimageattributeval__id',
-                ],
-            },
-            field_id='id',
-        )
-
-        for db_tag in db_tags:
-            self._extend_attributes(db_tag.labeledimageattributeval_set,
-                self.db_attributes[db_tag.label_id]["all"].values())
-
-        serializer = serializers.LabeledImageSerializer(db_tags, many=True)
-        self.ir_data.tags = serializer.data
-
-    def _init_shapes_from_db(self):
-        db_shapes = self.db_job.labeledshape_set.prefetch_related(
-            "label",
-            "labeledshapeattributeval_set"
-        ).values(
-            'id',
-            'label_id',
-            'type',
-            'frame',
-            'group',
-            'occluded',
-            'z_order',
-            'points',
-            'labeledshapeattributeval__spec_id',
-            'labeledshapeattributeval__value',
-            'labeledshapeattributeval__id',
-            ).order_by('frame')
-
-        db_shapes = _merge_table_rows(
-            rows=db_shapes,
-            keys_for_merge={
-                'labeledshapeattributeval_set': [
-                    'labeledshapeattributeval__spec_id',
-                    'labeledshapeattributeval__value',
-                    'labeledshapeattributeval__id',
-                ],
-            },
-            field_id='id',
-        )
-        for db_shape in db_shapes:
-            self._extend_attributes(db_shape.labeledshapeattributeval_set,
-                self.db_attributes[db_shape.label_id]["all"].values())
-
-        serializer = serializers.LabeledShapeSerializer(db_shapes, many=True)
-        self.ir_data.shapes = serializer.data
-
-    def _init_tracks_from_db(self):
-        db_tracks = self.db_job.labeledtrack_set.prefetch_related(
-            "label",
-            "labeledtrackattributeval_set",
-            "trackedshape_set__trackedshapeattributeval_set"
-        ).values(
-            "id",
-            "frame",
-            "label_id",
-            "group",
-            "labeledtrackattributeval__spec_id",
-            "labeledtrackattributeval__value",
-            "labeledtrackattributeval__id",
-            "trackedshape__type",
-            "trackedshape__occluded",
-            "trackedshape__z_order",
-            "trackedshape__points",
-            "trackedshape__id",
-            "trackedshape__frame",
-            "trackedshape__outside",
-            "trackedshape__trackedshapeattributeval__spec_id",
-            "trackedshape__trackedshapeattributeval__value",
-            "trackedshape__trackedshapeattributeval__id",
-        ).order_by('id', 'trackedshape__frame')
-
-        db_tracks = _merge_table_rows(
-            rows=db_tracks,
-            keys_for_merge={
-                "labeledtrackattributeval_set": [
-                    "labeledtrackattributeval__spec_id",
-                    "labeledtrackattributeval__value",
-                    "labeledtrackattributeval__id",
-                ],
-                "trackedshape_set":[
-                    "trackedshape__type",
-                    "trackedshape__occluded",
-                    "trackedshape__z_order",
-                    "trackedshape__points",
-                    "trackedshape__id",
-                    "trackedshape__frame",
-                    "trackedshape__outside",
-                    "trackedshape__trackedshapeattributeval__spec_id",
-                    "trackedshape__trackedshapeattributeval__value",
-                    "trackedshape__trackedshapeattributeval__id",
-                ],
-            },
-            field_id="id",
-        )
-
-        for db_track in db_tracks:
-            db_track["trackedshape_set"] = _merge_table_rows(db_track["trackedshape_set"], {
-                'trackedshapeattributeval_set': [
-                    'trackedshapeattributeval__value',
-                    'trackedshapeattributeval__spec_id',
-                    'trackedshapeattributeval__id',
-                ]
-            }, 'id')
-
-            # A result table can consist many equal rows for track/shape attributes
-            # We need filter unique attributes manually
-            db_track["labeledtrackattributeval_set"] = list(set(db_track["labeledtrackattributeval_set"]))
-            self._extend_attributes(db_track.labeledtrackattributeval_set,
-                self.db_attributes[db_track.label_id]["immutable"].values())
-
-            default_attribute_values = self.db_attributes[db_track.label_id]["mutable"].values()
-            for db_shape in db_track["trackedshape_set"]:
-                db_shape["trackedshapeattributeval_set"] = list(
-                    set(db_shape["trackedshapeattributeval_set"])
-                )
-                # in case of trackedshapes need to interpolate attriute values and extend it
-                # by previous shape attribute values (not default values)
-                self._extend_attributes(db_shape["trackedshapeattributeval_set"], default_attribute_values)
-                default_attribute_values = db_shape["trackedshapeattributeval_set"]
-
-
-        serializer = serializers.LabeledTrackSerializer(db_tracks, many=True)
-        self.ir_data.tracks = serializer.data
-
-    def _init_version_from_db(self):
-        db_commit = self.db_job.commits.last()
-        self.ir_data.version = db_commit.version if db_commit else 0
-
     def init_from_db(self):
-        self._init_tags_from_db()
-        self._init_shapes_from_db()
-        self._init_tracks_from_db()
-        self._init_version_from_db()
+        loader = AnnotationLoader([self.db_job], self.db_attributes)
+        self.ir_data = loader.load()[self.db_job.id]
 
     @property
     def data(self):
@@ -662,7 +860,7 @@ class JobAnnotation:
 class TaskAnnotation:
     def __init__(self, pk, user):
         self.user = user
-        self.db_task = models.Task.objects.prefetch_related("data__images").get(id=pk)
+        self.db_task = models.Task.objects.select_related("data").get(id=pk)
 
         # Postgres doesn't guarantee an order by default without explicit order_by
         self.db_jobs = models.Job.objects.select_related("segment").filter(segment__task_id=pk).order_by('id')
@@ -686,8 +884,11 @@ class TaskAnnotation:
             _data = AnnotationIR()
             if action is None:
                 _data.data = put_job_data(jid, self.user, job_data)
-            else:
+            elif job_data.tags or job_data.shapes or job_data.tracks:
                 _data.data = patch_job_data(jid, self.user, job_data, action)
+            else:
+                # a patch doesn't touch jobs outside of its frames
+                continue
             if _data.version > self.ir_data.version:
                 self.ir_data.version = _data.version
             self._merge_data(_data, jobs[jid]["start"], self.db_task.overlap)
@@ -715,15 +916,23 @@ class TaskAnnotation:
     def init_from_db(self):
         self.reset()
 
-        for db_job in self.db_jobs:
-            annotation = JobAnnotation(db_job.id, self.user)
-            annotation.init_from_db()
-            if annotation.ir_data.version > self.ir_data.version:
-                self.ir_data.version = annotation.ir_data.version
+        # Lock all jobs of the task at once and load their annotations
+        # with a few queries. The lock is held till the end of the caller's
+        # transaction: get_task_data, dump_task_data and the dataset export
+        # all run inside transaction.atomic, as the per-job loading did.
+        db_jobs = list(self.db_jobs.select_for_update())
+        db_labels = self.db_task.label_set.prefetch_related("attributespec_set")
+        loader = AnnotationLoader(db_jobs, _get_db_attributes(db_labels))
+        jobs_data = loader.load()
+
+        for db_job in db_jobs:
+            job_data = jobs_data[db_job.id]
+            if job_data.version > self.ir_data.version:
+                self.ir_data.version = job_data.version
             db_segment = db_job.segment
             start_frame = db_segment.start_frame
             overlap = self.db_task.overlap
-            self._merge_data(annotation.ir_data, start_frame, overlap)
+            self._merge_data(job_data, start_frame, overlap)
 
     def dump(self, filename, dumper, scheme, host):
         anno_exporter = Annotation(
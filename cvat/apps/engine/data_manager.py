@@ -3,9 +3,12 @@
 # SPDX-License-Identifier: MIT
 
 import copy
+import itertools
 
 import numpy as np
 from scipy.optimize import linear_sum_assignment
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
 from shapely import geometry
 
 from . import models
@@ -61,6 +64,23 @@ class ObjectManager:
     def _calc_objects_similarity(obj0, obj1, start_frame, overlap):
         raise NotImplementedError()
 
+    @classmethod
+    def _calc_similarities(cls, objects0, objects1, start_frame, overlap):
+        # Returns indexes of object pairs with non-zero similarity and
+        # the similarity values. Subclasses can avoid checking all pairs.
+        rows, cols, similarities = [], [], []
+        for i, obj0 in enumerate(objects0):
+            for j, obj1 in enumerate(objects1):
+                similarity = cls._calc_objects_similarity(obj0, obj1,
+                    start_frame, overlap)
+                if similarity:
+                    rows.append(i)
+                    cols.append(j)
+                    similarities.append(similarity)
+
+        return np.array(rows, dtype=int), np.array(cols, dtype=int), \
+            np.array(similarities, dtype=float)
+
     @staticmethod
     def _unite_objects(obj0, obj1):
         raise NotImplementedError()
@@ -94,33 +114,28 @@ class ObjectManager:
             self.objects.extend(int_objects)
             return
 
-        # 4. Build cost matrix for each frame and find correspondence using
-        # Hungarian algorithm. In this case min_cost_thresh is stronger
-        # because we compare only on one frame.
+        # 4. Find correspondence for each frame. In this case min_cost_thresh
+        # is stronger because we compare only on one frame.
         min_cost_thresh = self._get_cost_threshold()
         for frame in int_objects_by_frame:
             if frame in old_objects_by_frame:
                 int_objects = int_objects_by_frame[frame]
                 old_objects = old_objects_by_frame[frame]
-                cost_matrix = np.empty(shape=(len(int_objects), len(old_objects)),
-                    dtype=float)
-                # 5.1 Construct cost matrix for the frame.
-                for i, int_obj in enumerate(int_objects):
-                    for j, old_obj in enumerate(old_objects):
-                        cost_matrix[i][j] = 1 - self._calc_objects_similarity(
-                            int_obj, old_obj, start_frame, overlap)
+
+                # 5. Compute costs only for pairs of objects which can be
+                # similar, all other pairs have the maximum cost.
+                rows, cols, similarities = self._calc_similarities(
+                    int_objects, old_objects, start_frame, overlap)
 
                 # 6. Find optimal solution using Hungarian algorithm.
-                row_ind, col_ind = linear_sum_assignment(cost_matrix)
                 old_objects_indexes = list(range(0, len(old_objects)))
                 int_objects_indexes = list(range(0, len(int_objects)))
-                for i, j in zip(row_ind, col_ind):
-                    # Reject the solution if the cost is too high. Remember
-                    # inside int_objects_indexes objects which were handled.
-                    if cost_matrix[i][j] <= min_cost_thresh:
-                        old_objects[j] = self._unite_objects(int_objects[i], old_objects[j])
-                        int_objects_indexes[i] = -1
-                        old_objects_indexes[j] = -1
+                for i, j in _find_matches(len(int_objects), len(old_objects),
+                        rows, cols, 1 - similarities, min_cost_thresh):
+                    # Remember inside int_objects_indexes objects which were handled.
+                    old_objects[j] = self._unite_objects(int_objects[i], old_objects[j])
+                    int_objects_indexes[i] = -1
+                    old_objects_indexes[j] = -1
 
                 # 7. Add all new objects which were not processed.
                 for i in int_objects_indexes:
@@ -137,6 +152,98 @@ class ObjectManager:
                 # We don't have old objects on the frame. Let's add all new ones.
                 self.objects.extend(int_objects_by_frame[frame])
 
+def _find_matches(size0, size1, rows, cols, costs, max_cost):
+    """
+    Finds the optimal assignment between two sets of objects with sparse costs
+    (pairs which are not listed have the cost 1). Only pairs with the cost
+    not greater than max_cost can be matched, so the Hungarian algorithm is
+    applied to each connected component of such pairs separately.
+    """
+
+    candidates = costs <= max_cost
+    rows, cols, costs = rows[candidates], cols[candidates], costs[candidates]
+    if not len(costs):
+        return []
+
+    graph = csr_matrix((np.ones(len(costs)), (rows, cols + size0)),
+        shape=(size0 + size1, size0 + size1))
+    _, labels = connected_components(graph, directed=False)
+
+    # Group objects and pairs by components
+    order = np.argsort(labels, kind='mergesort')
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    pair_order = np.argsort(labels[rows], kind='mergesort')
+    pair_bounds = np.searchsorted(labels[rows][pair_order],
+        labels[order][np.concatenate([[0], bounds])])
+    pair_bounds = np.append(pair_bounds, len(pair_order))
+
+    matches = []
+    for component, ids in enumerate(np.split(order, bounds)):
+        pairs = pair_order[pair_bounds[component]:pair_bounds[component + 1]]
+        if not len(pairs):
+            continue # a single object without candidates
+
+        ids0 = ids[ids < size0]
+        ids1 = ids[size0 <= ids] - size0
+        cost_matrix = np.ones(shape=(len(ids0), len(ids1)), dtype=float)
+        cost_matrix[np.searchsorted(ids0, rows[pairs]),
+            np.searchsorted(ids1, cols[pairs])] = costs[pairs]
+
+        row_ind, col_ind = linear_sum_assignment(cost_matrix)
+        for i, j in zip(row_ind, col_ind):
+            # Reject the solution if the cost is too high.
+            if cost_matrix[i][j] <= max_cost:
+                matches.append((ids0[i], ids1[j]))
+
+    return sorted(matches)
+
+def _get_bbox(points):
+    xs, ys = points[0::2], points[1::2]
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+def _find_box_intersections(boxes0, boxes1):
+    """
+    Returns indexes of all pairs of boxes with intersection of non-zero area.
+    Boxes are put into a uniform grid to avoid checking all pairs.
+    """
+
+    boxes0 = np.asarray(boxes0, dtype=float).reshape(-1, 4)
+    boxes1 = np.asarray(boxes1, dtype=float).reshape(-1, 4)
+    if not len(boxes0) or not len(boxes1):
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+
+    sizes = np.concatenate([boxes0[:, 2:] - boxes0[:, :2],
+        boxes1[:, 2:] - boxes1[:, :2]])
+    cell_size = max(np.median(sizes), 1)
+
+    grid = {}
+    for j, (x0, y0, x1, y1) in enumerate(np.floor(boxes1 / cell_size).astype(int).tolist()):
+        for cell in itertools.product(range(x0, x1 + 1), range(y0, y1 + 1)):
+            grid.setdefault(cell, []).append(j)
+
+    pairs = set()
+    for i, (x0, y0, x1, y1) in enumerate(np.floor(boxes0 / cell_size).astype(int).tolist()):
+        for cell in itertools.product(range(x0, x1 + 1), range(y0, y1 + 1)):
+            pairs.update((i, j) for j in grid.get(cell, ()))
+    if not pairs:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+
+    rows, cols = np.array(sorted(pairs), dtype=int).T
+    b0, b1 = boxes0[rows], boxes1[cols]
+    intersects = np.all(np.maximum(b0[:, :2], b1[:, :2]) <
+        np.minimum(b0[:, 2:], b1[:, 2:]), axis=1)
+
+    return rows[intersects], cols[intersects]
+
+def _calc_boxes_iou(boxes0, boxes1):
+    intersection = np.prod(np.clip(np.minimum(boxes0[:, 2:], boxes1[:, 2:]) -
+        np.maximum(boxes0[:, :2], boxes1[:, :2]), 0, None), axis=1)
+    area0 = np.prod(boxes0[:, 2:] - boxes0[:, :2], axis=1)
+    area1 = np.prod(boxes1[:, 2:] - boxes1[:, :2], axis=1)
+    union = area0 + area1 - intersection
+
+    return np.where(0 < union, intersection / np.where(0 < union, union, 1), 0)
+
 class TagManager(ObjectManager):
     @staticmethod
     def _get_cost_threshold():
@@ -190,28 +297,59 @@ class ShapeManager(ObjectManager):
         return 0.25
 
     @staticmethod
-    def _calc_objects_similarity(obj0, obj1, start_frame, overlap):
-        def _calc_polygons_similarity(p0, p1):
-            overlap_area = p0.intersection(p1).area
-            return overlap_area / (p0.area + p1.area - overlap_area)
+    def _calc_polygons_similarity(p0, p1):
+        overlap_area = p0.intersection(p1).area
+        union_area = p0.area + p1.area - overlap_area
+        return overlap_area / union_area if union_area else 0
 
+    @staticmethod
+    def _calc_objects_similarity(obj0, obj1, start_frame, overlap):
         has_same_type  = obj0["type"] == obj1["type"]
         has_same_label = obj0.get("label_id") == obj1.get("label_id")
         if has_same_type and has_same_label:
             if obj0["type"] == models.ShapeType.RECTANGLE:
-                p0 = geometry.box(*obj0["points"])
-                p1 = geometry.box(*obj1["points"])
+                p0 = geometry.box(*_get_bbox(obj0["points"]))
+                p1 = geometry.box(*_get_bbox(obj1["points"]))
 
-                return _calc_polygons_similarity(p0, p1)
+                return ShapeManager._calc_polygons_similarity(p0, p1)
             elif obj0["type"] == models.ShapeType.POLYGON:
                 p0 = geometry.Polygon(pairwise(obj0["points"]))
-                p1 = geometry.Polygon(pairwise(obj0["points"]))
+                p1 = geometry.Polygon(pairwise(obj1["points"]))
 
-                return _calc_polygons_similarity(p0, p1)
+                return ShapeManager._calc_polygons_similarity(p0, p1)
             else:
                 return 0 # FIXME: need some similarity for points and polylines
         return 0
 
+    @staticmethod
+    def _calc_similarities(objects0, objects1, start_frame, overlap):
+        # Only rectangles and polygons can be similar, and only if their
+        # bounding boxes intersect
+        def _is_comparable(obj0, obj1):
+            return obj0["type"] == obj1["type"] and \
+                obj0.get("label_id") == obj1.get("label_id") and \
+                obj0["type"] in [models.ShapeType.RECTANGLE, models.ShapeType.POLYGON]
+
+        boxes0 = np.array([_get_bbox(obj["points"]) for obj in objects0], dtype=float)
+        boxes1 = np.array([_get_bbox(obj["points"]) for obj in objects1], dtype=float)
+        rows, cols = _find_box_intersections(boxes0, boxes1)
+        comparable = np.array([_is_comparable(objects0[i], objects1[j])
+            for i, j in zip(rows, cols)], dtype=bool)
+        rows, cols = rows[comparable], cols[comparable]
+
+        similarities = np.zeros(len(rows), dtype=float)
+        is_rectangle = np.array([objects0[i]["type"] == models.ShapeType.RECTANGLE
+            for i in rows], dtype=bool)
+        if np.any(is_rectangle):
+            similarities[is_rectangle] = _calc_boxes_iou(
+                boxes0[rows[is_rectangle]], boxes1[cols[is_rectangle]])
+        for k in np.flatnonzero(~is_rectangle):
+            similarities[k] = ShapeManager._calc_objects_similarity(
+                objects0[rows[k]], objects1[cols[k]], start_frame, overlap)
+
+        nonzero = 0 < similarities
+        return rows[nonzero], cols[nonzero], similarities[nonzero]
+
     @staticmethod
     def _unite_objects(obj0, obj1):
         # TODO: improve the trivial implementation
@@ -229,7 +367,7 @@ class TrackManager(ObjectManager):
                 shape["label_id"] = track["label_id"]
                 shape["group"] = track["group"]
                 shape["track_id"] = idx
-                shape["attributes"] += track["attributes"]
+                shape["attributes"] = shape["attributes"] + track["attributes"]
                 shapes.append(shape)
         return shapes
 
@@ -253,34 +391,55 @@ class TrackManager(ObjectManager):
 
     @staticmethod
     def _calc_objects_similarity(obj0, obj1, start_frame, overlap):
-        if obj0["label_id"] == obj1["label_id"]:
-            # Here start_frame is the start frame of next segment
-            # and stop_frame is the stop frame of current segment
-            # end_frame == stop_frame + 1
-            end_frame = start_frame + overlap
-            obj0_shapes = TrackManager.get_interpolated_shapes(obj0, start_frame, end_frame)
-            obj1_shapes = TrackManager.get_interpolated_shapes(obj1, start_frame, end_frame)
-            obj0_shapes_by_frame = {shape["frame"]:shape for shape in obj0_shapes}
-            obj1_shapes_by_frame = {shape["frame"]:shape for shape in obj1_shapes}
-            assert obj0_shapes_by_frame and obj1_shapes_by_frame
-
-            count, error = 0, 0
-            for frame in range(start_frame, end_frame):
-                shape0 = obj0_shapes_by_frame.get(frame)
-                shape1 = obj1_shapes_by_frame.get(frame)
-                if shape0 and shape1:
-                    if shape0["outside"] != shape1["outside"]:
-                        error += 1
-                    else:
-                        error += 1 - ShapeManager._calc_objects_similarity(shape0, shape1, start_frame, overlap)
-                    count += 1
-                elif shape0 or shape1:
-                    error += 1
-                    count += 1
-
-            return 1 - error / count
-        else:
-            return 0
+        rows, cols, similarities = TrackManager._calc_similarities(
+            [obj0], [obj1], start_frame, overlap)
+        return similarities[0] if len(similarities) else 0
+
+    @staticmethod
+    def _calc_similarities(objects0, objects1, start_frame, overlap):
+        # Here start_frame is the start frame of next segment
+        # and stop_frame is the stop frame of current segment
+        # end_frame == stop_frame + 1
+        end_frame = start_frame + overlap
+
+        def _get_shapes_by_frame(objects):
+            shapes_by_frame = [{} for _ in objects]
+            for idx, obj in enumerate(objects):
+                for shape in TrackManager.get_interpolated_shapes(obj, start_frame, end_frame):
+                    if start_frame <= shape["frame"] < end_frame:
+                        shapes_by_frame[idx][shape["frame"]] = shape
+            return shapes_by_frame
+
+        shapes_by_frame0 = _get_shapes_by_frame(objects0)
+        shapes_by_frame1 = _get_shapes_by_frame(objects1)
+
+        # A frame adds to the similarity of two tracks only if both tracks
+        # have shapes with the same "outside" value on it. Compare such
+        # shapes for each frame at once.
+        total = {}
+        for frame in range(start_frame, end_frame):
+            ids0 = [idx for idx, shapes in enumerate(shapes_by_frame0) if frame in shapes]
+            ids1 = [idx for idx, shapes in enumerate(shapes_by_frame1) if frame in shapes]
+            shapes0 = [shapes_by_frame0[idx][frame] for idx in ids0]
+            shapes1 = [shapes_by_frame1[idx][frame] for idx in ids1]
+            for i, j, similarity in zip(*ShapeManager._calc_similarities(
+                    shapes0, shapes1, start_frame, overlap)):
+                obj0, obj1 = objects0[ids0[i]], objects1[ids1[j]]
+                if obj0["label_id"] == obj1["label_id"] and \
+                        shapes0[i]["outside"] == shapes1[j]["outside"]:
+                    key = (ids0[i], ids1[j])
+                    total[key] = total.get(key, 0) + similarity
+
+        # Each frame with at least one of the shapes counts
+        rows, cols, similarities = [], [], []
+        for (i, j), similarity in sorted(total.items()):
+            count = len(shapes_by_frame0[i].keys() | shapes_by_frame1[j].keys())
+            rows.append(i)
+            cols.append(j)
+            similarities.append(similarity / count)
+
+        return np.array(rows, dtype=int), np.array(cols, dtype=int), \
+            np.array(similarities, dtype=float)
 
     @staticmethod
     def _modify_unmached_object(obj, end_frame):
@@ -302,26 +461,71 @@ class TrackManager(ObjectManager):
 
     @staticmethod
     def normalize_shape(shape):
-        points = list(shape["points"])
-        if len(points) == 2:
-            points.extend(points) # duplicate points for single point case
-        points = np.asarray(points).reshape(-1, 2)
-        broken_line = geometry.LineString(points)
-        points = []
-        for off in range(0, 100, 1):
-            p = broken_line.interpolate(off / 100, True)
-            points.append(p.x)
-            points.append(p.y)
+        points = np.asarray(shape["points"], dtype=float).reshape(-1, 2)
+        if len(points) == 1:
+            points = np.concatenate([points, points]) # duplicate points for single point case
+        points = TrackManager._resample_line(points, 100)
 
         shape = copy.copy(shape)
-        shape["points"] = points
+        shape["points"] = points.flatten().tolist()
 
         return shape
 
+    @staticmethod
+    def _resample_line(points, count):
+        # Take `count` points evenly spaced along the broken line
+        # (arc-length parametrization), starting from the first point.
+        lengths = np.hypot(*np.diff(points, axis=0).T)
+        distances = np.concatenate([[0], np.cumsum(lengths)])
+        offsets = np.arange(count) / count * distances[-1]
+        return np.stack([
+            np.interp(offsets, distances, points[:, 0]),
+            np.interp(offsets, distances, points[:, 1]),
+        ], axis=1)
+
+    @staticmethod
+    def _simplify_lines(lines, tolerance):
+        # Douglas-Peucker simplification of a batch of broken lines with
+        # the same number of points (array of shape frames x points x 2).
+        # All lines and all their subdivisions are processed at once;
+        # returns a mask of points to keep.
+        frame_count, point_count = lines.shape[:2]
+        keep = np.zeros((frame_count, point_count), dtype=bool)
+        keep[:, [0, -1]] = True
+        if point_count <= 2:
+            return keep
+
+        x, y = lines[..., 0], lines[..., 1]
+        indices = np.arange(point_count)
+        rows = np.arange(frame_count)[:, None]
+        while True:
+            # For every point find the kept points which surround it
+            start = np.maximum.accumulate(np.where(keep, indices, 0), axis=1)
+            end = np.flip(np.minimum.accumulate(
+                np.flip(np.where(keep, indices, point_count - 1), axis=1), axis=1), axis=1)
+            ax, ay = x[rows, start], y[rows, start]
+            abx, aby = x[rows, end] - ax, y[rows, end] - ay
+            ab_len2 = abx * abx + aby * aby
+            t = ((x - ax) * abx + (y - ay) * aby) / np.where(ab_len2 == 0, 1, ab_len2)
+            t = np.clip(t, 0, 1)
+            dist = np.hypot(x - ax - abx * t, y - ay - aby * t)
+            dist[keep] = 0
+
+            # Keep the farthest point of each span if it is far enough.
+            # Each kept point opens a span, spans are contiguous in memory.
+            dist = dist.ravel()
+            span_starts = np.flatnonzero(keep)
+            span_ids = np.cumsum(keep.ravel()) - 1
+            max_dist = np.maximum.reduceat(dist, span_starts)
+            candidates = np.flatnonzero((dist == max_dist[span_ids]) & (dist > tolerance))
+            if not len(candidates):
+                return keep
+            _, first = np.unique(span_ids[candidates], return_index=True)
+            keep.ravel()[candidates[first]] = True
+
     @staticmethod
     def get_interpolated_shapes(track, start_frame, end_frame):
         def interpolate(shape0, shape1):
-            shapes = []
             is_same_type = shape0["type"] == shape1["type"]
             is_polygon = shape0["type"] == models.ShapeType.POLYGON
             is_polyline = shape0["type"] == models.ShapeType.POLYLINE
@@ -331,22 +535,26 @@ class TrackManager(ObjectManager):
                 shape1 = TrackManager.normalize_shape(shape1)
 
             distance = shape1["frame"] - shape0["frame"]
-            step = np.subtract(shape1["points"], shape0["points"]) / distance
-            for frame in range(shape0["frame"] + 1, shape1["frame"]):
-                off = frame - shape0["frame"]
-                if shape1["outside"]:
-                    points = np.asarray(shape0["points"]).reshape(-1, 2)
-                else:
-                    points = (shape0["points"] + step * off).reshape(-1, 2)
-                shape = copy.deepcopy(shape0)
-                if len(points) == 1:
-                    shape["points"] = points.flatten()
-                else:
-                    broken_line = geometry.LineString(points).simplify(0.05, False)
-                    shape["points"] = [x for p in broken_line.coords for x in p]
+            if distance <= 1:
+                return []
 
+            points0 = np.asarray(shape0["points"], dtype=float)
+            if shape1["outside"]:
+                lines = points0[None, :]
+            else:
+                step = (np.asarray(shape1["points"], dtype=float) - points0) / distance
+                offsets = np.arange(1, distance)
+                lines = points0 + step * offsets[:, None]
+            lines = lines.reshape(len(lines), -1, 2)
+            keep = TrackManager._simplify_lines(lines, 0.05)
+
+            shapes = []
+            for off in range(1, distance):
+                idx = 0 if shape1["outside"] else off - 1
+                shape = shape0.copy()
+                shape["points"] = lines[idx][keep[idx]].flatten().tolist()
                 shape["keyframe"] = False
-                shape["frame"] = frame
+                shape["frame"] = shape0["frame"] + off
                 shapes.append(shape)
             return shapes
 
@@ -360,9 +568,10 @@ class TrackManager(ObjectManager):
         for shape in track["shapes"]:
             if prev_shape:
                 assert shape["frame"] > curr_frame
+                spec_ids = set(attr["spec_id"] for attr in shape["attributes"])
                 for attr in prev_shape["attributes"]:
-                    if attr["spec_id"] not in map(lambda el: el["spec_id"], shape["attributes"]):
-                        shape["attributes"].append(copy.deepcopy(attr))
+                    if attr["spec_id"] not in spec_ids:
+                        shape["attributes"].append(attr)
                 if not prev_shape["outside"]:
                     shapes.extend(interpolate(prev_shape, shape))
 
@@ -2,16 +2,26 @@
 #
 # SPDX-License-Identifier: MIT
 
+import functools
+import hashlib
 import math
+import os
+import tempfile
+import threading
+from collections import OrderedDict
 from enum import Enum
 from io import BytesIO
 
+import av
+import cv2
 import numpy as np
+from django.conf import settings
 from PIL import Image
 
-from cvat.apps.engine.media_extractors import VideoReader, ZipReader
+from cvat.apps.engine.media_extractors import VideoChunkReader, VideoReader, ZipReader
 from cvat.apps.engine.mime_types import mimetypes
 from cvat.apps.engine.models import DataChoice
+from cvat.apps.engine.utils import prefetch as prefetch_iterable
 
 
 class RandomAccessIterator:
@@ -41,6 +51,137 @@ class RandomAccessIterator:
         self.iterator = iter(self.iterable)
         self.pos = -1
 
+class DecodedFrame:
+    """A decoded video frame of a chunk, which can be shared between requests"""
+
+    def __init__(self, frame, name, pos):
+        self.size = sum(plane.buffer_size for plane in frame.planes)
+        self._frame = frame
+        self._name = name
+        self._pos = pos
+
+    def get(self):
+        return self._frame, self._name, self._pos
+
+class CachedChunkReader:
+    """
+    Provides random access to frames of a video chunk through a cache of
+    decoded frames. The chunk is opened and read only on a cache miss, and
+    only the requested frames are kept, so a single frame request doesn't
+    decode the whole chunk. Image chunks keep encoded files, so there is
+    nothing to save by caching their frames.
+    """
+
+    def __init__(self, open_chunk, path, cache, cache_key):
+        self._open_chunk = open_chunk
+        self._reader = None
+        self._path = path
+        self._cache = cache
+        self._cache_key = cache_key
+
+    def _read_frame(self, idx):
+        if self._reader is None:
+            self._reader = self._open_chunk()
+        return DecodedFrame(*self._reader[idx])
+
+    def __getitem__(self, idx):
+        return self._cache.get(self._cache_key + (idx, ), self._path,
+            lambda _: self._read_frame(idx)).get()
+
+class EncodedFrame:
+    """A frame encoded into an image file format"""
+
+    def __init__(self, data, mime):
+        self.data = data
+        self.mime = mime
+        self.size = len(data)
+
+class ChunkCache:
+    """
+    Thread-safe LRU cache of items which depend on a chunk file (e.g. decoded
+    chunks) with a memory budget in bytes
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_file_version(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, key, path, loader):
+        # chunk files are immutable, but a data id can be reused after
+        # the data was removed, so the file version is a part of the entry
+        version = self._get_file_version(path)
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] == version:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+
+        chunk = loader(path)
+
+        with self._lock:
+            self._remove(key)
+            if chunk.size <= self.max_size:
+                self._items[key] = (version, chunk)
+                self.size += chunk.size
+                while self.max_size < self.size:
+                    self._remove(next(iter(self._items)))
+                    self.evictions += 1
+        return chunk
+
+    def _remove(self, key):
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.size -= item[1].size
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'max_size': self.max_size,
+                'items': len(self._items),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+_chunk_cache = None
+_chunk_cache_lock = threading.Lock()
+
+def get_chunk_cache():
+    """Returns the process-wide cache of decoded frames of chunks"""
+    global _chunk_cache
+    with _chunk_cache_lock:
+        if _chunk_cache is None:
+            _chunk_cache = ChunkCache(settings.DECODED_CHUNK_CACHE_SIZE)
+    return _chunk_cache
+
+_frame_cache = None
+
+def get_frame_cache():
+    """Returns the process-wide cache of encoded frames"""
+    global _frame_cache
+    with _chunk_cache_lock:
+        if _frame_cache is None:
+            _frame_cache = ChunkCache(settings.ENCODED_FRAME_CACHE_SIZE)
+    return _frame_cache
+
 class FrameProvider:
     class Quality(Enum):
         COMPRESSED = 0
@@ -51,34 +192,68 @@ class FrameProvider:
         PIL = 1
         NUMPY_ARRAY = 2
 
+    # name: (PIL format, mime type, file extension)
+    IMAGE_FORMATS = {
+        'png': ('PNG', 'image/png', 'png'),
+        'jpeg': ('JPEG', 'image/jpeg', 'jpg'),
+        'webp': ('WEBP', 'image/webp', 'webp'),
+    }
+
     class ChunkLoader:
-        def __init__(self, reader_class, path_getter):
+        def __init__(self, reader_class, path_getter, cache=None, cache_key=None):
             self.chunk_id = None
+            self.use_cache = None
             self.chunk_reader = None
             self.reader_class = reader_class
             self.get_chunk_path = path_getter
+            self.cache = cache
+            self.cache_key = cache_key
 
-        def load(self, chunk_id):
-            if self.chunk_id != chunk_id:
+        def load(self, chunk_id, use_cache=True):
+            use_cache = bool(use_cache and self.reader_class is VideoReader and \
+                self.cache is not None and self.cache.max_size)
+            if self.chunk_id != chunk_id or self.use_cache != use_cache:
                 self.chunk_id = chunk_id
-                self.chunk_reader = RandomAccessIterator(
-                    self.reader_class([self.get_chunk_path(chunk_id)]))
+                self.use_cache = use_cache
+                chunk_path = self.get_chunk_path(chunk_id)
+                if use_cache:
+                    self.chunk_reader = CachedChunkReader(
+                        functools.partial(self._open_chunk, chunk_path),
+                        chunk_path, self.cache, self.cache_key + (chunk_id, ))
+                else:
+                    self.chunk_reader = self._open_chunk(chunk_path)
             return self.chunk_reader
 
-    def __init__(self, db_data):
+        def _open_chunk(self, chunk_path):
+            if self.reader_class is VideoReader:
+                index = VideoReader.load_index(chunk_path)
+                if index is not None:
+                    return VideoChunkReader(chunk_path, index)
+            return RandomAccessIterator(self.reader_class([chunk_path]))
+
+    def __init__(self, db_data, cache=None, frame_cache=None):
         self._db_data = db_data
         self._loaders = {}
+        if cache is None:
+            cache = get_chunk_cache()
+        if frame_cache is None:
+            frame_cache = get_frame_cache()
+        self._frame_cache = frame_cache
+        self._cache = cache
 
         reader_class = {
             DataChoice.IMAGESET: ZipReader,
             DataChoice.VIDEO: VideoReader,
         }
+        self._reader_class = reader_class
         self._loaders[self.Quality.COMPRESSED] = self.ChunkLoader(
             reader_class[db_data.compressed_chunk_type],
-            db_data.get_compressed_chunk_path)
+            db_data.get_compressed_chunk_path,
+            cache, (db_data.id, self.Quality.COMPRESSED))
         self._loaders[self.Quality.ORIGINAL] = self.ChunkLoader(
             reader_class[db_data.original_chunk_type],
-            db_data.get_original_chunk_path)
+            db_data.get_original_chunk_path,
+            cache, (db_data.id, self.Quality.ORIGINAL))
 
     def __len__(self):
         return self._db_data.size
@@ -124,18 +299,48 @@ class FrameProvider:
         else:
             raise Exception('unsupported output type')
 
+    def _get_loader(self, quality, scale=1):
+        # Downscaled renditions are made from compressed chunks
+        if scale == 1:
+            return self._loaders[quality]
+        if quality != self.Quality.COMPRESSED:
+            raise Exception('downscaled frames are available only for compressed quality')
+
+        key = (quality, scale)
+        if key not in self._loaders:
+            if scale not in self._db_data.get_scales():
+                raise Exception('requested scale is not available: {}'.format(scale))
+            self._loaders[key] = self.ChunkLoader(
+                self._reader_class[self._db_data.compressed_chunk_type],
+                functools.partial(self._db_data.get_scaled_chunk_path, scale=scale),
+                self._cache, (self._db_data.id, quality, scale))
+        return self._loaders[key]
+
     def get_preview(self):
         return self._db_data.get_preview_path()
 
-    def get_chunk(self, chunk_number, quality=Quality.ORIGINAL):
+    def get_chunk(self, chunk_number, quality=Quality.ORIGINAL, scale=1):
         chunk_number = self._validate_chunk_number(chunk_number)
-        return self._loaders[quality].get_chunk_path(chunk_number)
+        return self._get_loader(quality, scale).get_chunk_path(chunk_number)
+
+    def get_thumbnail_strip(self, chunk_number):
+        chunk_number = self._validate_chunk_number(chunk_number)
+        path = self._db_data.get_thumbnail_strip_path(chunk_number)
+        if not os.path.isfile(path):
+            raise Exception('thumbnails are not available for the chunk')
+        return path
 
     def get_frame(self, frame_number, quality=Quality.ORIGINAL,
-            out_type=Type.BUFFER):
+            out_type=Type.BUFFER, scale=1, use_cache=True):
+        """
+        Returns the frame and its mime type. Decoded video frames are shared
+        through the chunk cache, use_cache=False reads the frame from a chunk
+        reader of this provider, which suits sequential reading.
+        """
+
         _, chunk_number, frame_offset = self._validate_frame_number(frame_number)
-        loader = self._loaders[quality]
-        chunk_reader = loader.load(chunk_number)
+        loader = self._get_loader(quality, scale)
+        chunk_reader = loader.load(chunk_number, use_cache=use_cache)
         frame, frame_name, _ = chunk_reader[frame_offset]
 
         frame = self._convert_frame(frame, loader.reader_class, out_type)
@@ -143,6 +348,155 @@ class FrameProvider:
             return (frame, 'image/png')
         return (frame, mimetypes.guess_type(frame_name))
 
+    def _get_frame_source(self, frame_number, quality, scale):
+        # Returns the path of the chunk with the frame, which defines
+        # the version of all frame encodings
+        _, chunk_number, _ = self._validate_frame_number(frame_number)
+        return self._get_loader(quality, scale).get_chunk_path(chunk_number)
+
+    def get_frame_version(self, frame_number, quality=Quality.ORIGINAL,
+            image_format=None, scale=1):
+        """
+        Returns an entity tag and the modification time of the encoded frame.
+        They are computed without decoding and can be used to answer
+        conditional requests.
+        """
+
+        chunk_path = self._get_frame_source(frame_number, quality, scale)
+        stat = os.stat(chunk_path)
+        key = (self._db_data.id, int(frame_number), quality.name, scale, image_format,
+            stat.st_mtime_ns, stat.st_size)
+        etag = hashlib.md5(repr(key).encode()).hexdigest()
+        return etag, stat.st_mtime
+
+    def _get_frame_cache_path(self, frame_number, quality, scale, image_format):
+        rendition = quality.name.lower()
+        if scale != 1:
+            rendition += '_x{}'.format(scale)
+        return os.path.join(self._db_data.get_frame_cache_dirname(),
+            '{}_{}.{}'.format(rendition, frame_number,
+                self.IMAGE_FORMATS[image_format][2]))
+
+    def _encode_frame(self, frame, image_format, quality):
+        pil_format, mime, _ = self.IMAGE_FORMATS[image_format]
+        image = frame.to_image() if isinstance(frame, av.VideoFrame) else Image.open(frame)
+        options = {}
+        if pil_format in ('JPEG', 'WEBP'):
+            options['quality'] = self._db_data.image_quality \
+                if quality == self.Quality.COMPRESSED else 95
+        if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        buf = BytesIO()
+        image.save(buf, format=pil_format, **options)
+        return EncodedFrame(buf.getvalue(), mime)
+
+    def _load_encoded_frame(self, frame_number, quality, scale, image_format, chunk_path):
+        _, chunk_number, frame_offset = self._validate_frame_number(frame_number)
+        loader = self._get_loader(quality, scale)
+        if image_format is None:
+            if loader.reader_class is VideoReader:
+                image_format = 'png'
+            else:
+                # images are stored in a browser-friendly format already
+                frame, frame_name, _ = loader.load(chunk_number)[frame_offset]
+                return EncodedFrame(frame.getvalue(),
+                    mimetypes.guess_type(frame_name)[0])
+
+        cache_path = None
+        if settings.ENCODED_FRAME_DISK_CACHE:
+            cache_path = self._get_frame_cache_path(frame_number, quality, scale, image_format)
+            try:
+                # a cached file is valid only if it isn't older than the chunk
+                if os.stat(chunk_path).st_mtime_ns <= os.stat(cache_path).st_mtime_ns:
+                    with open(cache_path, 'rb') as f:
+                        return EncodedFrame(f.read(), self.IMAGE_FORMATS[image_format][1])
+            except FileNotFoundError:
+                pass
+
+        frame, _, _ = loader.load(chunk_number)[frame_offset]
+        encoded_frame = self._encode_frame(frame, image_format, quality)
+
+        if cache_path is not None:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path))
+            with os.fdopen(fd, 'wb') as f:
+                f.write(encoded_frame.data)
+            os.replace(tmp_path, cache_path)
+
+        return encoded_frame
+
+    def get_encoded_frame(self, frame_number, quality=Quality.ORIGINAL,
+            image_format=None, scale=1):
+        """
+        Returns the frame encoded into one of IMAGE_FORMATS. By default image
+        frames are returned as they are stored and video frames are encoded
+        into PNG. Encoded frames are cached in memory and, if
+        ENCODED_FRAME_DISK_CACHE is enabled, on disk.
+        """
+
+        if image_format is not None and image_format not in self.IMAGE_FORMATS:
+            raise Exception('unsupported image format: {}'.format(image_format))
+
+        frame_number = int(frame_number)
+        chunk_path = self._get_frame_source(frame_number, quality, scale)
+        load = lambda path: self._load_encoded_frame(frame_number, quality,
+            scale, image_format, path)
+        if self._frame_cache is not None and self._frame_cache.max_size:
+            return self._frame_cache.get(
+                (self._db_data.id, quality, scale, frame_number, image_format),
+                chunk_path, load)
+        return load(chunk_path)
+
     def get_frames(self, quality=Quality.ORIGINAL, out_type=Type.BUFFER):
+        # all frames are read once in order (e.g. on export), so they are
+        # not put to the cache, where they would evict the frames in use
         for idx in range(self._db_data.size):
-            yield self.get_frame(idx, quality=quality, out_type=out_type)
+            yield self.get_frame(idx, quality=quality, out_type=out_type,
+                use_cache=False)
+
+    @staticmethod
+    def _frame_to_bgr(frame, reader_class):
+        if reader_class is VideoReader:
+            return frame.to_ndarray(format='bgr24')
+        image = cv2.imdecode(np.frombuffer(frame.getbuffer(), dtype=np.uint8),
+            cv2.IMREAD_COLOR)
+        if image is None:
+            # the format isn't supported by OpenCV
+            image = np.array(Image.open(frame).convert('RGB'))[:, :, ::-1]
+        return image
+
+    def _read_frame_range(self, start_frame, stop_frame, quality):
+        loader = self._loaders[quality]
+        chunk_size = self._db_data.chunk_size
+        for chunk_number in range(start_frame // chunk_size, stop_frame // chunk_size + 1):
+            chunk_start = chunk_number * chunk_size
+            # chunks are read sequentially, so they are not put to the cache
+            reader = loader.reader_class([loader.get_chunk_path(chunk_number)],
+                start=max(start_frame - chunk_start, 0),
+                stop=min(stop_frame - chunk_start, chunk_size - 1))
+            for frame, _, _ in reader:
+                yield frame, loader.reader_class
+
+    def get_frame_range(self, start_frame, stop_frame, quality=Quality.ORIGINAL,
+            prefetch=False):
+        """
+        Iterates over frames from start_frame to stop_frame (included) and
+        yields (frame number, BGR numpy array) pairs. Reading starts from the
+        chunk with start_frame. With prefetch frames are decoded in a background
+        thread, which keeps up to a chunk of frames ready.
+        """
+
+        start_frame, _, _ = self._validate_frame_number(start_frame)
+        stop_frame, _, _ = self._validate_frame_number(stop_frame)
+
+        def decode():
+            frame_number = start_frame
+            for frame, reader_class in self._read_frame_range(
+                    start_frame, stop_frame, quality):
+                yield frame_number, self._frame_to_bgr(frame, reader_class)
+                frame_number += 1
+
+        frames = decode()
+        if prefetch:
+            frames = prefetch_iterable(frames, size=self._db_data.chunk_size)
+        return frames
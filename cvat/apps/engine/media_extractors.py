@@ -7,7 +7,10 @@ import tempfile
 import shutil
 import zipfile
 import io
+import json
+import tarfile
 from abc import ABC, abstractmethod
+from bisect import bisect_right
 
 import av
 import av.datasets
@@ -125,23 +128,97 @@ class DirectoryReader(ImageListReader):
         )
 
 class ArchiveReader(DirectoryReader):
+    """
+    Tar archives are read member by member without extraction. Member headers
+    are read in a single pass and only they are sorted. Image data of an
+    uncompressed tar is read by offset. A compressed tar can't be read by
+    offset without decompressing it repeatedly, so it is streamed in a single
+    pass when its members are stored in the sorted order. Otherwise, and for
+    other archives, the archive is extracted into a temporary directory.
+    """
+
     def __init__(self, source_path, step=1, start=0, stop=None):
-        self._tmp_dir = create_tmp_dir()
+        self._tmp_dir = None
         self._archive_source = source_path[0]
-        Archive(self._archive_source).extractall(self._tmp_dir)
-        super().__init__(
-            source_path=[self._tmp_dir],
-            step=step,
-            start=start,
-            stop=stop,
-        )
+        self._tar, compressed = self._open_tar(self._archive_source)
+        if self._tar is not None:
+            self._members = { os.path.normpath(member.name): member
+                for member in self._tar
+                if member.isfile() and get_mime(member.name) == 'image' }
+            # dicts keep the insertion order, i.e. the order of members
+            self._stream = compressed
+            if compressed and list(self._members) != sorted(self._members):
+                self._tar.close()
+                self._tar = None
+
+        if self._tar is not None:
+            ImageListReader.__init__(self,
+                source_path=list(self._members),
+                step=step,
+                start=start,
+                stop=stop,
+            )
+        else:
+            self._tmp_dir = create_tmp_dir()
+            Archive(self._archive_source).extractall(self._tmp_dir)
+            super().__init__(
+                source_path=[self._tmp_dir],
+                step=step,
+                start=start,
+                stop=stop,
+            )
+
+    @staticmethod
+    def _open_tar(path):
+        for mode, compressed in [('r:', False), ('r:*', True)]:
+            try:
+                return tarfile.open(path, mode=mode), compressed
+            except tarfile.ReadError:
+                pass
+        return None, False
 
     def __del__(self):
+        if self._tar is not None:
+            self._tar.close()
         delete_tmp_dir(self._tmp_dir)
 
+    def __iter__(self):
+        if self._tar is None or not self._stream:
+            yield from super().__iter__()
+            return
+
+        frames = range(self._start, self._stop, self._step)
+        with tarfile.open(self._archive_source, mode='r|*') as tar:
+            i = 0
+            for member in tar:
+                if i == self._stop:
+                    break
+                if not member.isfile() or \
+                        os.path.normpath(member.name) not in self._members:
+                    continue
+                if i in frames:
+                    image = io.BytesIO(tar.extractfile(member).read())
+                    yield (image, self.get_path(i), i)
+                i += 1
+
+    def get_image(self, i):
+        if self._tar is None:
+            return super().get_image(i)
+        member = self._members[self._source_path[i]]
+        return io.BytesIO(self._tar.extractfile(member).read())
+
     def get_path(self, i):
         base_dir = os.path.dirname(self._archive_source)
-        return os.path.join(base_dir, os.path.relpath(self._source_path[i], self._tmp_dir))
+        if self._tar is None:
+            return os.path.join(base_dir, os.path.relpath(self._source_path[i], self._tmp_dir))
+        return os.path.join(base_dir, self._source_path[i])
+
+    def get_preview(self):
+        return self._get_preview(Image.open(self.get_image(0)))
+
+    def get_image_size(self):
+        img = Image.open(self.get_image(0))
+        return img.width, img.height
 
 class PdfReader(DirectoryReader):
     def __init__(self, source_path, step=1, start=0, stop=None):
@@ -246,12 +323,97 @@ class VideoReader(IMediaReader):
         image = (next(iter(self)))[0]
         return image.width, image.height
 
+    @staticmethod
+    def get_index_path(path):
+        return path + '.index'
+
+    @classmethod
+    def save_index(cls, path):
+        """
+        Saves presentation timestamps of all frames of the video and
+        positions of its keyframes. Only packets are demuxed, nothing is decoded.
+        """
+        with av.open(path) as container:
+            stream = container.streams.video[0]
+            packets = sorted((packet.pts, packet.is_keyframe)
+                for packet in container.demux(stream) if packet.pts is not None)
+
+        index = {
+            'pts': [pts for pts, _ in packets],
+            'keyframes': [idx for idx, (_, is_key) in enumerate(packets) if is_key],
+        }
+        with open(cls.get_index_path(path), 'w') as index_file:
+            json.dump(index, index_file)
+
+    @classmethod
+    def load_index(cls, path):
+        index_path = cls.get_index_path(path)
+        if not os.path.exists(index_path):
+            return None
+        with open(index_path) as index_file:
+            return json.load(index_file)
+
+class VideoChunkReader:
+    """
+    Provides random access to frames of a video chunk. A requested frame is
+    decoded starting from the nearest preceding keyframe, the positions of
+    keyframes are taken from the index saved by VideoReader.save_index().
+    """
+
+    def __init__(self, path, index):
+        self._path = path
+        self._pts = index['pts']
+        self._keyframes = index['keyframes']
+        self._positions = { pts: idx for idx, pts in enumerate(self._pts) }
+        self._container = None
+        self._stream = None
+        self._frames = None
+        self.pos = -1
+
+    def __del__(self):
+        self.close()
+
+    def __len__(self):
+        return len(self._pts)
+
+    def _get_keyframe(self, idx):
+        return self._keyframes[max(0, bisect_right(self._keyframes, idx) - 1)]
+
+    def _seek(self, idx):
+        if self._container is None:
+            self._container = av.open(self._path)
+            self._stream = self._container.streams.video[0]
+            self._stream.thread_type = 'AUTO'
+        keyframe = self._get_keyframe(idx)
+        self._container.seek(self._pts[keyframe], stream=self._stream,
+            backward=True, any_frame=False)
+        self._frames = self._container.decode(self._stream)
+        self.pos = keyframe - 1
+
+    def __getitem__(self, idx):
+        assert 0 <= idx < len(self)
+        # decode sequentially only if it is cheaper than seeking
+        if self._frames is None or idx <= self.pos or \
+                self.pos < self._get_keyframe(idx) - 1:
+            self._seek(idx)
+        frame = None
+        while self.pos < idx:
+            frame = next(self._frames)
+            self.pos = self._positions.get(frame.pts, self.pos + 1)
+        return (frame, self._path, frame.pts)
+
+    def close(self):
+        if self._container is not None:
+            self._container.close()
+            self._container = None
+            self._frames = None
+
 class IChunkWriter(ABC):
     def __init__(self, quality):
         self._image_quality = quality
 
     @staticmethod
-    def _compress_image(image_path, quality):
+    def _compress_image(image_path, quality, scale=1):
         image = image_path.to_image() if isinstance(image_path, av.VideoFrame) else Image.open(image_path)
         # Ensure image data fits into 8bit per pixel before RGB conversion as PIL clips values on conversion
         if image.mode == "I":
@@ -262,6 +424,10 @@ class IChunkWriter(ABC):
             image = Image.fromarray(im_data.astype(np.int32))
         converted_image = image.convert('RGB')
         image.close()
+        if 1 < scale:
+            width, height = converted_image.size
+            converted_image = converted_image.resize(
+                (max(1, width // scale), max(1, height // scale)), Image.BILINEAR)
         buf = io.BytesIO()
         converted_image.save(buf, format='JPEG', quality=quality, optimize=True)
         buf.seek(0)
@@ -287,11 +453,15 @@ class ZipChunkWriter(IChunkWriter):
         return []
 
 class ZipCompressedChunkWriter(IChunkWriter):
+    def __init__(self, quality, scale=1):
+        super().__init__(quality)
+        self._scale = scale
+
     def save_as_chunk(self, images, chunk_path):
         image_sizes = []
         with zipfile.ZipFile(chunk_path, 'x') as zip_chunk:
             for idx, (image, _ , _) in enumerate(images):
-                w, h, image_buf = self._compress_image(image, self._image_quality)
+                w, h, image_buf = self._compress_image(image, self._image_quality, self._scale)
                 image_sizes.append((w, h))
                 arcname = '{:06d}.jpeg'.format(idx)
                 zip_chunk.writestr(arcname, image_buf.getvalue())
@@ -299,9 +469,15 @@ class ZipCompressedChunkWriter(IChunkWriter):
         return image_sizes
 
 class Mpeg4ChunkWriter(IChunkWriter):
-    def __init__(self, _):
+    def __init__(self, _, keyframe_interval=None):
         super().__init__(17)
         self._output_fps = 25
+        self._keyframe_interval = keyframe_interval
+
+    def _get_gop_options(self):
+        if self._keyframe_interval:
+            return { 'g': str(self._keyframe_interval) }
+        return {}
 
     @staticmethod
     def _create_av_container(path, w, h, rate, pix_format, options):
@@ -331,11 +507,13 @@ class Mpeg4ChunkWriter(IChunkWriter):
             options={
                 "crf": str(self._image_quality),
                 "preset": "ultrafast",
+                **self._get_gop_options(),
             },
         )
 
         self._encode_images(images, output_container, output_v_stream)
         output_container.close()
+        VideoReader.save_index(chunk_path)
         return [(input_w, input_h)]
 
     @staticmethod
@@ -353,10 +531,12 @@ class Mpeg4ChunkWriter(IChunkWriter):
             container.mux(packet)
 
 class Mpeg4CompressedChunkWriter(Mpeg4ChunkWriter):
-    def __init__(self, quality):
+    def __init__(self, quality, keyframe_interval=None, scale=1):
         # translate inversed range [1:100] to [0:51]
         self._image_quality = round(51 * (100 - quality) / 99)
         self._output_fps = 25
+        self._keyframe_interval = keyframe_interval
+        self._scale = scale
 
 
     def save_as_chunk(self, images, chunk_path):
@@ -369,6 +549,8 @@ class Mpeg4CompressedChunkWriter(Mpeg4ChunkWriter):
         downscale_factor = 1
         while input_h / downscale_factor >= 1080:
             downscale_factor *= 2
+        # a scaled rendition is downscaled relative to the compressed one
+        downscale_factor *= self._scale
 
         output_h = input_h // downscale_factor
         output_w = input_w // downscale_factor
@@ -390,14 +572,55 @@ class Mpeg4CompressedChunkWriter(Mpeg4ChunkWriter):
                 'coder': '0',
                 'crf': str(self._image_quality),
                 'wpredp': '0',
-                'flags': '-loop'
+                'flags': '-loop',
+                **self._get_gop_options(),
             },
         )
 
         self._encode_images(images, output_container, output_v_stream)
         output_container.close()
+        VideoReader.save_index(chunk_path)
         return [(input_w, input_h)]
 
+class ThumbnailStripWriter(IChunkWriter):
+    """
+    Writes small copies of all chunk frames into a single JPEG image. Frames
+    are placed from left to right in cells of the same size, the cell width
+    is defined by the aspect ratio of the first frame.
+    """
+
+    def __init__(self, quality, height):
+        super().__init__(quality)
+        self._height = height
+
+    def save_as_chunk(self, images, chunk_path):
+        if not images:
+            raise Exception('no images to save')
+
+        cell_w, cell_h = None, self._height
+        strip = None
+        for idx, (image, _, _) in enumerate(images):
+            image = image.to_image() if isinstance(image, av.VideoFrame) else Image.open(image)
+            if strip is None:
+                cell_w = max(1, round(image.width * cell_h / image.height))
+                strip = Image.new('RGB', (cell_w * len(images), cell_h))
+            image = image.convert('RGB')
+            image.thumbnail((cell_w, cell_h), Image.BILINEAR)
+            strip.paste(image, (idx * cell_w + (cell_w - image.width) // 2,
+                (cell_h - image.height) // 2))
+            image.close()
+
+        strip.save(chunk_path, format='JPEG', quality=self._image_quality)
+        return []
+
+def save_as_chunks(images, chunks):
+    """
+    Saves the same images with several chunk writers. chunks is a list of
+    (writer, chunk_path) pairs. Returns results of all the writers. The function
+    doesn't depend on Django, so it can be called in a spawned worker process.
+    """
+    return [writer.save_as_chunk(images, chunk_path) for writer, chunk_path in chunks]
+
 def _is_archive(path):
     mime = mimetypes.guess_type(path)
     mime_type = mime[0]
@@ -74,6 +74,24 @@ class Data(models.Model):
     def get_original_cache_dirname(self):
         return os.path.join(self.get_data_dirname(), "original")
 
+    def get_frame_cache_dirname(self):
+        return os.path.join(self.get_data_dirname(), "frames")
+
+    def get_scaled_cache_dirname(self, scale):
+        return os.path.join(self.get_data_dirname(), "compressed_x{}".format(scale))
+
+    def get_thumbnail_cache_dirname(self):
+        return os.path.join(self.get_data_dirname(), "thumbnails")
+
+    def get_scales(self):
+        # Downscaled renditions of compressed chunks which were created
+        # for the data, 1 is the compressed rendition itself
+        scales = [1]
+        for scale in settings.FRAME_PYRAMID_SCALES:
+            if os.path.isdir(self.get_scaled_cache_dirname(scale)):
+                scales.append(scale)
+        return scales
+
     @staticmethod
     def _get_chunk_name(chunk_number, chunk_type):
         if chunk_type == DataChoice.VIDEO:
@@ -99,6 +117,14 @@ class Data(models.Model):
         return os.path.join(self.get_compressed_cache_dirname(),
             self._get_compressed_chunk_name(chunk_number))
 
+    def get_scaled_chunk_path(self, chunk_number, scale):
+        return os.path.join(self.get_scaled_cache_dirname(scale),
+            self._get_compressed_chunk_name(chunk_number))
+
+    def get_thumbnail_strip_path(self, chunk_number):
+        return os.path.join(self.get_thumbnail_cache_dirname(),
+            '{}.jpeg'.format(chunk_number))
+
     def get_preview_path(self):
         return os.path.join(self.get_data_dirname(), 'preview.jpeg')
 
@@ -374,6 +374,7 @@ class FrameMetaSerializer(serializers.Serializer):
 class DataMetaSerializer(serializers.ModelSerializer):
     frames = FrameMetaSerializer(many=True, allow_null=True)
     image_quality = serializers.IntegerField(min_value=0, max_value=100)
+    scales = serializers.ListField(child=serializers.IntegerField())
 
     class Meta:
         model = models.Data
@@ -385,6 +386,7 @@ class DataMetaSerializer(serializers.ModelSerializer):
             'stop_frame',
             'frame_filter',
             'frames',
+            'scales',
         )
         read_only_fields = (
             'chunk_size',
@@ -394,6 +396,7 @@ class DataMetaSerializer(serializers.ModelSerializer):
             'stop_frame',
             'frame_filter',
             'frames',
+            'scales',
         )
 
 class AttributeValSerializer(serializers.Serializer):
@@ -3,18 +3,28 @@
 #
 # SPDX-License-Identifier: MIT
 
+import functools
+import hashlib
 import itertools
+import multiprocessing
 import os
 import sys
+import threading
+import time
+import requests
 import rq
+from rq.registry import FailedJobRegistry
 import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from traceback import print_exception
-from urllib import error as urlerror
 from urllib import parse as urlparse
 from urllib import request as urlrequest
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
 
-from cvat.apps.engine.media_extractors import get_mime, MEDIA_TYPES, Mpeg4ChunkWriter, ZipChunkWriter, Mpeg4CompressedChunkWriter, ZipCompressedChunkWriter
+from cvat.apps.engine.media_extractors import get_mime, MEDIA_TYPES, Mpeg4ChunkWriter, ZipChunkWriter, Mpeg4CompressedChunkWriter, ZipCompressedChunkWriter, ThumbnailStripWriter, save_as_chunks
 from cvat.apps.engine.models import DataChoice
+from cvat.apps.engine.utils import prefetch
 
 import django_rq
 from django.conf import settings
@@ -40,6 +50,16 @@ def rq_handler(job, exc_type, exc_value, traceback):
         db_task = models.Task.objects.select_for_update().get(pk=tid)
         with open(db_task.get_log_path(), "wt") as log_file:
             print_exception(exc_type, exc_value, traceback, file=log_file)
+
+        if job.func_name == _create_thread.__module__ + '._create_thread':
+            attempt = job.meta.get('attempt', 0)
+            if attempt < settings.TASK_CREATION_RETRIES:
+                # the retried job continues the creation from the last committed chunk
+                job.meta['attempt'] = attempt + 1
+                job.save_meta()
+                FailedJobRegistry(job.origin, connection=job.connection).requeue(job)
+            else:
+                _remove_task_data(db_task)
     except models.Task.DoesNotExist:
         pass # skip exceptions in the code
 
@@ -176,149 +196,460 @@ def _validate_data(counter):
 
     return counter, task_modes[0]
 
-def _download_data(urls, upload_dir):
-    job = rq.get_current_job()
-    local_files = {}
-    for url in urls:
-        name = os.path.basename(urlrequest.url2pathname(urlparse.urlparse(url).path))
-        if name in local_files:
-            raise Exception("filename collision: {}".format(name))
-        slogger.glob.info("Downloading: {}".format(url))
-        job.meta['status'] = '{} is being downloaded..'.format(url)
-        job.save_meta()
+class _RemoteFilesDownloader:
+    """
+    Downloads remote files in a pool of threads with one HTTP session per
+    thread. Files are downloaded in the sorted order, so the first frames are
+    available as soon as possible. A broken download is retried with a range
+    request, which continues the partially downloaded file. If the url has
+    a '#<algorithm>=<hexdigest>' fragment (e.g. '#sha256=...'), the checksum
+    of the downloaded file is verified. Download threads only count progress,
+    the job meta is saved by the thread of the job, which also updates it.
+    """
+
+    ATTEMPTS = 3
+    BLOCK_SIZE = 64 * 1024
+    PROGRESS_UPDATE_INTERVAL = 1 # seconds
+
+    def __init__(self, urls, upload_dir, max_workers):
+        self.files = []
+        urls_by_name = {}
+        for url in urls:
+            name = os.path.basename(urlrequest.url2pathname(urlparse.urlparse(url).path))
+            if name in urls_by_name:
+                raise Exception("filename collision: {}".format(name))
+            urls_by_name[name] = url
+            self.files.append(name)
+
+        self._job = rq.get_current_job()
+        self._cancelled = threading.Event()
+        self._local = threading.local()
+        self._progress_lock = threading.Lock()
+        self._progress = {}
+        self._downloaded = 0
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._downloads = {}
+        for name in sorted(urls_by_name):
+            path = os.path.join(upload_dir, name)
+            self._downloads[path] = self._executor.submit(
+                self._download, urls_by_name[name], path)
+
+    def wait(self, path):
+        download = self._downloads.get(path)
+        if download is not None:
+            self._wait_for(download)
+
+    def wait_all(self):
+        for download in self._downloads.values():
+            self._wait_for(download)
+
+    def wait_for_frames(self, frames):
+        # frames can be read in a background thread, so the progress isn't saved here
+        for frame in frames:
+            download = self._downloads.get(frame[1])
+            if download is not None:
+                download.result()
+            yield frame
+
+    def get_progress(self):
+        with self._progress_lock:
+            return {
+                'total': len(self._downloads),
+                'downloaded': self._downloaded,
+                'progress': dict(self._progress),
+            }
+
+    def _wait_for(self, download):
+        while True:
+            try:
+                download.result(timeout=self.PROGRESS_UPDATE_INTERVAL)
+                break
+            except FutureTimeoutError:
+                self._save_progress()
+        self._save_progress()
+
+    def _save_progress(self):
+        if self._job is None:
+            return
+
+        self._job.meta['downloads'] = self.get_progress()
+        self._job.save_meta()
+
+    def close(self):
+        self._cancelled.set()
+        for download in self._downloads.values():
+            download.cancel()
+        self._executor.shutdown(wait=True)
+
+    def _get_session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers['User-Agent'] = 'Mozilla/5.0'
+            self._local.session = session
+        return session
+
+    @staticmethod
+    def _get_expected_digest(url):
+        fragment = urlparse.urlparse(url).fragment
+        algorithm, _, digest = fragment.partition('=')
+        if digest and algorithm.lower() in hashlib.algorithms_available:
+            return algorithm.lower(), digest.lower()
+        return None
+
+    @staticmethod
+    def _get_digest(path, algorithm):
+        file_hash = hashlib.new(algorithm)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                file_hash.update(block)
+        return file_hash.hexdigest()
+
+    def _download(self, url, path):
+        expected_digest = self._get_expected_digest(url)
+        if os.path.exists(path) and (expected_digest is None or
+                self._get_digest(path, expected_digest[0]) == expected_digest[1]):
+            # the file was downloaded by the previous run of the job
+            self._update_progress(path, None)
+            return
 
-        req = urlrequest.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
+        slogger.glob.info("Downloading: {}".format(url))
+        part_path = path + '.part'
+        for attempt in range(1, self.ATTEMPTS + 1):
+            try:
+                self._download_part(url, part_path)
+                break
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError,
+                    ProtocolError, ReadTimeoutError) as err:
+                if attempt == self.ATTEMPTS:
+                    raise Exception("Failed to download " + url + ". " + str(err))
+                slogger.glob.warning("Retry downloading of {}: {}".format(url, err))
+                time.sleep(attempt)
+
+        if expected_digest is not None:
+            digest = self._get_digest(part_path, expected_digest[0])
+            if digest != expected_digest[1]:
+                os.remove(part_path)
+                raise Exception("Failed to download " + url + ". " +
+                    "Checksum mismatch: {} != {}".format(digest, expected_digest[1]))
+
+        os.replace(part_path, path)
+        self._update_progress(path, None)
+
+    def _download_part(self, url, part_path):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = { 'Range': 'bytes={}-'.format(offset) } if offset else {}
         try:
-            with urlrequest.urlopen(req) as fp, open(os.path.join(upload_dir, name), 'wb') as tfp:
-                while True:
-                    block = fp.read(8192)
-                    if not block:
-                        break
-                    tfp.write(block)
-        except urlerror.HTTPError as err:
-            raise Exception("Failed to download " + url + ". " + str(err.code) + ' - ' + err.reason)
-        except urlerror.URLError as err:
-            raise Exception("Invalid URL: " + url + ". " + err.reason)
-
-        local_files[name] = True
-    return list(local_files.keys())
-
-@transaction.atomic
+            with self._get_session().get(url, headers=headers, stream=True,
+                    timeout=60) as response:
+                if offset and response.status_code == 416:
+                    return # the file has been downloaded completely
+                response.raise_for_status()
+                if response.status_code != 206:
+                    offset = 0 # the server doesn't support range requests
+
+                size = response.headers.get('Content-Length')
+                size = offset + int(size) if size is not None else None
+                with open(part_path, 'ab' if offset else 'wb') as part_file:
+                    for block in response.iter_content(self.BLOCK_SIZE):
+                        if self._cancelled.is_set():
+                            raise Exception("Downloading of {} is cancelled".format(url))
+                        part_file.write(block)
+                        offset += len(block)
+                        if size:
+                            self._update_progress(part_file.name, offset / size)
+        except requests.HTTPError as err:
+            raise Exception("Failed to download " + url + ". " +
+                str(err.response.status_code) + ' - ' + err.response.reason)
+        except (requests.exceptions.InvalidURL, requests.exceptions.MissingSchema,
+                requests.exceptions.InvalidSchema) as err:
+            raise Exception("Invalid URL: " + url + ". " + str(err))
+
+        if size is not None and offset < size:
+            raise requests.ConnectionError(
+                "Connection was broken: {} of {} bytes received".format(offset, size))
+
+    def _update_progress(self, path, progress):
+        name = os.path.basename(path)
+        if name.endswith('.part'):
+            name = name[:-len('.part')]
+        with self._progress_lock:
+            if progress is None:
+                self._progress.pop(name, None)
+                self._downloaded += 1
+            else:
+                self._progress[name] = round(progress * 100)
+
+def _save_chunks(chunks, db_data, original_chunk_writer, compressed_chunk_writer, workers,
+        extra_chunk_writers=()):
+    """
+    Writes original and compressed chunks and additional renditions of them
+    (extra_chunk_writers is a list of (writer, chunk path getter) pairs).
+    Yields (chunk_idx, chunk_data, img_sizes) in the order of chunks. If several
+    workers are requested, chunks are read in a background thread and image
+    chunks are encoded in a pool of processes. Video frames can't be passed to
+    other processes, so video chunking stays sequential: video chunks are
+    always encoded one by one in the current process, whatever the number of
+    workers is.
+    """
+    def get_chunk_writers(chunk_idx):
+        return [
+            (original_chunk_writer, db_data.get_original_chunk_path(chunk_idx)),
+            (compressed_chunk_writer, db_data.get_compressed_chunk_path(chunk_idx)),
+        ] + [(writer, get_chunk_path(chunk_idx))
+            for writer, get_chunk_path in extra_chunk_writers]
+
+    if 1 < workers:
+        chunks = prefetch(chunks, size=2)
+
+    if workers <= 1 or DataChoice.VIDEO in \
+            (db_data.original_chunk_type, db_data.compressed_chunk_type):
+        for chunk_idx, chunk_data in chunks:
+            img_sizes = save_as_chunks(chunk_data, get_chunk_writers(chunk_idx))[1]
+            yield chunk_idx, chunk_data, img_sizes
+        return
+
+    # Worker processes are spawned instead of forked, otherwise they
+    # share database connections and other resources with the RQ job
+    with multiprocessing.get_context('spawn').Pool(workers) as pool:
+        pending = deque()
+        for chunk_idx, chunk_data in chunks:
+            pending.append((chunk_idx, chunk_data, pool.apply_async(save_as_chunks,
+                (chunk_data, get_chunk_writers(chunk_idx)))))
+            if len(pending) < 2 * workers:
+                continue
+
+            chunk_idx, chunk_data, result = pending.popleft()
+            img_sizes = result.get()[1]
+            yield chunk_idx, chunk_data, img_sizes
+
+        # wait for the rest of chunks
+        while pending:
+            chunk_idx, chunk_data, result = pending.popleft()
+            img_sizes = result.get()[1]
+            yield chunk_idx, chunk_data, img_sizes
+
+def _get_extra_chunk_writers(db_data):
+    # Downscaled renditions of compressed chunks and thumbnail strips
+    writers = []
+    for scale in settings.FRAME_PYRAMID_SCALES:
+        if db_data.compressed_chunk_type == DataChoice.VIDEO:
+            writer = Mpeg4CompressedChunkWriter(db_data.image_quality,
+                keyframe_interval=settings.VIDEO_CHUNK_KEYFRAME_INTERVAL, scale=scale)
+        else:
+            writer = ZipCompressedChunkWriter(db_data.image_quality, scale=scale)
+        writers.append((writer, functools.partial(db_data.get_scaled_chunk_path, scale=scale)))
+    if settings.THUMBNAIL_STRIP_HEIGHT:
+        writers.append((ThumbnailStripWriter(db_data.image_quality, settings.THUMBNAIL_STRIP_HEIGHT),
+            db_data.get_thumbnail_strip_path))
+    return writers
+
+def _remove_chunks(db_data, start_chunk):
+    chunk_dirs = [db_data.get_compressed_cache_dirname(),
+        db_data.get_original_cache_dirname(), db_data.get_thumbnail_cache_dirname()]
+    chunk_dirs += [db_data.get_scaled_cache_dirname(scale)
+        for scale in settings.FRAME_PYRAMID_SCALES]
+    for chunk_dir in chunk_dirs:
+        if not os.path.isdir(chunk_dir):
+            continue
+        for chunk_name in os.listdir(chunk_dir):
+            chunk_idx = chunk_name.split('.', maxsplit=1)[0]
+            if chunk_idx.isdigit() and start_chunk <= int(chunk_idx):
+                os.remove(os.path.join(chunk_dir, chunk_name))
+
+def _remove_task_data(db_task):
+    # Removes frames committed by a failed task creation,
+    # so the task is left without data as it was before the creation
+    db_data = db_task.data
+    if db_task.segment_set.exists():
+        return
+
+    slogger.glob.info("Remove data of task #{} after failed creation".format(db_task.id))
+    models.Image.objects.filter(data=db_data).delete()
+    models.Video.objects.filter(data=db_data).delete()
+    _remove_chunks(db_data, 0)
+    db_data.size = 0
+    db_data.save()
+
+# Chunks and image rows are committed in batches, db_data.size is the number
+# of committed frames. A failed job is requeued by rq_handler and the creation
+# continues from the last committed chunk.
 def _create_thread(tid, data):
     slogger.glob.info("create task #{}".format(tid))
 
-    db_task = models.Task.objects.select_for_update().get(pk=tid)
+    db_task = models.Task.objects.get(pk=tid)
     db_data = db_task.data
-    if db_task.data.size != 0:
+    if db_data.size != 0 and db_task.segment_set.exists():
         raise NotImplementedError("Adding more data is not implemented")
 
     upload_dir = db_data.get_upload_dirname()
 
+    # downloading of remote files is continued in background while
+    # the data are being validated and chunks are being created
+    downloader = None
     if data['remote_files']:
-        data['remote_files'] = _download_data(data['remote_files'], upload_dir)
-
-    media = _count_files(data)
-    media, task_mode = _validate_data(media)
+        downloader = _RemoteFilesDownloader(data['remote_files'], upload_dir,
+            max_workers=settings.REMOTE_FILES_DOWNLOAD_WORKERS)
+        data['remote_files'] = downloader.files
 
-    if data['server_files']:
-        _copy_data_from_share(data['server_files'], upload_dir)
+    try:
+        media = _count_files(data)
+        media, task_mode = _validate_data(media)
 
-    job = rq.get_current_job()
-    job.meta['status'] = 'Media files are being extracted...'
-    job.save_meta()
+        if data['server_files']:
+            _copy_data_from_share(data['server_files'], upload_dir)
 
-    db_images = []
-    extractor = None
-
-    for media_type, media_files in media.items():
-        if media_files:
-            if extractor is not None:
-                raise Exception('Combined data types are not supported')
-            extractor = MEDIA_TYPES[media_type]['extractor'](
-                source_path=[os.path.join(upload_dir, f) for f in media_files],
-                step=db_data.get_frame_step(),
-                start=db_data.start_frame,
-                stop=data['stop_frame'],
-            )
-    db_task.mode = task_mode
-    db_data.compressed_chunk_type = models.DataChoice.VIDEO if task_mode == 'interpolation' and not data['use_zip_chunks'] else models.DataChoice.IMAGESET
-    db_data.original_chunk_type = models.DataChoice.VIDEO if task_mode == 'interpolation' else models.DataChoice.IMAGESET
-
-    def update_progress(progress):
-        progress_animation = '|/-\\'
-        if not hasattr(update_progress, 'call_counter'):
-            update_progress.call_counter = 0
-
-        status_template = 'Images are being compressed {}'
-        if progress:
-            current_progress = '{}%'.format(round(progress * 100))
-        else:
-            current_progress = '{}'.format(progress_animation[update_progress.call_counter])
-        job.meta['status'] = status_template.format(current_progress)
+        job = rq.get_current_job()
+        job.meta['status'] = 'Media files are being extracted...'
         job.save_meta()
-        update_progress.call_counter = (update_progress.call_counter + 1) % len(progress_animation)
 
-    compressed_chunk_writer_class = Mpeg4CompressedChunkWriter if db_data.compressed_chunk_type == DataChoice.VIDEO else ZipCompressedChunkWriter
-    original_chunk_writer_class = Mpeg4ChunkWriter if db_data.original_chunk_type == DataChoice.VIDEO else ZipChunkWriter
-
-    compressed_chunk_writer = compressed_chunk_writer_class(db_data.image_quality)
-    original_chunk_writer = original_chunk_writer_class(100)
+        if downloader is not None:
+            if media['image']:
+                # images are read one by one, so a frame can be processed
+                # as soon as its file is downloaded
+                downloader.wait(os.path.join(upload_dir, sorted(media['image'])[0]))
+            else:
+                downloader.wait_all()
 
-    # calculate chunk size if it isn't specified
-    if db_data.chunk_size is None:
-        if isinstance(compressed_chunk_writer, ZipCompressedChunkWriter):
-            w, h = extractor.get_image_size()
-            area = h * w
-            db_data.chunk_size = max(2, min(72, 36 * 1920 * 1080 // area))
+        db_images = []
+        extractor = None
+
+        for media_type, media_files in media.items():
+            if media_files:
+                if extractor is not None:
+                    raise Exception('Combined data types are not supported')
+                extractor = MEDIA_TYPES[media_type]['extractor'](
+                    source_path=[os.path.join(upload_dir, f) for f in media_files],
+                    step=db_data.get_frame_step(),
+                    start=db_data.start_frame,
+                    stop=data['stop_frame'],
+                )
+        db_task.mode = task_mode
+        db_data.compressed_chunk_type = models.DataChoice.VIDEO if task_mode == 'interpolation' and not data['use_zip_chunks'] else models.DataChoice.IMAGESET
+        db_data.original_chunk_type = models.DataChoice.VIDEO if task_mode == 'interpolation' else models.DataChoice.IMAGESET
+
+        def update_progress(progress):
+            progress_animation = '|/-\\'
+            if not hasattr(update_progress, 'call_counter'):
+                update_progress.call_counter = 0
+
+            status_template = 'Images are being compressed {}'
+            if progress:
+                current_progress = '{}%'.format(round(progress * 100))
+            else:
+                current_progress = '{}'.format(progress_animation[update_progress.call_counter])
+            job.meta['status'] = status_template.format(current_progress)
+            if downloader is not None:
+                job.meta['downloads'] = downloader.get_progress()
+            job.save_meta()
+            update_progress.call_counter = (update_progress.call_counter + 1) % len(progress_animation)
+
+        compressed_chunk_writer_class = Mpeg4CompressedChunkWriter if db_data.compressed_chunk_type == DataChoice.VIDEO else ZipCompressedChunkWriter
+        original_chunk_writer_class = Mpeg4ChunkWriter if db_data.original_chunk_type == DataChoice.VIDEO else ZipChunkWriter
+
+        if db_data.compressed_chunk_type == DataChoice.VIDEO:
+            compressed_chunk_writer = compressed_chunk_writer_class(db_data.image_quality,
+                keyframe_interval=settings.VIDEO_CHUNK_KEYFRAME_INTERVAL)
         else:
-            db_data.chunk_size = 36
-
-    video_path = ""
-    video_size = (0, 0)
-
-    counter = itertools.count()
-    generator = itertools.groupby(extractor, lambda x: next(counter) // db_data.chunk_size)
-    for chunk_idx, chunk_data in generator:
-        chunk_data = list(chunk_data)
-        original_chunk_path = db_data.get_original_chunk_path(chunk_idx)
-        original_chunk_writer.save_as_chunk(chunk_data, original_chunk_path)
-
-        compressed_chunk_path = db_data.get_compressed_chunk_path(chunk_idx)
-        img_sizes = compressed_chunk_writer.save_as_chunk(chunk_data, compressed_chunk_path)
-
-        if db_task.mode == 'annotation':
-            db_images.extend([
-                models.Image(
-                    data=db_data,
-                    path=os.path.relpath(data[1], upload_dir),
-                    frame=data[2],
-                    width=size[0],
-                    height=size[1])
-
-                for data, size in zip(chunk_data, img_sizes)
-            ])
+            compressed_chunk_writer = compressed_chunk_writer_class(db_data.image_quality)
+        if db_data.original_chunk_type == DataChoice.VIDEO:
+            original_chunk_writer = original_chunk_writer_class(100,
+                keyframe_interval=settings.VIDEO_CHUNK_KEYFRAME_INTERVAL)
         else:
-            video_size = img_sizes[0]
-            video_path = chunk_data[0][1]
-
-        db_data.size += len(chunk_data)
-        progress = extractor.get_progress(chunk_data[-1][2])
-        update_progress(progress)
+            original_chunk_writer = original_chunk_writer_class(100)
+
+        # calculate chunk size if it isn't specified
+        if db_data.chunk_size is None:
+            if isinstance(compressed_chunk_writer, ZipCompressedChunkWriter):
+                w, h = extractor.get_image_size()
+                area = h * w
+                db_data.chunk_size = max(2, min(72, 36 * 1920 * 1080 // area))
+            else:
+                db_data.chunk_size = 36
+
+        video_path = ""
+        video_size = (0, 0)
+
+        # committed frames always form complete chunks
+        start_chunk = db_data.size // db_data.chunk_size
+        if start_chunk:
+            slogger.glob.info("Resume creation of task #{} from chunk #{}".format(
+                tid, start_chunk))
+        _remove_chunks(db_data, start_chunk)
+
+        extra_chunk_writers = _get_extra_chunk_writers(db_data)
+        for scale in settings.FRAME_PYRAMID_SCALES:
+            os.makedirs(db_data.get_scaled_cache_dirname(scale), exist_ok=True)
+        if settings.THUMBNAIL_STRIP_HEIGHT:
+            os.makedirs(db_data.get_thumbnail_cache_dirname(), exist_ok=True)
+
+        uncommitted_size = 0
+        def commit():
+            nonlocal db_images, uncommitted_size
+            with transaction.atomic():
+                models.Image.objects.bulk_create(db_images)
+                db_data.size += uncommitted_size
+                db_data.save()
+            db_images = []
+            uncommitted_size = 0
+
+        frames = extractor
+        if downloader is not None:
+            frames = downloader.wait_for_frames(extractor)
+
+        counter = itertools.count()
+        generator = itertools.groupby(frames, lambda x: next(counter) // db_data.chunk_size)
+        generator = ((chunk_idx, list(chunk_data)) for chunk_idx, chunk_data in generator
+            if start_chunk <= chunk_idx)
+        generator = _save_chunks(generator, db_data,
+            original_chunk_writer, compressed_chunk_writer,
+            workers=settings.CHUNK_CREATION_WORKERS,
+            extra_chunk_writers=extra_chunk_writers)
+        for chunk_idx, chunk_data, img_sizes in generator:
+            if db_task.mode == 'annotation':
+                db_images.extend([
+                    models.Image(
+                        data=db_data,
+                        path=os.path.relpath(data[1], upload_dir),
+                        frame=data[2],
+                        width=size[0],
+                        height=size[1])
+
+                    for data, size in zip(chunk_data, img_sizes)
+                ])
+            else:
+                video_size = img_sizes[0]
+                video_path = chunk_data[0][1]
+
+            uncommitted_size += len(chunk_data)
+            if settings.TASK_CREATION_COMMIT_SIZE <= uncommitted_size:
+                commit()
+            progress = extractor.get_progress(chunk_data[-1][2])
+            update_progress(progress)
+
+        commit()
+
+        with transaction.atomic():
+            if db_task.mode == 'interpolation':
+                if not video_path: # all chunks were saved by the previous run
+                    frame, video_path, _ = next(iter(extractor))
+                    video_size = (frame.width, frame.height)
+                models.Video.objects.create(
+                    data=db_data,
+                    path=os.path.relpath(video_path, upload_dir),
+                    width=video_size[0], height=video_size[1])
 
-    if db_task.mode == 'annotation':
-        models.Image.objects.bulk_create(db_images)
-        db_images = []
-    else:
-        models.Video.objects.create(
-            data=db_data,
-            path=os.path.relpath(video_path, upload_dir),
-            width=video_size[0], height=video_size[1])
+            if db_data.stop_frame == 0:
+                db_data.stop_frame = db_data.start_frame + (db_data.size - 1) * db_data.get_frame_step()
 
-    if db_data.stop_frame == 0:
-        db_data.stop_frame = db_data.start_frame + (db_data.size - 1) * db_data.get_frame_step()
+            preview = extractor.get_preview()
+            preview.save(db_data.get_preview_path())
 
-    preview = extractor.get_preview()
-    preview.save(db_data.get_preview_path())
+            slogger.glob.info("Founded frames {} for Data #{}".format(db_data.size, db_data.id))
+            _save_task_to_db(db_task)
 
-    slogger.glob.info("Founded frames {} for Data #{}".format(db_data.size, db_data.id))
-    _save_task_to_db(db_task)
+    finally:
+        if downloader is not None:
+            downloader.close()
@@ -0,0 +1,290 @@
+# Copyright (C) 2020 Intel Corporation
+#
+# SPDX-License-Identifier: MIT
+
+import os
+import shutil
+
+from django.test import TestCase
+
+from cvat.apps.engine import annotation, models
+from cvat.apps.engine.serializers import LabeledDataSerializer
+
+
+def _serialize(tags=(), shapes=(), tracks=()):
+    serializer = LabeledDataSerializer(data={'version': 0,
+        'tags': list(tags), 'shapes': list(shapes), 'tracks': list(tracks)})
+    serializer.is_valid(raise_exception=True)
+    return serializer.data
+
+def _attr(spec, value):
+    return {'spec_id': spec.id, 'value': value}
+
+def _shape(frame, points, label, attributes=(), shape_id=None):
+    shape = {'type': 'rectangle', 'occluded': False, 'z_order': 0,
+        'points': points, 'frame': frame, 'label_id': label.id, 'group': 0,
+        'attributes': list(attributes)}
+    if shape_id is not None:
+        shape['id'] = shape_id
+    return shape
+
+def _tracked_shape(frame, points, attributes=(), shape_id=None, outside=False):
+    shape = {'type': 'rectangle', 'occluded': False, 'z_order': 0,
+        'points': points, 'frame': frame, 'outside': outside,
+        'attributes': list(attributes)}
+    if shape_id is not None:
+        shape['id'] = shape_id
+    return shape
+
+def _track(frame, label, shapes, attributes=(), track_id=None):
+    track = {'frame': frame, 'label_id': label.id, 'group': 0,
+        'attributes': list(attributes), 'shapes': list(shapes)}
+    if track_id is not None:
+        track['id'] = track_id
+    return track
+
+def _tag(frame, label, attributes=(), tag_id=None):
+    tag = {'frame': frame, 'label_id': label.id, 'group': 0,
+        'attributes': list(attributes)}
+    if tag_id is not None:
+        tag['id'] = tag_id
+    return tag
+
+def _normalize(data):
+    def sort_attributes(objects):
+        for obj in objects:
+            obj['attributes'].sort(key=lambda attr: attr['spec_id'])
+            sort_attributes(obj.get('shapes', []))
+        return sorted(objects, key=lambda obj: (obj['frame'], obj['id']))
+
+    return {'version': data['version'], 'tags': sort_attributes(data['tags']),
+        'shapes': sort_attributes(data['shapes']),
+        'tracks': sort_attributes(data['tracks'])}
+
+class _AnnotationTestBase(TestCase):
+    def setUp(self):
+        db_data = models.Data.objects.create(size=10, stop_frame=9)
+        self.db_task = models.Task.objects.create(name='task', data=db_data,
+            mode='annotation', overlap=1, segment_size=5)
+        shutil.rmtree(self.db_task.get_task_dirname(), ignore_errors=True)
+        os.makedirs(self.db_task.get_task_logs_dirname())
+        self.label = models.Label.objects.create(task=self.db_task, name='car')
+        self.color = models.AttributeSpec.objects.create(label=self.label,
+            name='color', mutable=False, input_type='select',
+            default_value='red', values='red\ngreen')
+        self.speed = models.AttributeSpec.objects.create(label=self.label,
+            name='speed', mutable=True, input_type='number',
+            default_value='0', values='0\n100\n1')
+
+        self.jobs = []
+        for start_frame, stop_frame in [(0, 5), (5, 9)]:
+            db_segment = models.Segment.objects.create(task=self.db_task,
+                start_frame=start_frame, stop_frame=stop_frame)
+            self.jobs.append(models.Job.objects.create(segment=db_segment).id)
+        self.jid = self.jobs[0]
+
+class JobAnnotationTest(_AnnotationTestBase):
+    def _get(self, jid=None):
+        return annotation.get_job_data(jid or self.jid, None)
+
+    def test_can_create_annotations(self):
+        data = annotation.patch_job_data(self.jid, None, _serialize(
+            tags=[_tag(0, self.label, [_attr(self.color, 'green')])],
+            shapes=[_shape(1, [0, 0, 10, 10], self.label, [_attr(self.speed, '5')])],
+            tracks=[_track(2, self.label, [
+                _tracked_shape(2, [0, 0, 5, 5], [_attr(self.speed, '1')]),
+                _tracked_shape(4, [5, 5, 10, 10], outside=True),
+            ], [_attr(self.color, 'green')])],
+        ), annotation.PatchAction.CREATE)
+
+        self.assertEqual(data['version'], 1)
+        loaded = self._get()
+        self.assertEqual([tag['id'] for tag in loaded['tags']],
+            [tag['id'] for tag in data['tags']])
+        self.assertEqual(loaded['shapes'][0]['id'], data['shapes'][0]['id'])
+        self.assertEqual(loaded['shapes'][0]['points'], [0, 0, 10, 10])
+        self.assertEqual([s['id'] for s in loaded['tracks'][0]['shapes']],
+            [s['id'] for s in data['tracks'][0]['shapes']])
+        self.assertEqual(loaded['tracks'][0]['attributes'],
+            [_attr(self.color, 'green')])
+        self.assertEqual(loaded['tracks'][0]['shapes'][1]['attributes'],
+            [_attr(self.speed, '1')])
+
+    def test_update_keeps_ids_and_applies_attribute_changes(self):
+        data = annotation.patch_job_data(self.jid, None, _serialize(
+            shapes=[_shape(1, [0, 0, 10, 10], self.label,
+                [_attr(self.color, 'red'), _attr(self.speed, '5')])],
+        ), annotation.PatchAction.CREATE)
+        shape_id = data['shapes'][0]['id']
+
+        annotation.patch_job_data(self.jid, None, _serialize(
+            shapes=[_shape(1, [1, 1, 10, 10], self.label,
+                [_attr(self.color, 'green')], shape_id=shape_id)],
+        ), annotation.PatchAction.UPDATE)
+
+        db_shape = models.LabeledShape.objects.get(job_id=self.jid)
+        self.assertEqual(db_shape.id, shape_id)
+        self.assertEqual(db_shape.points, [1, 1, 10, 10])
+        # the value of speed is removed, so the default one is returned
+        self.assertEqual(list(db_shape.labeledshapeattributeval_set
+            .values_list('spec_id', 'value')), [(self.color.id, 'green')])
+        self.assertEqual(self._get()['shapes'][0]['attributes'],
+            [_attr(self.color, 'green'), _attr(self.speed, '0')])
+
+    def test_update_adds_and_removes_track_shapes(self):
+        data = annotation.patch_job_data(self.jid, None, _serialize(
+            tracks=[_track(0, self.label, [
+                _tracked_shape(0, [0, 0, 5, 5], [_attr(self.speed, '1')]),
+                _tracked_shape(2, [1, 1, 5, 5]),
+            ])],
+        ), annotation.PatchAction.CREATE)
+        track = data['tracks'][0]
+        kept_id, removed_id = [shape['id'] for shape in track['shapes']]
+
+        annotation.patch_job_data(self.jid, None, _serialize(
+            tracks=[_track(0, self.label, [
+                _tracked_shape(0, [0, 0, 5, 5], [_attr(self.speed, '2')],
+                    shape_id=kept_id),
+                _tracked_shape(3, [2, 2, 5, 5], [_attr(self.speed, '3')]),
+            ], track_id=track['id'])],
+        ), annotation.PatchAction.UPDATE)
+
+        db_shapes = models.TrackedShape.objects.filter(track_id=track['id']) \
+            .order_by('frame')
+        self.assertEqual([(s.frame, s.id == kept_id) for s in db_shapes],
+            [(0, True), (3, False)])
+        self.assertFalse(models.TrackedShape.objects.filter(id=removed_id).exists())
+        self.assertEqual([list(s.trackedshapeattributeval_set.values_list('value', flat=True))
+            for s in db_shapes], [['2'], ['3']])
+
+    def test_put_deletes_missing_objects(self):
+        data = annotation.patch_job_data(self.jid, None, _serialize(
+            tags=[_tag(0, self.label)],
+            shapes=[_shape(1, [0, 0, 1, 1], self.label),
+                _shape(2, [0, 0, 2, 2], self.label)],
+            tracks=[_track(0, self.label, [_tracked_shape(0, [0, 0, 5, 5])])],
+        ), annotation.PatchAction.CREATE)
+        kept_id = data['shapes'][0]['id']
+
+        annotation.put_job_data(self.jid, None, _serialize(
+            shapes=[_shape(1, [0, 0, 1, 1], self.label, shape_id=kept_id)],
+        ))
+
+        self.assertEqual(list(models.LabeledShape.objects.filter(job_id=self.jid)
+            .values_list('id', flat=True)), [kept_id])
+        self.assertFalse(models.LabeledImage.objects.filter(job_id=self.jid).exists())
+        self.assertFalse(models.LabeledTrack.objects.filter(job_id=self.jid).exists())
+        self.assertFalse(models.TrackedShape.objects.exists())
+
+    def test_ids_of_other_jobs_are_treated_as_new(self):
+        data = annotation.patch_job_data(self.jobs[1], None, _serialize(
+            shapes=[_shape(6, [0, 0, 1, 1], self.label)],
+        ), annotation.PatchAction.CREATE)
+        foreign_id = data['shapes'][0]['id']
+
+        annotation.put_job_data(self.jid, None, _serialize(
+            shapes=[_shape(1, [0, 0, 2, 2], self.label, shape_id=foreign_id)],
+        ))
+
+        foreign_shape = models.LabeledShape.objects.get(id=foreign_id)
+        self.assertEqual(foreign_shape.job_id, self.jobs[1])
+        self.assertEqual(foreign_shape.points, [0, 0, 1, 1])
+        db_shape = models.LabeledShape.objects.get(job_id=self.jid)
+        self.assertNotEqual(db_shape.id, foreign_id)
+        self.assertEqual(db_shape.points, [0, 0, 2, 2])
+
+    def test_can_delete_annotations(self):
+        data = annotation.patch_job_data(self.jid, None, _serialize(
+            shapes=[_shape(1, [0, 0, 1, 1], self.label),
+                _shape(2, [0, 0, 2, 2], self.label)],
+        ), annotation.PatchAction.CREATE)
+
+        annotation.patch_job_data(self.jid, None, _serialize(
+            shapes=[data['shapes'][0]],
+        ), annotation.PatchAction.DELETE)
+        self.assertEqual([shape['id'] for shape in self._get()['shapes']],
+            [data['shapes'][1]['id']])
+
+        annotation.delete_job_data(self.jid, None)
+        self.assertEqual(self._get()['shapes'], [])
+
+class TaskAnnotationTest(_AnnotationTestBase):
+    def test_can_load_annotations_of_all_jobs(self):
+        first = annotation.patch_job_data(self.jobs[0], None, _serialize(
+            tags=[_tag(1, self.label, [_attr(self.color, 'green')])],
+            shapes=[
+                _shape(0, [0, 0, 1, 1], self.label, [_attr(self.speed, '5')]),
+                _shape(5, [0, 0, 5, 5], self.label),
+            ],
+            tracks=[_track(2, self.label, [
+                _tracked_shape(2, [0, 0, 2, 2], [_attr(self.speed, '1')]),
+                _tracked_shape(3, [0, 0, 3, 3]),
+                _tracked_shape(4, [0, 0, 4, 4], [_attr(self.speed, '4')], outside=True),
+            ])],
+        ), annotation.PatchAction.CREATE)
+        annotation.patch_job_data(self.jobs[0], None, _serialize(
+            tags=[_tag(2, self.label)],
+        ), annotation.PatchAction.CREATE)
+        second = annotation.patch_job_data(self.jobs[1], None, _serialize(
+            shapes=[
+                # the same shape as in the overlapped frame of the first job
+                _shape(5, [0, 0, 5, 5], self.label),
+                _shape(7, [0, 0, 7, 7], self.label, [_attr(self.color, 'green')]),
+            ],
+        ), annotation.PatchAction.CREATE)
+
+        data = _normalize(annotation.get_task_data(self.db_task.id, None))
+
+        color, speed = self.color.id, self.speed.id
+        shape_ids = [shape['id'] for shape in first['shapes']]
+        track = first['tracks'][0]
+        self.assertEqual(data, {
+            'version': 2,
+            'tags': [
+                {'id': first['tags'][0]['id'], 'frame': 1, 'label_id': self.label.id,
+                    'group': 0, 'attributes': [
+                        {'spec_id': color, 'value': 'green'},
+                        {'spec_id': speed, 'value': '0'}]},
+                {'id': first['tags'][0]['id'] + 1, 'frame': 2, 'label_id': self.label.id,
+                    'group': 0, 'attributes': [
+                        {'spec_id': color, 'value': 'red'},
+                        {'spec_id': speed, 'value': '0'}]},
+            ],
+            'shapes': [
+                {'id': shape_ids[0], 'type': 'rectangle', 'frame': 0,
+                    'label_id': self.label.id, 'group': 0, 'occluded': False,
+                    'z_order': 0, 'points': [0, 0, 1, 1], 'attributes': [
+                        {'spec_id': color, 'value': 'red'},
+                        {'spec_id': speed, 'value': '5'}]},
+                # the shape of the overlapped frame is taken from the first job
+                {'id': shape_ids[1], 'type': 'rectangle', 'frame': 5,
+                    'label_id': self.label.id, 'group': 0, 'occluded': False,
+                    'z_order': 0, 'points': [0, 0, 5, 5], 'attributes': [
+                        {'spec_id': color, 'value': 'red'},
+                        {'spec_id': speed, 'value': '0'}]},
+                {'id': second['shapes'][1]['id'], 'type': 'rectangle', 'frame': 7,
+                    'label_id': self.label.id, 'group': 0, 'occluded': False,
+                    'z_order': 0, 'points': [0, 0, 7, 7], 'attributes': [
+                        {'spec_id': color, 'value': 'green'},
+                        {'spec_id': speed, 'value': '0'}]},
+            ],
+            'tracks': [
+                {'id': track['id'], 'frame': 2, 'label_id': self.label.id,
+                    'group': 0, 'attributes': [{'spec_id': color, 'value': 'red'}],
+                    'shapes': [
+                        {'id': track['shapes'][0]['id'], 'type': 'rectangle',
+                            'frame': 2, 'occluded': False, 'outside': False,
+                            'z_order': 0, 'points': [0, 0, 2, 2],
+                            'attributes': [{'spec_id': speed, 'value': '1'}]},
+                        # the mutable attribute is taken from the previous shape
+                        {'id': track['shapes'][1]['id'], 'type': 'rectangle',
+                            'frame': 3, 'occluded': False, 'outside': False,
+                            'z_order': 0, 'points': [0, 0, 3, 3],
+                            'attributes': [{'spec_id': speed, 'value': '1'}]},
+                        {'id': track['shapes'][2]['id'], 'type': 'rectangle',
+                            'frame': 4, 'occluded': False, 'outside': True,
+                            'z_order': 0, 'points': [0, 0, 4, 4],
+                            'attributes': [{'spec_id': speed, 'value': '4'}]},
+                    ]},
+            ],
+        })
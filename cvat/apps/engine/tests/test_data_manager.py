@@ -2,7 +2,7 @@
 #
 # SPDX-License-Identifier: MIT
 
-from cvat.apps.engine.data_manager import TrackManager
+from cvat.apps.engine.data_manager import ShapeManager, TrackManager
 
 from unittest import TestCase
 
@@ -36,4 +36,75 @@ class TrackManagerTest(TestCase):
 
         interpolated = TrackManager.get_interpolated_shapes(track, 0, 2)
 
-        self.assertEqual(len(interpolated), 3)
\ No newline at end of file
+        self.assertEqual(len(interpolated), 3)
+
+    def test_polygon_interpolation(self):
+        track = {
+            "frame": 0,
+            "label_id": 0,
+            "group": None,
+            "attributes": [],
+            "shapes": [
+                {
+                    "frame": 0,
+                    "points": [0.0, 0.0, 30.0, 0.0, 30.0, 70.0],
+                    "type": "polygon",
+                    "occluded": False,
+                    "outside": False,
+                    "attributes": [{"spec_id": 1, "value": "a"}]
+                },
+                {
+                    "frame": 2,
+                    "points": [10.0, 0.0, 40.0, 0.0, 40.0, 70.0],
+                    "type": "polygon",
+                    "occluded": False,
+                    "outside": False,
+                    "attributes": []
+                },
+            ]
+        }
+
+        interpolated = TrackManager.get_interpolated_shapes(track, 0, 2)
+
+        self.assertEqual(len(interpolated), 3)
+        self.assertFalse(interpolated[1]["keyframe"])
+        self.assertEqual(interpolated[1]["frame"], 1)
+        self.assertEqual(len(interpolated[1]["points"]), 6)
+        for actual, expected in zip(interpolated[1]["points"],
+                [5.0, 0.0, 35.0, 0.0, 35.0, 69.0]):
+            self.assertAlmostEqual(actual, expected)
+        self.assertEqual(interpolated[2]["attributes"], [{"spec_id": 1, "value": "a"}])
+
+
+class ShapeManagerTest(TestCase):
+    @staticmethod
+    def _make_shape(frame, shape_type, points, label_id=0):
+        return {
+            "frame": frame,
+            "label_id": label_id,
+            "group": 0,
+            "type": shape_type,
+            "points": points,
+            "occluded": False,
+            "z_order": 0,
+            "attributes": [],
+        }
+
+    def test_merge_overlapped_shapes(self):
+        old_shapes = [
+            self._make_shape(5, "rectangle", [0, 0, 10, 10]),
+            self._make_shape(5, "rectangle", [100, 100, 110, 110]),
+            self._make_shape(5, "polygon", [50, 50, 60, 50, 60, 60]),
+        ]
+        new_shapes = [
+            self._make_shape(5, "rectangle", [100.5, 100.5, 110.5, 110.5]),
+            self._make_shape(5, "rectangle", [0, 0, 10, 10], label_id=1),
+            self._make_shape(5, "polygon", [50, 50, 60, 50, 60, 61]),
+            self._make_shape(5, "polygon", [80, 80, 90, 80, 90, 90]),
+        ]
+
+        manager = ShapeManager(old_shapes)
+        manager.merge(new_shapes, 5, 1)
+
+        self.assertEqual(len(manager.objects), 5)
+        self.assertEqual(manager.objects[3:], [new_shapes[1], new_shapes[3]])
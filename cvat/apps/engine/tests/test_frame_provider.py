@@ -0,0 +1,312 @@
+# Copyright (C) 2020 Intel Corporation
+#
+# SPDX-License-Identifier: MIT
+
+import os.path as osp
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase, mock
+
+import av
+import numpy as np
+from django.test import override_settings
+from PIL import Image
+
+from cvat.apps.engine.frame_provider import ChunkCache, FrameProvider
+from cvat.apps.engine.media_extractors import (Mpeg4ChunkWriter,
+    Mpeg4CompressedChunkWriter, ThumbnailStripWriter, VideoChunkReader,
+    VideoReader, ZipCompressedChunkWriter)
+from cvat.apps.engine.models import DataChoice
+
+
+class _Chunk:
+    def __init__(self, size):
+        self.size = size
+
+class ChunkCacheTest(TestCase):
+    def _make_chunks(self, test_dir, count):
+        paths = []
+        for i in range(count):
+            path = osp.join(test_dir, '%s.zip' % i)
+            with open(path, 'wb') as f:
+                f.write(b'chunk')
+            paths.append(path)
+        return paths
+
+    def test_can_reuse_decoded_chunk(self):
+        with TemporaryDirectory() as test_dir:
+            path, = self._make_chunks(test_dir, 1)
+            cache = ChunkCache(100)
+
+            first = cache.get((1, 0), path, lambda _: _Chunk(10))
+            second = cache.get((1, 0), path, lambda _: _Chunk(10))
+
+            self.assertIs(first, second)
+            stats = cache.get_stats()
+            self.assertEqual(stats['hits'], 1)
+            self.assertEqual(stats['misses'], 1)
+            self.assertEqual(stats['size'], 10)
+
+    def test_evicts_least_recently_used_chunk(self):
+        with TemporaryDirectory() as test_dir:
+            paths = self._make_chunks(test_dir, 3)
+            cache = ChunkCache(25)
+
+            cache.get((1, 0), paths[0], lambda _: _Chunk(10))
+            cache.get((1, 1), paths[1], lambda _: _Chunk(10))
+            cache.get((1, 0), paths[0], lambda _: _Chunk(10))
+            cache.get((1, 2), paths[2], lambda _: _Chunk(10))
+
+            stats = cache.get_stats()
+            self.assertEqual(stats['evictions'], 1)
+            self.assertEqual(stats['size'], 20)
+
+            # chunk 0 was used recently, so chunk 1 must have been evicted
+            cache.get((1, 0), paths[0], lambda _: _Chunk(10))
+            self.assertEqual(cache.get_stats()['hits'], 2)
+            cache.get((1, 1), paths[1], lambda _: _Chunk(10))
+            self.assertEqual(cache.get_stats()['misses'], 4)
+
+    def test_does_not_keep_chunks_bigger_than_budget(self):
+        with TemporaryDirectory() as test_dir:
+            path, = self._make_chunks(test_dir, 1)
+            cache = ChunkCache(5)
+
+            cache.get((1, 0), path, lambda _: _Chunk(10))
+
+            self.assertEqual(cache.get_stats()['items'], 0)
+            self.assertEqual(cache.get_stats()['size'], 0)
+
+class VideoChunkReaderTest(TestCase):
+    def test_can_access_frames_in_any_order(self):
+        with TemporaryDirectory() as test_dir:
+            chunk_path = osp.join(test_dir, '0.mp4')
+            images = [(av.VideoFrame.from_ndarray(
+                    np.full((32, 32, 3), 20 * i, dtype=np.uint8), format='rgb24')
+                    .reformat(format='yuv420p'), chunk_path, i)
+                for i in range(10)]
+            Mpeg4ChunkWriter(100, keyframe_interval=4) \
+                .save_as_chunk(images, chunk_path)
+
+            index = VideoReader.load_index(chunk_path)
+            self.assertEqual(len(index['pts']), 10)
+            self.assertEqual(index['keyframes'][:3], [0, 4, 8])
+
+            expected = [frame.to_ndarray(format='rgb24').mean()
+                for frame, _, _ in VideoReader([chunk_path])]
+            reader = VideoChunkReader(chunk_path, index)
+            for idx in [9, 2, 3, 0, 5, 5, 8, 1]:
+                frame, _, _ = reader[idx]
+                self.assertEqual(frame.to_ndarray(format='rgb24').mean(),
+                    expected[idx])
+
+    def test_frame_provider_seeks_to_keyframe(self):
+        with TemporaryDirectory() as test_dir:
+            db_data = _VideoData(test_dir, 10)
+            chunk_path = db_data.get_compressed_chunk_path(0)
+            Mpeg4ChunkWriter(100, keyframe_interval=4).save_as_chunk(
+                [(f, chunk_path, i) for i, f in
+                    enumerate(_make_video_frames(db_data.size, 32, 32))],
+                chunk_path)
+
+            # the default chunk cache is used
+            frame_provider = FrameProvider(db_data)
+            with mock.patch.object(VideoChunkReader, '_seek', autospec=True,
+                    side_effect=VideoChunkReader._seek) as seek:
+                frame, _ = frame_provider.get_frame(9,
+                    FrameProvider.Quality.COMPRESSED,
+                    FrameProvider.Type.NUMPY_ARRAY)
+
+            self.assertAlmostEqual(frame.mean(), (50 * 9) % 256, delta=3)
+            seek.assert_called_once()
+            self.assertEqual(seek.call_args[0][1], 9)
+
+class _VideoData:
+    def __init__(self, test_dir, size):
+        self.id = 1
+        self.size = size
+        self.chunk_size = size
+        self.image_quality = 50
+        self.compressed_chunk_type = DataChoice.VIDEO
+        self.original_chunk_type = DataChoice.VIDEO
+        self._dir = test_dir
+
+    def get_compressed_chunk_path(self, chunk_number):
+        return osp.join(self._dir, '%s.mp4' % chunk_number)
+
+    get_original_chunk_path = get_compressed_chunk_path
+
+    def get_scaled_chunk_path(self, chunk_number, scale):
+        return osp.join(self._dir, '%s_x%s.mp4' % (chunk_number, scale))
+
+    def get_scales(self):
+        return [1, 2]
+
+    def get_frame_cache_dirname(self):
+        return osp.join(self._dir, 'frames')
+
+class DecodedFrameCacheTest(TestCase):
+    def test_caches_only_requested_frames(self):
+        with TemporaryDirectory() as test_dir:
+            db_data = _VideoData(test_dir, 10)
+            chunk_path = db_data.get_compressed_chunk_path(0)
+            Mpeg4ChunkWriter(100, keyframe_interval=4).save_as_chunk(
+                [(f, chunk_path, i) for i, f in
+                    enumerate(_make_video_frames(db_data.size, 32, 32))],
+                chunk_path)
+
+            cache = ChunkCache(1024 * 1024 * 1024)
+            quality = FrameProvider.Quality.COMPRESSED
+            frame_provider = FrameProvider(db_data, cache=cache)
+            frame, _ = frame_provider.get_frame(9, quality,
+                FrameProvider.Type.NUMPY_ARRAY)
+            self.assertAlmostEqual(frame.mean(), (50 * 9) % 256, delta=3)
+            self.assertEqual(cache.get_stats()['items'], 1)
+
+            # the frame is shared with other providers
+            frame, _ = FrameProvider(db_data, cache=cache).get_frame(9, quality,
+                FrameProvider.Type.NUMPY_ARRAY)
+            self.assertAlmostEqual(frame.mean(), (50 * 9) % 256, delta=3)
+            self.assertEqual(cache.get_stats()['hits'], 1)
+
+    def test_sequential_reading_does_not_fill_cache(self):
+        with TemporaryDirectory() as test_dir:
+            db_data = _VideoData(test_dir, 4)
+            chunk_path = db_data.get_original_chunk_path(0)
+            Mpeg4ChunkWriter(100).save_as_chunk(
+                [(f, chunk_path, i) for i, f in
+                    enumerate(_make_video_frames(db_data.size, 32, 32))],
+                chunk_path)
+
+            cache = ChunkCache(1024 * 1024 * 1024)
+            frames = list(FrameProvider(db_data, cache=cache).get_frames(
+                out_type=FrameProvider.Type.NUMPY_ARRAY))
+
+            self.assertEqual(len(frames), db_data.size)
+            self.assertEqual(cache.get_stats()['items'], 0)
+
+    def test_does_not_cache_image_frames(self):
+        with TemporaryDirectory() as test_dir:
+            db_data = _VideoData(test_dir, 2)
+            db_data.compressed_chunk_type = DataChoice.IMAGESET
+            db_data.get_compressed_chunk_path = \
+                lambda chunk_number: osp.join(test_dir, '%s.zip' % chunk_number)
+            chunk_path = db_data.get_compressed_chunk_path(0)
+            images = []
+            for i in range(db_data.size):
+                images.append(BytesIO())
+                Image.fromarray(np.full((8, 8, 3), 50 * i, dtype=np.uint8)) \
+                    .save(images[-1], format='PNG')
+            ZipCompressedChunkWriter(95).save_as_chunk(
+                [(image, chunk_path, i) for i, image in enumerate(images)],
+                chunk_path)
+
+            cache = ChunkCache(1024 * 1024 * 1024)
+            frame, mime = FrameProvider(db_data, cache=cache).get_frame(1,
+                FrameProvider.Quality.COMPRESSED, FrameProvider.Type.NUMPY_ARRAY)
+
+            self.assertAlmostEqual(frame.mean(), 50, delta=3)
+            self.assertEqual(mime[0], 'image/jpeg')
+            self.assertEqual(cache.get_stats()['items'], 0)
+
+class EncodedFrameTest(TestCase):
+    @override_settings(ENCODED_FRAME_DISK_CACHE=True)
+    def test_can_encode_video_frame(self):
+        with TemporaryDirectory() as test_dir:
+            db_data = _VideoData(test_dir, 3)
+            chunk_path = db_data.get_compressed_chunk_path(0)
+            images = [(av.VideoFrame.from_ndarray(
+                    np.full((32, 32, 3), 50 * i, dtype=np.uint8), format='rgb24')
+                    .reformat(format='yuv420p'), chunk_path, i)
+                for i in range(db_data.size)]
+            Mpeg4ChunkWriter(100).save_as_chunk(images, chunk_path)
+
+            frame_cache = ChunkCache(1024 * 1024)
+            frame_provider = FrameProvider(db_data,
+                cache=ChunkCache(0), frame_cache=frame_cache)
+            quality = FrameProvider.Quality.COMPRESSED
+
+            png = frame_provider.get_encoded_frame(2, quality)
+            jpeg = frame_provider.get_encoded_frame(2, quality, 'jpeg')
+            self.assertEqual(png.mime, 'image/png')
+            self.assertEqual(jpeg.mime, 'image/jpeg')
+            self.assertEqual(Image.open(BytesIO(jpeg.data)).size, (32, 32))
+            self.assertTrue(osp.isfile(osp.join(test_dir, 'frames', 'compressed_2.jpg')))
+
+            self.assertIs(frame_provider.get_encoded_frame(2, quality, 'jpeg'), jpeg)
+            self.assertEqual(frame_cache.get_stats()['hits'], 1)
+
+            etag, _ = frame_provider.get_frame_version(2, quality, 'jpeg')
+            self.assertEqual(etag, frame_provider.get_frame_version(2, quality, 'jpeg')[0])
+            self.assertNotEqual(etag, frame_provider.get_frame_version(2, quality, 'webp')[0])
+
+def _make_video_frames(size, width, height):
+    return [av.VideoFrame.from_ndarray(
+            np.full((height, width, 3), 50 * i, dtype=np.uint8), format='rgb24')
+            .reformat(format='yuv420p')
+        for i in range(size)]
+
+class FramePyramidTest(TestCase):
+    def test_can_get_downscaled_frame(self):
+        with TemporaryDirectory() as test_dir:
+            db_data = _VideoData(test_dir, 3)
+            frames = _make_video_frames(db_data.size, 64, 64)
+            chunk_path = db_data.get_compressed_chunk_path(0)
+            Mpeg4CompressedChunkWriter(90).save_as_chunk(
+                [(f, chunk_path, i) for i, f in enumerate(frames)], chunk_path)
+            scaled_path = db_data.get_scaled_chunk_path(0, 2)
+            Mpeg4CompressedChunkWriter(90, scale=2).save_as_chunk(
+                [(f, scaled_path, i) for i, f in enumerate(frames)], scaled_path)
+
+            frame_provider = FrameProvider(db_data, cache=ChunkCache(0))
+            quality = FrameProvider.Quality.COMPRESSED
+
+            frame, _ = frame_provider.get_frame(1, quality,
+                FrameProvider.Type.PIL)
+            scaled_frame, _ = frame_provider.get_frame(1, quality,
+                FrameProvider.Type.PIL, scale=2)
+            self.assertEqual(frame.size, (64, 64))
+            self.assertEqual(scaled_frame.size, (32, 32))
+            self.assertEqual(frame_provider.get_chunk(0, quality, 2), scaled_path)
+            self.assertNotEqual(frame_provider.get_frame_version(1, quality)[0],
+                frame_provider.get_frame_version(1, quality, scale=2)[0])
+
+            with self.assertRaises(Exception):
+                frame_provider.get_frame(1, quality, scale=4)
+            with self.assertRaises(Exception):
+                frame_provider.get_frame(1, FrameProvider.Quality.ORIGINAL, scale=2)
+
+    def test_can_write_thumbnail_strip(self):
+        with TemporaryDirectory() as test_dir:
+            strip_path = osp.join(test_dir, '0.jpeg')
+            frames = _make_video_frames(3, 80, 40)
+            ThumbnailStripWriter(95, 16).save_as_chunk(
+                [(f, strip_path, i) for i, f in enumerate(frames)], strip_path)
+
+            strip = np.asarray(Image.open(strip_path).convert('L'), dtype=float)
+            self.assertEqual(strip.shape, (16, 3 * 32))
+            for i in range(3):
+                self.assertAlmostEqual(strip[:, 32 * i + 8:32 * i + 24].mean(),
+                    50 * i, delta=3)
+
+class FrameRangeTest(TestCase):
+    def test_can_read_frame_range(self):
+        with TemporaryDirectory() as test_dir:
+            db_data = _VideoData(test_dir, 8)
+            db_data.chunk_size = 4
+            frames = _make_video_frames(db_data.size, 32, 32)
+            for chunk_number in range(2):
+                chunk_path = db_data.get_compressed_chunk_path(chunk_number)
+                Mpeg4ChunkWriter(100).save_as_chunk(
+                    [(f, chunk_path, i) for i, f in
+                        enumerate(frames[4 * chunk_number : 4 * chunk_number + 4])],
+                    chunk_path)
+
+            frame_provider = FrameProvider(db_data, cache=ChunkCache(0))
+            for prefetch in [False, True]:
+                frame_range = list(frame_provider.get_frame_range(3, 6,
+                    prefetch=prefetch))
+                self.assertEqual([n for n, _ in frame_range], [3, 4, 5, 6])
+                for frame_number, image in frame_range:
+                    self.assertEqual(image.shape, (32, 32, 3))
+                    self.assertAlmostEqual(image.mean(), (50 * frame_number) % 256, delta=3)
@@ -0,0 +1,95 @@
+# Copyright (C) 2020 Intel Corporation
+#
+# SPDX-License-Identifier: MIT
+
+import os.path as osp
+import tarfile
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase, mock
+
+import numpy as np
+from PIL import Image
+
+from cvat.apps.engine.media_extractors import ArchiveReader
+
+
+class ArchiveReaderTest(TestCase):
+    # members are stored out of the sorted order
+    _NAMES = ['img_2.png', 'img_0.png', 'dir/img_3.png', 'img_1.png']
+
+    def _make_tar(self, path, mode, names=_NAMES):
+        with tarfile.open(path, mode) as tar:
+            for name in names:
+                color = int(osp.splitext(name)[0].split('_')[-1])
+                image = np.full((4, 6, 3), color * 50, dtype=np.uint8)
+                data = BytesIO()
+                Image.fromarray(image).save(data, format='PNG')
+
+                info = tarfile.TarInfo(name)
+                info.size = data.tell()
+                data.seek(0)
+                tar.addfile(info, data)
+
+    def _check_frames(self, reader, test_dir):
+        frames = list(reader)
+
+        self.assertEqual(
+            [osp.relpath(path, test_dir) for _, path, _ in frames],
+            ['dir/img_3.png', 'img_0.png', 'img_1.png', 'img_2.png'])
+        for (image, _, _), color in zip(frames, [3, 0, 1, 2]):
+            image = np.array(Image.open(image))
+            self.assertTrue(np.all(image == color * 50))
+
+    def _check_reader(self, reader, test_dir):
+        self._check_frames(reader, test_dir)
+        self.assertEqual(reader.get_image_size(), (6, 4))
+
+    def test_can_read_tar_without_extraction(self):
+        with TemporaryDirectory() as test_dir:
+            path = osp.join(test_dir, 'images.tar')
+            self._make_tar(path, 'w')
+
+            reader = ArchiveReader([path])
+
+            self.assertIsNone(reader._tmp_dir)
+            self._check_reader(reader, test_dir)
+
+    def test_can_read_compressed_tar_with_unsorted_members(self):
+        with TemporaryDirectory() as test_dir:
+            path = osp.join(test_dir, 'images.tar.gz')
+            self._make_tar(path, 'w:gz')
+
+            reader = ArchiveReader([path])
+
+            self.assertIsNone(reader._tar)
+            self._check_reader(reader, test_dir)
+
+    def _test_can_stream_compressed_tar(self, ext, mode):
+        with TemporaryDirectory() as test_dir:
+            path = osp.join(test_dir, 'images' + ext)
+            self._make_tar(path, mode, sorted(self._NAMES))
+
+            reader = ArchiveReader([path])
+
+            self.assertIsNone(reader._tmp_dir)
+            with mock.patch.object(reader, 'get_image',
+                    side_effect=AssertionError('random access')):
+                self._check_frames(reader, test_dir)
+            self.assertEqual(reader.get_image_size(), (6, 4))
+
+    def test_can_stream_gz_tar(self):
+        self._test_can_stream_compressed_tar('.tar.gz', 'w:gz')
+
+    def test_can_stream_bz2_tar(self):
+        self._test_can_stream_compressed_tar('.tar.bz2', 'w:bz2')
+
+    def test_can_stream_range_of_compressed_tar(self):
+        with TemporaryDirectory() as test_dir:
+            path = osp.join(test_dir, 'images.tar.gz')
+            self._make_tar(path, 'w:gz', sorted(self._NAMES))
+
+            reader = ArchiveReader([path], step=2, start=1, stop=3)
+
+            self.assertEqual([(osp.relpath(path, test_dir), i)
+                for _, path, i in reader], [('img_0.png', 1), ('img_2.png', 3)])
@@ -0,0 +1,259 @@
+# Copyright (C) 2020 Intel Corporation
+#
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import os
+import os.path as osp
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from tempfile import TemporaryDirectory
+from unittest import TestCase, mock
+
+from django.test import TestCase as DbTestCase, override_settings
+from PIL import Image
+
+from cvat.apps.engine import models, task
+from cvat.apps.engine.media_extractors import (ZipChunkWriter,
+    ZipCompressedChunkWriter, ZipReader)
+from cvat.apps.engine.task import _RemoteFilesDownloader
+
+
+class _RangeRequestHandler(BaseHTTPRequestHandler):
+    files = {}
+    requested_ranges = []
+    # the response for a path is broken after the given number of bytes once
+    truncated = {}
+
+    def do_GET(self):
+        content = self.files.get(self.path)
+        if content is None:
+            self.send_error(404)
+            return
+
+        offset = 0
+        range_header = self.headers.get('Range')
+        if range_header:
+            self.requested_ranges.append(range_header)
+            offset = int(range_header[len('bytes='):].split('-')[0])
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(content) - offset))
+        self.end_headers()
+        size = self.truncated.pop(self.path, None)
+        if size is not None:
+            self.wfile.write(content[offset:offset + size])
+            self.close_connection = True
+        else:
+            self.wfile.write(content[offset:])
+
+    def log_message(self, *args): # pylint: disable=arguments-differ
+        pass
+
+class RemoteFilesDownloaderTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), _RangeRequestHandler)
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever,
+            daemon=True)
+        cls.server_thread.start()
+        cls.url = 'http://127.0.0.1:{}'.format(cls.server.server_port)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        _RangeRequestHandler.files = {
+            '/images/{}.jpg'.format(i): os.urandom(100000 + i)
+            for i in range(5)
+        }
+        _RangeRequestHandler.requested_ranges = []
+        _RangeRequestHandler.truncated = {}
+
+    def _download(self, urls, upload_dir):
+        downloader = _RemoteFilesDownloader(urls, upload_dir, max_workers=3)
+        try:
+            downloader.wait_all()
+        finally:
+            downloader.close()
+        return downloader.files
+
+    def test_can_download_files(self):
+        with TemporaryDirectory() as upload_dir:
+            urls = [self.url + path for path in _RangeRequestHandler.files]
+
+            files = self._download(urls, upload_dir)
+
+            self.assertEqual(files, ['{}.jpg'.format(i) for i in range(5)])
+            for path, content in _RangeRequestHandler.files.items():
+                with open(osp.join(upload_dir, osp.basename(path)), 'rb') as f:
+                    self.assertEqual(f.read(), content)
+
+    def test_can_verify_checksum(self):
+        with TemporaryDirectory() as upload_dir:
+            path = '/images/0.jpg'
+            digest = hashlib.sha256(_RangeRequestHandler.files[path]).hexdigest()
+
+            self._download([self.url + path + '#sha256=' + digest], upload_dir)
+            self.assertTrue(osp.isfile(osp.join(upload_dir, '0.jpg')))
+
+            with self.assertRaisesRegex(Exception, 'Checksum mismatch'):
+                self._download([self.url + '/images/1.jpg#sha256=' + digest],
+                    upload_dir)
+            self.assertFalse(osp.exists(osp.join(upload_dir, '1.jpg')))
+
+    def test_can_continue_partial_download(self):
+        with TemporaryDirectory() as upload_dir:
+            path = '/images/2.jpg'
+            content = _RangeRequestHandler.files[path]
+            with open(osp.join(upload_dir, '2.jpg.part'), 'wb') as f:
+                f.write(content[:1000])
+
+            self._download([self.url + path], upload_dir)
+
+            self.assertEqual(_RangeRequestHandler.requested_ranges, ['bytes=1000-'])
+            with open(osp.join(upload_dir, '2.jpg'), 'rb') as f:
+                self.assertEqual(f.read(), content)
+
+    def test_can_continue_truncated_download(self):
+        with TemporaryDirectory() as upload_dir:
+            path = '/images/3.jpg'
+            content = _RangeRequestHandler.files[path]
+            # the block read by the downloader before the connection is broken
+            block_size = _RemoteFilesDownloader.BLOCK_SIZE
+            _RangeRequestHandler.truncated[path] = block_size + 1000
+
+            with mock.patch('time.sleep'):
+                self._download([self.url + path], upload_dir)
+
+            self.assertEqual(_RangeRequestHandler.requested_ranges, ['bytes={}-'.format(block_size)])
+            with open(osp.join(upload_dir, '3.jpg'), 'rb') as f:
+                self.assertEqual(f.read(), content)
+
+    def test_saves_progress_in_job_thread(self):
+        saving_threads = set()
+        job = mock.Mock(meta={})
+        job.save_meta.side_effect = \
+            lambda: saving_threads.add(threading.current_thread())
+
+        with TemporaryDirectory() as upload_dir, \
+                mock.patch('rq.get_current_job', return_value=job):
+            urls = [self.url + path for path in _RangeRequestHandler.files]
+            self._download(urls, upload_dir)
+
+        self.assertEqual(saving_threads, { threading.current_thread() })
+        self.assertEqual(job.meta['downloads'],
+            { 'total': 5, 'downloaded': 5, 'progress': {} })
+
+def _interrupt_after_first_chunk(save_chunks):
+    def wrapper(*args, **kwargs):
+        for chunk_idx, result in enumerate(save_chunks(*args, **kwargs)):
+            if chunk_idx == 1:
+                raise Exception('Task creation is interrupted')
+            yield result
+    return wrapper
+
+@override_settings(TASK_CREATION_COMMIT_SIZE=2)
+class TaskCreationTest(DbTestCase):
+    def setUp(self):
+        db_data = models.Data.objects.create(chunk_size=2)
+        shutil.rmtree(db_data.get_data_dirname(), ignore_errors=True)
+        os.makedirs(db_data.get_compressed_cache_dirname())
+        os.makedirs(db_data.get_original_cache_dirname())
+        os.makedirs(db_data.get_upload_dirname())
+        for i in range(6):
+            Image.new('RGB', (8, 8), (40 * i, 0, 0)).save(
+                osp.join(db_data.get_upload_dirname(), '{}.jpg'.format(i)))
+
+        self.db_task = models.Task.objects.create(name='task', data=db_data)
+        shutil.rmtree(self.db_task.get_task_dirname(), ignore_errors=True)
+        os.makedirs(self.db_task.get_task_logs_dirname())
+        self.data = {
+            'client_files': ['{}.jpg'.format(i) for i in range(6)],
+            'server_files': [], 'remote_files': [],
+            'stop_frame': None, 'use_zip_chunks': True,
+        }
+
+        patcher = mock.patch('rq.get_current_job', return_value=mock.Mock(meta={}))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_interrupted(self):
+        with mock.patch('cvat.apps.engine.task._save_chunks',
+                _interrupt_after_first_chunk(task._save_chunks)):
+            with self.assertRaisesRegex(Exception, 'interrupted'):
+                task._create_thread(self.db_task.id, dict(self.data))
+
+        db_data = models.Data.objects.get(pk=self.db_task.data.id)
+        self.assertEqual(db_data.size, 2)
+        self.assertEqual(db_data.images.count(), 2)
+        self.assertFalse(self.db_task.segment_set.exists())
+        return db_data
+
+    def test_can_resume_creation(self):
+        self._create_interrupted()
+
+        task._create_thread(self.db_task.id, dict(self.data))
+
+        db_data = models.Data.objects.get(pk=self.db_task.data.id)
+        self.assertEqual(db_data.size, 6)
+        self.assertEqual(sorted(db_data.images.values_list('frame', flat=True)),
+            list(range(6)))
+        self.assertTrue(self.db_task.segment_set.exists())
+        self.assertEqual(sorted(os.listdir(db_data.get_compressed_cache_dirname())),
+            ['0.zip', '1.zip', '2.zip'])
+
+    def test_can_save_image_chunks_in_parallel(self):
+        db_data = self.db_task.data
+        upload_dir = db_data.get_upload_dirname()
+        paths = [osp.join(upload_dir, '{}.jpg'.format(i)) for i in range(6)]
+        chunks = [(chunk_idx, [(paths[i], paths[i], i)
+                for i in range(2 * chunk_idx, 2 * chunk_idx + 2)])
+            for chunk_idx in range(3)]
+
+        saved = list(task._save_chunks(iter(chunks), db_data,
+            ZipChunkWriter(100), ZipCompressedChunkWriter(95), workers=2))
+
+        self.assertEqual([(chunk_idx, chunk_data) for chunk_idx, chunk_data, _ in saved],
+            chunks)
+        self.assertEqual([img_sizes for _, _, img_sizes in saved],
+            [[(8, 8), (8, 8)]] * 3)
+        for chunk_idx in range(3):
+            reader = ZipReader([db_data.get_compressed_chunk_path(chunk_idx)])
+            self.assertEqual([Image.open(image).getpixel((4, 4))[0] // 40
+                for image, _, _ in reader], [2 * chunk_idx, 2 * chunk_idx + 1])
+            self.assertTrue(osp.isfile(db_data.get_original_chunk_path(chunk_idx)))
+
+    def _fail_job(self, attempt):
+        job = mock.Mock(id='/api/v1/tasks/{}'.format(self.db_task.id),
+            func_name='cvat.apps.engine.task._create_thread', origin='default',
+            meta={'attempt': attempt})
+        with mock.patch('cvat.apps.engine.task.FailedJobRegistry') as registry:
+            task.rq_handler(job, Exception, Exception('interrupted'), None)
+        return job, registry
+
+    @override_settings(TASK_CREATION_RETRIES=2)
+    def test_failed_creation_is_retried(self):
+        db_data = self._create_interrupted()
+
+        job, registry = self._fail_job(attempt=1)
+
+        self.assertEqual(job.meta['attempt'], 2)
+        registry.return_value.requeue.assert_called_once_with(job)
+        self.assertEqual(models.Data.objects.get(pk=db_data.id).size, 2)
+
+    @override_settings(TASK_CREATION_RETRIES=2)
+    def test_removes_data_of_failed_creation(self):
+        db_data = self._create_interrupted()
+
+        _, registry = self._fail_job(attempt=2)
+
+        registry.return_value.requeue.assert_not_called()
+        db_data = models.Data.objects.get(pk=db_data.id)
+        self.assertEqual(db_data.size, 0)
+        self.assertEqual(db_data.images.count(), 0)
+        self.assertEqual(os.listdir(db_data.get_compressed_cache_dirname()), [])
@@ -0,0 +1,25 @@
+# Copyright (C) 2020 Intel Corporation
+#
+# SPDX-License-Identifier: MIT
+
+import os
+from unittest import TestCase, mock
+
+from fakeredis import FakeStrictRedis
+from rq import Queue
+
+from cvat.apps.engine.worker import Worker
+
+
+class WorkerTest(TestCase):
+    def test_closes_old_db_connections_around_job(self):
+        connection = FakeStrictRedis()
+        queue = Queue('inference', connection=connection, is_async=True)
+        job = queue.enqueue(os.getpid)
+
+        with mock.patch('cvat.apps.engine.worker.close_old_connections') as close:
+            Worker([queue], connection=connection).work(burst=True)
+
+        self.assertEqual(close.call_count, 2)
+        # the job is executed in the worker process itself
+        self.assertEqual(job.result, os.getpid())
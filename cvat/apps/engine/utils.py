@@ -1,7 +1,9 @@
 import ast
 from collections import namedtuple
 import importlib
+import queue
 import sys
+import threading
 import traceback
 
 Import = namedtuple("Import", ["module", "name", "alias"])
@@ -58,3 +60,41 @@ def execute_python_code(source_code, global_vars=None, local_vars=None):
         _, _, tb = sys.exc_info()
         line_number = traceback.extract_tb(tb)[-1][1]
         raise InterpreterError("{} at line {}: {}".format(error_class, line_number, details))
+
+def prefetch(iterable, size):
+    """Iterates over the iterable in a background thread, up to size items are kept ready"""
+    items = queue.Queue(maxsize=size)
+    cancelled = threading.Event()
+    end = object()
+
+    def put(item):
+        while not cancelled.is_set():
+            try:
+                items.put(item, timeout=1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((end, None))
+        except Exception as ex:
+            put((None, ex))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is end:
+                break
+            yield item
+    finally:
+        cancelled.set()
+        producer.join()
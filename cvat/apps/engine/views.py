@@ -33,6 +33,8 @@ from django_filters import rest_framework as filters
 import django_rq
 from django.db import IntegrityError
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 
 
 from . import annotation, task, models
@@ -405,13 +407,21 @@ class TaskViewSet(auth.TaskGetQuerySetMixin, viewsets.ModelViewSet):
 	@swagger_auto_schema(method='get', operation_summary='Method returns data for a specific task',
 		manual_parameters=[
 			openapi.Parameter('type', in_=openapi.IN_QUERY, required=True, type=openapi.TYPE_STRING,
-				enum=['chunk', 'frame', 'preview'],
+				enum=['chunk', 'frame', 'preview', 'thumbnails'],
 				description="Specifies the type of the requested data"),
 			openapi.Parameter('quality', in_=openapi.IN_QUERY, required=True, type=openapi.TYPE_STRING,
 				enum=['compressed', 'original'],
 				description="Specifies the quality level of the requested data, doesn't matter for 'preview' type"),
 			openapi.Parameter('number', in_=openapi.IN_QUERY, required=True, type=openapi.TYPE_NUMBER,
-				description="A unique number value identifying chunk or frame, doesn't matter for 'preview' type"),
+				description="A unique number value identifying chunk or frame, doesn't matter for 'preview' type. "
+					"For 'thumbnails' type it is the number of the chunk"),
+			openapi.Parameter('image_format', in_=openapi.IN_QUERY, required=False, type=openapi.TYPE_STRING,
+				enum=list(FrameProvider.IMAGE_FORMATS),
+				description="Specifies the encoding of the requested frame, only for 'frame' type. "
+					"By default images are returned as they are stored and video frames are encoded into PNG"),
+			openapi.Parameter('scale', in_=openapi.IN_QUERY, required=False, type=openapi.TYPE_NUMBER,
+				description="Specifies the downscale factor of the requested chunk or frame, only for 'compressed' quality. "
+					"Available factors are listed in the 'scales' field of the data meta information"),
 			]
 	)
 	@action(detail=True, methods=['POST', 'GET'])
@@ -435,8 +445,10 @@ class TaskViewSet(auth.TaskGetQuerySetMixin, viewsets.ModelViewSet):
 			data_type = request.query_params.get('type', None)
 			data_id = request.query_params.get('number', None)
 			data_quality = request.query_params.get('quality', 'compressed')
+			image_format = request.query_params.get('image_format', None)
+			scale = request.query_params.get('scale', '1')
 
-			possible_data_type_values = ('chunk', 'frame', 'preview')
+			possible_data_type_values = ('chunk', 'frame', 'preview', 'thumbnails')
 			possible_quality_values = ('compressed', 'original')
 
 			if not data_type or data_type not in possible_data_type_values:
@@ -446,6 +458,15 @@ class TaskViewSet(auth.TaskGetQuerySetMixin, viewsets.ModelViewSet):
 					return Response(data='number not specified', status=status.HTTP_400_BAD_REQUEST)
 				elif data_quality not in possible_quality_values:
 					return Response(data='wrong quality value', status=status.HTTP_400_BAD_REQUEST)
+				elif image_format is not None and image_format not in FrameProvider.IMAGE_FORMATS:
+					return Response(data='wrong image format value', status=status.HTTP_400_BAD_REQUEST)
+				elif not scale.isdigit() or int(scale) < 1 or \
+						(int(scale) != 1 and data_quality != 'compressed'):
+					return Response(data='wrong scale value', status=status.HTTP_400_BAD_REQUEST)
+				scale = int(scale)
+			elif data_type == 'thumbnails':
+				if not data_id:
+					return Response(data='number not specified', status=status.HTTP_400_BAD_REQUEST)
 
 			try:
 				db_task = self.get_object()
@@ -455,7 +476,7 @@ class TaskViewSet(auth.TaskGetQuerySetMixin, viewsets.ModelViewSet):
 					data_id = int(data_id)
 					data_quality = FrameProvider.Quality.COMPRESSED \
 						if data_quality == 'compressed' else FrameProvider.Quality.ORIGINAL
-					path = os.path.realpath(frame_provider.get_chunk(data_id, data_quality))
+					path = os.path.realpath(frame_provider.get_chunk(data_id, data_quality, scale))
 
 					# Follow symbol links if the chunk is a link on a real image otherwise
 					# mimetype detection inside sendfile will work incorrectly.
@@ -465,12 +486,27 @@ class TaskViewSet(auth.TaskGetQuerySetMixin, viewsets.ModelViewSet):
 					data_id = int(data_id)
 					data_quality = FrameProvider.Quality.COMPRESSED \
 						if data_quality == 'compressed' else FrameProvider.Quality.ORIGINAL
-					buf, mime = frame_provider.get_frame(data_id, data_quality)
-
-					return HttpResponse(buf.getvalue(), content_type=mime)
+					# Repeated requests are answered without decoding of the frame
+					etag, last_modified = frame_provider.get_frame_version(data_id,
+						data_quality, image_format, scale)
+					etag = quote_etag(etag)
+					response = get_conditional_response(request,
+						etag=etag, last_modified=int(last_modified))
+					if response is None:
+						frame = frame_provider.get_encoded_frame(data_id, data_quality,
+							image_format, scale)
+						response = HttpResponse(frame.data, content_type=frame.mime)
+					response['ETag'] = etag
+					response['Last-Modified'] = http_date(last_modified)
+					patch_cache_control(response, private=True, no_cache=True)
+
+					return response
 
 				elif data_type == 'preview':
 					return sendfile(request, frame_provider.get_preview())
+
+				elif data_type == 'thumbnails':
+					return sendfile(request, frame_provider.get_thumbnail_strip(int(data_id)))
 				else:
 					return Response(data='unknown data type {}.'.format(data_type), status=status.HTTP_400_BAD_REQUEST)
 			except APIException as e:
@@ -716,6 +752,7 @@ class TaskViewSet(auth.TaskGetQuerySetMixin, viewsets.ModelViewSet):
 
 		db_data = db_task.data
 		db_data.frames = frame_meta
+		db_data.scales = db_data.get_scales()
 
 		serializer = DataMetaSerializer(db_data)
 		return Response(serializer.data)
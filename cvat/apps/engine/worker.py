@@ -0,0 +1,39 @@
+# Copyright (C) 2020 Intel Corporation
+#
+# SPDX-License-Identifier: MIT
+
+from django.db import close_old_connections
+from rq import SimpleWorker
+
+from cvat.apps.engine.log import slogger
+from cvat.apps.engine.plugins import plugin_decorator
+
+
+@plugin_decorator
+def warm_up_worker(queue_names):
+    """
+    Called once when a worker starts. Applications attach "after" plugins
+    to it to load heavy resources (e.g. compiled networks) for jobs of the
+    queues in advance.
+    """
+
+    slogger.glob.info("worker for queues {} is warmed up".format(", ".join(queue_names)))
+
+class Worker(SimpleWorker):
+    """
+    Executes jobs in the worker process itself instead of a forked child,
+    so process-wide caches are kept between jobs. Database connections are
+    shared by jobs too, so broken and expired ones are closed around each job
+    like around a request.
+    """
+
+    def work(self, *args, **kwargs): # pylint: disable=arguments-differ
+        warm_up_worker(self.queue_names())
+        return super().work(*args, **kwargs)
+
+    def perform_job(self, *args, **kwargs): # pylint: disable=arguments-differ
+        close_old_connections()
+        try:
+            return super().perform_job(*args, **kwargs)
+        finally:
+            close_old_connections()
@@ -1,4 +1,4 @@
-# Copyright (C) 2018 Intel Corporation
+# Copyright (C) 2018-2020 Intel Corporation
 #
 # SPDX-License-Identifier: MIT
 
@@ -6,3 +6,13 @@ from django.apps import AppConfig
 
 class ReidConfig(AppConfig):
     name = 'cvat.apps.reid'
+
+    def ready(self):
+        from cvat.apps.engine.plugins import add_plugin
+
+        def load_network(queue_names):
+            if "inference" in queue_names:
+                from .reid import ReID
+                ReID.load_network()
+
+        add_plugin("warm_up_worker", load_network, "after", exc_ok=True)
@@ -7,14 +7,12 @@ import rq
 import cv2
 import math
 import numpy
-import itertools
 
-from openvino.inference_engine import IENetwork, IEPlugin
 from scipy.optimize import linear_sum_assignment
-from scipy.spatial.distance import euclidean, cosine
 
 from cvat.apps.engine.models import Job
 from cvat.apps.engine.frame_provider import FrameProvider
+from cvat.apps.auto_annotation.inference_engine import load_network
 
 
 class ReID:
@@ -23,12 +21,13 @@ class ReID:
     __frame_urls = None
     __frame_boxes = None
     __stop_frame = None
-    __plugin = None
     __executable_network = None
     __input_blob_name = None
     __output_blob_name = None
     __input_height = None
     __input_width = None
+    __batch_size = None
+    __embeddings = None
 
 
     def __init__(self, jid, data):
@@ -36,22 +35,33 @@ class ReID:
         self.__max_distance = data["maxDistance"]
 
         self.__frame_boxes = {}
+        self.__embeddings = {}
 
         db_job = Job.objects.select_related('segment__task').get(pk = jid)
         db_segment = db_job.segment
         db_task = db_segment.task
-        self.__frame_iter = itertools.islice(
-            FrameProvider(db_task.data).get_frames(FrameProvider.Quality.ORIGINAL),
-            db_segment.start_frame,
-            db_segment.stop_frame + 1,
-        )
+        self.__frame_iter = FrameProvider(db_task.data).get_frame_range(
+            db_segment.start_frame, db_segment.stop_frame,
+            FrameProvider.Quality.ORIGINAL, prefetch=True)
 
         self.__stop_frame = db_segment.stop_frame
         for frame in range(db_segment.start_frame, db_segment.stop_frame + 1):
             self.__frame_boxes[frame] = [box for box in data["boxes"] if box["frame"] == frame]
 
+        network = self.load_network()
+        self.__input_blob_name = next(iter(network.inputs))
+        self.__output_blob_name = next(iter(network.outputs))
+        self.__input_height, self.__input_width = network.inputs[self.__input_blob_name][-2:]
+        # All crops of a frame are embedded by a few inference calls
+        self.__batch_size = network.batch_size
+        self.__executable_network = network.exec_network
+
+
+    @staticmethod
+    def load_network():
         IE_PLUGINS_PATH = os.getenv('IE_PLUGINS_PATH', None)
         REID_MODEL_DIR = os.getenv('REID_MODEL_DIR', None)
+        REID_BATCH_SIZE = int(os.getenv('REID_BATCH_SIZE', 16))
 
         if not IE_PLUGINS_PATH:
             raise Exception("Environment variable 'IE_PLUGINS_PATH' isn't defined")
@@ -61,86 +71,82 @@ class ReID:
         REID_XML = os.path.join(REID_MODEL_DIR, "reid.xml")
         REID_BIN = os.path.join(REID_MODEL_DIR, "reid.bin")
 
-        self.__plugin = IEPlugin(device="CPU", plugin_dirs=[IE_PLUGINS_PATH])
-        network = IENetwork.from_ir(model=REID_XML, weights=REID_BIN)
-        self.__input_blob_name = next(iter(network.inputs))
-        self.__output_blob_name = next(iter(network.outputs))
-        self.__input_height, self.__input_width = network.inputs[self.__input_blob_name].shape[-2:]
-        self.__executable_network = self.__plugin.load(network=network)
-        del network
-
-
-    def __del__(self):
-        if self.__executable_network:
-            del self.__executable_network
-            self.__executable_network = None
-
-        if self.__plugin:
-            del self.__plugin
-            self.__plugin = None
-
+        # The compiled network is shared by all ReID jobs of the process
+        return load_network(REID_XML, REID_BIN, batch_size=max(1, REID_BATCH_SIZE))
 
-    def __boxes_are_compatible(self, cur_box, next_box):
-        cur_c_x = (cur_box["points"][0] + cur_box["points"][2]) / 2
-        cur_c_y = (cur_box["points"][1] + cur_box["points"][3]) / 2
-        next_c_x = (next_box["points"][0] + next_box["points"][2]) / 2
-        next_c_y = (next_box["points"][1] + next_box["points"][3]) / 2
-        compatible_distance = euclidean([cur_c_x, cur_c_y], [next_c_x, next_c_y]) <= self.__max_distance
-        compatible_label = cur_box["label_id"] == next_box["label_id"]
-        return compatible_distance and compatible_label and "path_id" not in next_box
 
+    def __compatibility_matrix(self, cur_boxes, next_boxes):
+        def _centers(boxes):
+            points = numpy.array([box["points"][:4] for box in boxes], dtype=float)
+            return (points[:, 0:2] + points[:, 2:4]) / 2
 
-    def __compute_difference(self, image_1, image_2):
-        image_1 = cv2.resize(image_1, (self.__input_width, self.__input_height)).transpose((2,0,1))
-        image_2 = cv2.resize(image_2, (self.__input_width, self.__input_height)).transpose((2,0,1))
+        distances = numpy.linalg.norm(
+            _centers(cur_boxes)[:, numpy.newaxis] - _centers(next_boxes)[numpy.newaxis],
+            axis=2)
+        cur_labels = numpy.array([box["label_id"] for box in cur_boxes])
+        next_labels = numpy.array([box["label_id"] for box in next_boxes])
+        next_unmatched = numpy.array(["path_id" not in box for box in next_boxes])
 
-        input_1 = {
-            self.__input_blob_name: image_1[numpy.newaxis, ...]
-        }
+        return (distances <= self.__max_distance) & \
+            (cur_labels[:, numpy.newaxis] == next_labels[numpy.newaxis]) & \
+            next_unmatched[numpy.newaxis]
 
-        input_2 = {
-            self.__input_blob_name: image_2[numpy.newaxis, ...]
-        }
 
-        embedding_1 = self.__executable_network.infer(inputs = input_1)[self.__output_blob_name]
-        embedding_2 = self.__executable_network.infer(inputs = input_2)[self.__output_blob_name]
-
-        embedding_1 = embedding_1.reshape(embedding_1.size)
-        embedding_2 = embedding_2.reshape(embedding_2.size)
-
-        return cosine(embedding_1, embedding_2)
-
-
-    def __compute_difference_matrix(self, cur_boxes, next_boxes, cur_image, next_image):
+    def __compute_embeddings(self, boxes, image):
         def _int(number, upper):
             return math.floor(numpy.clip(number, 0, upper - 1))
 
-        default_mat_value = 1000.0
-
-        matrix = numpy.full([len(cur_boxes), len(next_boxes)], default_mat_value, dtype=float)
-        for row, cur_box in enumerate(cur_boxes):
-            cur_width = cur_image.shape[1]
-            cur_height = cur_image.shape[0]
-            cur_xtl, cur_xbr, cur_ytl, cur_ybr = (
-                _int(cur_box["points"][0], cur_width), _int(cur_box["points"][2], cur_width),
-                _int(cur_box["points"][1], cur_height), _int(cur_box["points"][3], cur_height)
+        height, width = image.shape[:2]
+        crops = numpy.zeros((len(boxes), 3, self.__input_height, self.__input_width),
+            dtype=numpy.float32)
+        for idx, box in enumerate(boxes):
+            xtl, xbr, ytl, ybr = (
+                _int(box["points"][0], width), _int(box["points"][2], width),
+                _int(box["points"][1], height), _int(box["points"][3], height)
             )
+            crop = image[ytl:ybr, xtl:xbr]
+            if crop.size:
+                crops[idx] = cv2.resize(crop,
+                    (self.__input_width, self.__input_height)).transpose((2,0,1))
+
+        embeddings = []
+        for start in range(0, len(crops), self.__batch_size):
+            batch = crops[start : start + self.__batch_size]
+            count = len(batch)
+            if count < self.__batch_size:
+                batch = numpy.concatenate([batch,
+                    numpy.zeros((self.__batch_size - count, ) + batch.shape[1:], dtype=batch.dtype)])
+            output = self.__executable_network.infer(
+                inputs = { self.__input_blob_name: batch })[self.__output_blob_name]
+            embeddings.append(output.reshape(self.__batch_size, -1)[:count])
+        embeddings = numpy.concatenate(embeddings).astype(float)
+
+        # Normalized embeddings give cosine similarities by a dot product
+        norms = numpy.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / numpy.maximum(norms, numpy.finfo(float).eps)
+
+
+    def __get_embeddings(self, frame, image):
+        # Boxes of a frame are embedded once, when the frame is the next one,
+        # and reused when it becomes the current one
+        embeddings = self.__embeddings.pop(frame, None)
+        if embeddings is None:
+            embeddings = self.__compute_embeddings(self.__frame_boxes[frame], image)
+        return embeddings
+
+
+    def __compute_difference_matrix(self, cur_frame, next_frame, cur_image, next_image):
+        cur_boxes = self.__frame_boxes[cur_frame]
+        next_boxes = self.__frame_boxes[next_frame]
 
-            for col, next_box in enumerate(next_boxes):
-                next_box = next_boxes[col]
-                next_width = next_image.shape[1]
-                next_height = next_image.shape[0]
-                next_xtl, next_xbr, next_ytl, next_ybr = (
-                    _int(next_box["points"][0], next_width), _int(next_box["points"][2], next_width),
-                    _int(next_box["points"][1], next_height), _int(next_box["points"][3], next_height)
-                )
+        default_mat_value = 1000.0
 
-                if not self.__boxes_are_compatible(cur_box, next_box):
-                    continue
+        cur_embeddings = self.__get_embeddings(cur_frame, cur_image)
+        next_embeddings = self.__get_embeddings(next_frame, next_image)
+        self.__embeddings = { next_frame: next_embeddings }
 
-                crop_1 = cur_image[cur_ytl:cur_ybr, cur_xtl:cur_xbr]
-                crop_2 = next_image[next_ytl:next_ybr, next_xtl:next_xbr]
-                matrix[row][col] = self.__compute_difference(crop_1, crop_2)
+        matrix = 1.0 - numpy.dot(cur_embeddings, next_embeddings.T)
+        matrix[~self.__compatibility_matrix(cur_boxes, next_boxes)] = default_mat_value
 
         return matrix
 
@@ -150,7 +156,7 @@ class ReID:
         job = rq.get_current_job()
         box_tracks = {}
 
-        next_image = cv2.imdecode(numpy.fromstring((next(self.__frame_iter)[0]).read(), numpy.uint8), cv2.IMREAD_COLOR)
+        next_image = next(self.__frame_iter)[1]
         for idx, (cur_frame, next_frame) in enumerate(list(zip(frames[:-1], frames[1:]))):
             job.refresh()
             if "cancel" in job.meta:
@@ -168,12 +174,15 @@ class ReID:
                     box_tracks[path_id] = [box]
                     box["path_id"] = path_id
 
+            # Frames are read sequentially, so the next one is read even
+            # if there is nothing to match
+            cur_image = next_image
+            next_image = next(self.__frame_iter)[1]
+
             if not (len(cur_boxes) and len(next_boxes)):
                 continue
 
-            cur_image = next_image
-            next_image = cv2.imdecode(numpy.fromstring((next(self.__frame_iter)[0]).read(), numpy.uint8), cv2.IMREAD_COLOR)
-            difference_matrix = self.__compute_difference_matrix(cur_boxes, next_boxes, cur_image, next_image)
+            difference_matrix = self.__compute_difference_matrix(cur_frame, next_frame, cur_image, next_image)
             cur_idxs, next_idxs = linear_sum_assignment(difference_matrix)
             for idx, cur_idx in enumerate(cur_idxs):
                 if (difference_matrix[cur_idx][next_idxs[idx]]) <= self.__threshold:
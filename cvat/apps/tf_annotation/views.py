@@ -22,6 +22,7 @@ from cvat.apps.engine.models import (Job, TrackedShape)
 from cvat.apps.engine.serializers import (TrackedShapeSerializer)
 
 from cvat.apps.engine import annotation, task
+from cvat.apps.engine.utils import prefetch
 from cvat.apps.engine.serializers import LabeledDataSerializer
 from cvat.apps.engine.annotation import put_task_data,patch_task_data
 from tensorflow.python.client import device_lib
@@ -36,17 +37,37 @@ import rq
 
 import tensorflow as tf
 import numpy as np
+import cv2
 
 from PIL import Image
 from cvat.apps.engine.log import slogger
 from cvat.settings.base import DATA_ROOT
 
 
-def load_image_into_numpy(image):
-	(im_width, im_height) = image.size
-	return np.array(image.getdata()).reshape((im_height, im_width, 3)).astype(np.uint8)
+# Number of images which are processed by one session run
+BATCH_SIZE = int(os.environ.get('TF_ANNOTATION_BATCH_SIZE', 8))
+# Min interval in seconds between progress updates and checks for cancellation
+STATUS_UPDATE_INTERVAL = 1
 
 
+def _prepare_image(image):
+    # Frames are BGR arrays, the model expects RGB
+    height, width = image.shape[:2]
+    if width > 1920 or height > 1080:
+        image = cv2.resize(image, (width // 2, height // 2), interpolation=cv2.INTER_AREA)
+    return (width, height), image[:, :, ::-1]
+
+def _make_batches(frames, batch_size):
+    # Images in a batch must have the same size
+    batch = []
+    for frame in frames:
+        if batch and (len(batch) == batch_size or batch[0][2].shape != frame[2].shape):
+            yield batch
+            batch = []
+        batch.append(frame)
+    if batch:
+        yield batch
+
 def run_tensorflow_annotation(frame_provider, labels_mapping, threshold, model_path):
     def _normalize_box(box, w, h):
         xmin = int(box[1] * w)
@@ -72,43 +93,49 @@ def run_tensorflow_annotation(frame_provider, labels_mapping, threshold, model_p
             od_graph_def.ParseFromString(serialized_graph)
             tf.import_graph_def(od_graph_def, name='')
 
+        image_tensor = detection_graph.get_tensor_by_name('image_tensor:0')
+        output_tensors = [
+            detection_graph.get_tensor_by_name('detection_boxes:0'),
+            detection_graph.get_tensor_by_name('detection_scores:0'),
+            detection_graph.get_tensor_by_name('detection_classes:0'),
+        ]
+        label_ids = np.array(list(labels_mapping.keys()))
+
         try:
             config = tf.ConfigProto()
             config.gpu_options.allow_growth=True
             sess = tf.Session(graph=detection_graph, config=config)
-            frames = frame_provider.get_frames(frame_provider.Quality.ORIGINAL)
-            for image_num, (image, _) in enumerate(frames):
-
-                job.refresh()
-                if 'cancel' in job.meta:
-                    del job.meta['cancel']
-                    job.save()
-                    return None
-                job.meta['progress'] = image_num * 100 / len(frame_provider)
-                job.save_meta()
-
-                image = Image.open(image)
-                width, height = image.size
-                if width > 1920 or height > 1080:
-                    image = image.resize((width // 2, height // 2), Image.ANTIALIAS)
-                image_np = load_image_into_numpy(image)
-                image_np_expanded = np.expand_dims(image_np, axis=0)
-
-                image_tensor = detection_graph.get_tensor_by_name('image_tensor:0')
-                boxes = detection_graph.get_tensor_by_name('detection_boxes:0')
-                scores = detection_graph.get_tensor_by_name('detection_scores:0')
-                classes = detection_graph.get_tensor_by_name('detection_classes:0')
-                num_detections = detection_graph.get_tensor_by_name('num_detections:0')
-                (boxes, scores, classes, num_detections) = sess.run([boxes, scores, classes, num_detections], feed_dict={image_tensor: image_np_expanded})
-
-                for i in range(len(classes[0])):
-                    if classes[0][i] in labels_mapping.keys():
-                        if scores[0][i] >= threshold:
-                            xmin, ymin, xmax, ymax = _normalize_box(boxes[0][i], width, height)
-                            label = labels_mapping[classes[0][i]]
-                            if label not in result:
-                                result[label] = []
-                            result[label].append([image_num, xmin, ymin, xmax, ymax])
+
+            # Frames are decoded and resized in a background thread
+            frame_count = len(frame_provider)
+            frames = frame_provider.get_frame_range(0, frame_count - 1,
+                frame_provider.Quality.ORIGINAL)
+            frames = prefetch(((image_num, *_prepare_image(image))
+                for image_num, image in frames), size=2 * BATCH_SIZE)
+
+            last_update = 0
+            for batch in _make_batches(frames, BATCH_SIZE):
+                if STATUS_UPDATE_INTERVAL <= time.monotonic() - last_update:
+                    job.refresh()
+                    if 'cancel' in job.meta:
+                        del job.meta['cancel']
+                        job.save()
+                        return None
+                    job.meta['progress'] = batch[0][0] * 100 / frame_count
+                    job.save_meta()
+                    last_update = time.monotonic()
+
+                images = np.stack([image for _, _, image in batch])
+                (boxes, scores, classes) = sess.run(output_tensors, feed_dict={image_tensor: images})
+
+                for idx, (image_num, (width, height), _) in enumerate(batch):
+                    found = (threshold <= scores[idx]) & np.isin(classes[idx], label_ids)
+                    for box, class_id in zip(boxes[idx][found], classes[idx][found]):
+                        xmin, ymin, xmax, ymax = _normalize_box(box, width, height)
+                        label = labels_mapping[class_id]
+                        if label not in result:
+                            result[label] = []
+                        result[label].append([image_num, xmin, ymin, xmax, ymax])
         finally:
             sess.close()
             del sess
@@ -5,8 +5,6 @@ from cvat.settings.base import DATA_ROOT
 import os, fnmatch
 from cvat.apps.engine.frame_provider import FrameProvider
 from cvat.apps.engine.models import Task as TaskModel
-from PIL import Image
-import numpy as np
 
 
 def rectangle_to_cv_bbox(rectangle_points):
@@ -30,20 +28,12 @@ def cv_bbox_to_rectangle(cv_bbox):
 
 
 def make_image_list(jid, start_frame, stop_frame):
-	
 	db_task = TaskModel.objects.get(pk=jid)
-	# Get image list
-	image_list = FrameProvider(db_task.data)
-	image_list = image_list.get_frames(image_list.Quality.ORIGINAL)
-	count = 0
-	for img in image_list:
-		if count >= start_frame and count <= stop_frame:
-			pil_image = Image.open(img[0])
-			opencvImage = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-			yield count, opencvImage
-		count +=1
-		if count > stop_frame:
-			break
+	# Get image list, frames before start_frame aren't decoded
+	frame_provider = FrameProvider(db_task.data)
+	stop_frame = min(stop_frame, len(frame_provider) - 1)
+	return frame_provider.get_frame_range(start_frame, stop_frame,
+		frame_provider.Quality.ORIGINAL, prefetch=True)
 
 class RectangleTracker:
 	trackerTypes = ['BOOSTING', 'MIL', 'KCF', 'CSRT', 'MEDIANFLOW', 'TLD',
@@ -174,6 +174,11 @@ if 'yes' == os.environ.get('OPENVINO_TOOLKIT', 'no') and os.environ.get('REID_MO
 if 'yes' == os.environ.get('WITH_DEXTR', 'no'):
     INSTALLED_APPS += ['cvat.apps.dextr_segmentation']
 
+# Load the DEXTR network when a web server process starts instead of on the
+# first segmentation request. Every process keeps its own copy of the network,
+# see cvat/apps/dextr_segmentation/README.md for the memory cost
+DEXTR_WARM_UP = 'yes' == os.environ.get('DEXTR_WARM_UP', 'yes')
+
 if os.getenv('DJANGO_LOG_VIEWER_HOST'):
     INSTALLED_APPS += ['cvat.apps.log_viewer']
 
@@ -260,6 +265,14 @@ RQ_QUEUES = {
         'PORT': 6379,
         'DB': 0,
         'DEFAULT_TIMEOUT': '24h'
+    },
+    # Jobs which run OpenVINO networks (DEXTR, ReID, auto annotation). Its
+    # worker doesn't fork, so compiled networks are kept between jobs
+    'inference': {
+        'HOST': 'localhost',
+        'PORT': 6379,
+        'DB': 0,
+        'DEFAULT_TIMEOUT': '24h'
     }
 }
 
@@ -455,6 +468,56 @@ DATA_UPLOAD_MAX_NUMBER_FIELDS = None   # this django check disabled
 LOCAL_LOAD_MAX_FILES_COUNT = 500
 LOCAL_LOAD_MAX_FILES_SIZE = 512 * 1024 * 1024  # 512 MB
 
+# Memory budget of the per-process cache of decoded video frames, 0 disables the cache
+DECODED_CHUNK_CACHE_SIZE = int(os.getenv('CVAT_DECODED_CHUNK_CACHE_SIZE',
+    512 * 1024 * 1024))  # 512 MB
+
+# Memory budget of the per-process cache of encoded frames, 0 disables the cache
+ENCODED_FRAME_CACHE_SIZE = int(os.getenv('CVAT_ENCODED_FRAME_CACHE_SIZE',
+    128 * 1024 * 1024))  # 128 MB
+
+# Keep encoded frames of video tasks on disk near the chunks. The cache isn't
+# bounded, it can take several times more space than the chunks of a task
+# (one image per requested frame, quality, scale and format), and it's removed
+# only with the task.
+ENCODED_FRAME_DISK_CACHE = bool(int(os.getenv('CVAT_ENCODED_FRAME_DISK_CACHE', 0)))
+
+# Distance between keyframes in video chunks, it limits the number of frames
+# to be decoded for a random frame access. A keyframe is several times bigger
+# than other frames, so a short interval makes video chunks noticeably bigger
+# (up to a few times for static scenes). 0 keeps the encoder default, which
+# usually means a single keyframe per chunk.
+VIDEO_CHUNK_KEYFRAME_INTERVAL = int(os.getenv('CVAT_VIDEO_CHUNK_KEYFRAME_INTERVAL', 0))
+
+# Downscale factors of additional renditions of compressed chunks which are
+# created for new tasks, e.g. "2,4" gives chunks with 1/2 and 1/4 resolution.
+# Each rendition takes extra disk space and task creation time, none by default
+FRAME_PYRAMID_SCALES = [int(scale) for scale in
+    os.getenv('CVAT_FRAME_PYRAMID_SCALES', '').split(',') if scale.strip()]
+
+# Height of frames in the thumbnail strip of each chunk, 0 disables strips
+THUMBNAIL_STRIP_HEIGHT = int(os.getenv('CVAT_THUMBNAIL_STRIP_HEIGHT', 0))
+
+# Number of asynchronous inference requests which are kept in flight by
+# OpenVINO auto annotation, the batch size is used only if the IR allows it
+AUTO_ANNOTATION_INFER_REQUESTS = int(os.getenv('CVAT_AUTO_ANNOTATION_INFER_REQUESTS', 2))
+AUTO_ANNOTATION_BATCH_SIZE = int(os.getenv('CVAT_AUTO_ANNOTATION_BATCH_SIZE', 1))
+# Number of threads which resize frames for auto annotation
+AUTO_ANNOTATION_PREPROCESS_WORKERS = int(os.getenv('CVAT_AUTO_ANNOTATION_PREPROCESS_WORKERS', 2))
+
+# Number of processes which encode chunks during task creation, 1 means
+# that chunks are encoded one by one in the RQ worker itself
+CHUNK_CREATION_WORKERS = int(os.getenv('CVAT_CHUNK_CREATION_WORKERS', 1))
+
+# Number of frames which are committed together during task creation. A failed
+# task creation is retried from the last committed frames TASK_CREATION_RETRIES
+# times, after that the committed frames and chunks are removed.
+TASK_CREATION_COMMIT_SIZE = int(os.getenv('CVAT_TASK_CREATION_COMMIT_SIZE', 1000))
+TASK_CREATION_RETRIES = int(os.getenv('CVAT_TASK_CREATION_RETRIES', 2))
+
+# Number of remote files which are downloaded simultaneously during task creation
+REMOTE_FILES_DOWNLOAD_WORKERS = int(os.getenv('CVAT_REMOTE_FILES_DOWNLOAD_WORKERS', 8))
+
 datumaro_path_env = os.environ.get("CVAT_DATUMARO_DIR", None)
 if datumaro_path_env is None:
     DATUMARO_PATH = os.path.join(BASE_DIR, 'datumaro')
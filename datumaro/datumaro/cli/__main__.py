@@ -11,6 +11,8 @@ import sys
 
 from . import contexts, commands
 from .util import CliException, add_subparser
+from ..util.image_cache import ImageCache, \
+    DEFAULT_MAX_SIZE as DEFAULT_IMAGE_CACHE_SIZE
 from ..version import VERSION
 
 
@@ -41,6 +43,10 @@ def make_parser():
     parser.add_argument('--loglevel', type=loglevel, default='info',
         help="Logging level (options: %s; default: %s)" % \
             (', '.join(_log_levels.keys()), "%(default)s"))
+    parser.add_argument('--image-cache-size', type=int,
+        help="Memory for loaded images in MB (default: %d; " \
+            "the 'image_cache_size' project option has priority)" % \
+            (DEFAULT_IMAGE_CACHE_SIZE // (1024 * 1024)))
 
     known_contexts = [
         ('project', contexts.project, "Actions on projects (datasets)"),
@@ -148,6 +154,10 @@ def main(args=None):
 
     _LogManager.set_up_logger(args.loglevel)
 
+    if args.image_cache_size is not None:
+        ImageCache.get_instance().set_limits(
+            max_size=args.image_cache_size * 1024 * 1024)
+
     if 'command' not in args:
         parser.print_help()
         return 1
@@ -295,7 +295,10 @@ def build_export_parser(parser_ctor=argparse.ArgumentParser):
             |s|sexport -f voc -- --save-images|n
             |n
             - Export project as a COCO-like dataset in other directory:|n
-            |s|sexport -f coco -o path/I/like/
+            |s|sexport -f coco -o path/I/like/|n
+            |n
+            - Export project as a VOC-like dataset using 4 threads:|n
+            |s|sexport -f voc -j 4 -- --save-images
         """ % ', '.join(builtins),
         formatter_class=MultilineFormatter)
 
@@ -313,6 +316,8 @@ def build_export_parser(parser_ctor=argparse.ArgumentParser):
         help="Directory of the project to operate on (default: current dir)")
     parser.add_argument('-f', '--format', required=True,
         help="Output format")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+        help="Number of dataset items converted in parallel (default: 1)")
     parser.add_argument('extra_args', nargs=argparse.REMAINDER, default=None,
         help="Additional arguments for converter (pass '-- -h' for help)")
     parser.set_defaults(command=export_command)
@@ -340,6 +345,8 @@ def export_command(args):
 
     if hasattr(converter, 'from_cmdline'):
         extra_args = converter.from_cmdline(args.extra_args)
+        if args.jobs:
+            extra_args['jobs'] = args.jobs
         converter = converter(**extra_args)
 
     filter_args = FilterModes.make_filter_args(args.filter_mode)
@@ -47,6 +47,8 @@ PROJECT_SCHEMA = _SchemaBuilder() \
     .add('project_filename', str, internal=True) \
     .add('project_dir', str, internal=True) \
     .add('env_dir', str, internal=True) \
+    \
+    .add('image_cache_size', int) \
     .build()
 
 PROJECT_DEFAULT_CONFIG = Config({
@@ -1,8 +1,35 @@
-
 # Copyright (C) 2019 Intel Corporation
 #
 # SPDX-License-Identifier: MIT
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def map_items(func, items, jobs=1):
+    """
+    Applies func to each of the items in a pool of 'jobs' threads and
+    yields (item, result) pairs in the order of the items. Only a few
+    items are processed ahead of the consumer, so the dataset is not
+    loaded in memory at once.
+    """
+
+    if not jobs or jobs <= 1:
+        for item in items:
+            yield item, func(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for item in items:
+            pending.append((item, executor.submit(func, item)))
+            if 2 * jobs <= len(pending):
+                item, result = pending.popleft()
+                yield item, result.result()
+        while pending:
+            item, result = pending.popleft()
+            yield item, result.result()
+
 class Converter:
     def __init__(self, cmdline_args=None):
         pass
@@ -16,4 +43,4 @@ class Converter:
         if len(cmdline) != 0 and cmdline[0] == '--':
             cmdline = cmdline[1:]
         args = parser.parse_args(cmdline)
-        return vars(args)
\ No newline at end of file
+        return vars(args)
@@ -20,6 +20,10 @@ AnnotationType = Enum('AnnotationType',
         'caption',
     ])
 
+# Coordinates of shapes which differ by no more than this are considered
+# equal when duplicate annotations are looked for
+COORDINATE_PRECISION = 1e-3
+
 class Annotation:
     # pylint: disable=redefined-builtin
     def __init__(self, id=None, type=None, attributes=None, group=None):
@@ -52,6 +56,17 @@ class Annotation:
             (self.attributes == other.attributes) and \
             (self.group == other.group)
 
+    def __hash__(self):
+        # Equal annotations and close ones (see is_close()) have equal hashes
+        return hash((self.id, self.type, self.group))
+
+    def is_close(self, other):
+        """
+        Checks equality of annotations, float coordinates are compared
+        with COORDINATE_PRECISION.
+        """
+        return self == other
+
 class Categories:
     def __init__(self, attributes=None):
         if attributes is None:
@@ -136,6 +151,9 @@ class Label(Annotation):
         return \
             (self.label == other.label)
 
+    def __hash__(self):
+        return hash((super().__hash__(), self.label))
+
 class MaskCategories(Categories):
     def __init__(self, colormap=None, inverse_colormap=None, attributes=None):
         super().__init__(attributes=attributes)
@@ -228,6 +246,9 @@ class Mask(Annotation):
             (self.image is not None and other.image is not None and \
                 np.array_equal(self.image, other.image))
 
+    def __hash__(self):
+        return hash((super().__hash__(), self.label, self.z_order))
+
 class RleMask(Mask):
     # pylint: disable=redefined-builtin
     def __init__(self, rle=None, label=None, z_order=None,
@@ -259,7 +280,15 @@ class RleMask(Mask):
     def __eq__(self, other):
         if not isinstance(other, __class__):
             return super().__eq__(other)
-        return self._rle == other._rle
+        # compares the same fields as Mask.__hash__() does, but avoids decoding
+        return Annotation.__eq__(self, other) and \
+            (self.label == other.label) and \
+            (self.z_order == other.z_order) and \
+            (self._rle == other._rle)
+
+    def __hash__(self):
+        # RLE is not used, because RleMask can be equal to a Mask
+        return super().__hash__()
 
 class CompiledMask:
     @staticmethod
@@ -401,6 +430,26 @@ class _Shape(Annotation):
             (self.z_order == other.z_order) and \
             (self.label == other.label)
 
+    def __hash__(self):
+        # Close points can't be hashed equally, so only their number is used
+        return hash((super().__hash__(), self.z_order, self.label,
+            len(self.points) if self.points is not None else None))
+
+    def is_close(self, other):
+        if not Annotation.__eq__(self, other):
+            return False
+        return \
+            (self._points_close(other)) and \
+            (self.z_order == other.z_order) and \
+            (self.label == other.label)
+
+    def _points_close(self, other):
+        if self.points is None or other.points is None:
+            return self.points is other.points
+        return len(self.points) == len(other.points) and \
+            np.allclose(self.points, other.points,
+                rtol=0, atol=COORDINATE_PRECISION)
+
 class PolyLine(_Shape):
     # pylint: disable=redefined-builtin
     def __init__(self, points=None, label=None, z_order=None,
@@ -553,6 +602,13 @@ class Points(_Shape):
         return \
             (self.visibility == other.visibility)
 
+    def __hash__(self):
+        return hash((super().__hash__(), tuple(self.visibility or [])))
+
+    def is_close(self, other):
+        return super().is_close(other) and \
+            (self.visibility == other.visibility)
+
 class Caption(Annotation):
     # pylint: disable=redefined-builtin
     def __init__(self, caption=None,
@@ -573,6 +629,9 @@ class Caption(Annotation):
         return \
             (self.caption == other.caption)
 
+    def __hash__(self):
+        return hash((super().__hash__(), self.caption))
+
 class DatasetItem:
     # pylint: disable=redefined-builtin
     def __init__(self, id=None, annotations=None,
@@ -10,6 +10,7 @@ from glob import glob
 import importlib
 import inspect
 import logging as log
+import math
 import os
 import os.path as osp
 import shutil
@@ -18,10 +19,11 @@ import sys
 from datumaro.components.config import Config, DEFAULT_FORMAT
 from datumaro.components.config_model import (Model, Source,
     PROJECT_DEFAULT_CONFIG, PROJECT_SCHEMA)
-from datumaro.components.extractor import Extractor
+from datumaro.components.extractor import Extractor, COORDINATE_PRECISION
 from datumaro.components.launcher import InferenceWrapper
 from datumaro.components.dataset_filter import \
     XPathDatasetFilter, XPathAnnotationsFilter
+from datumaro.util.image_cache import ImageCache
 from cvat.apps.dataset_manager.bindings import CvatAnnotationsExtractor
 
 
@@ -154,6 +156,12 @@ class Environment:
 
         self.git = GitWrapper(config)
 
+        # The image cache is shared by all projects of the process,
+        # 0 keeps the current size
+        if 0 < config.image_cache_size:
+            ImageCache.get_instance().set_limits(
+                max_size=config.image_cache_size * 1024 * 1024)
+
         env_dir = osp.join(config.project_dir, config.env_dir)
         builtin = self._load_builtin_plugins()
         custom = self._load_plugins2(osp.join(env_dir, config.plugins_dir))
@@ -454,19 +462,36 @@ class Dataset(Extractor):
 
     @staticmethod
     def _merge_anno(a, b):
+        # Annotations are looked up by hash and by the grid cell of the first
+        # point of a shape, so only the close ones are compared. Cells are
+        # as large as COORDINATE_PRECISION, so a close shape can only be
+        # in the same cell or in a neighbouring one
         from itertools import chain
         merged = []
+        merged_by_key = defaultdict(list)
         for item in chain(a, b):
-            found = False
-            for elem in merged:
-                if elem == item:
-                    found = True
-                    break
-            if not found:
+            item_hash = hash(item)
+            cell = Dataset._get_anno_cell(item)
+            if cell is None:
+                keys = [(item_hash, None)]
+            else:
+                keys = [(item_hash, (cell[0] + dx, cell[1] + dy))
+                    for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+            if not any(elem.is_close(item)
+                    for key in keys for elem in merged_by_key.get(key, [])):
+                merged_by_key[(item_hash, cell)].append(item)
                 merged.append(item)
 
         return merged
 
+    @staticmethod
+    def _get_anno_cell(anno):
+        points = getattr(anno, 'points', None)
+        if points is None or len(points) < 2:
+            return None
+        return (math.floor(points[0] / COORDINATE_PRECISION),
+            math.floor(points[1] / COORDINATE_PRECISION))
+
 class ProjectDataset(Dataset):
     def __init__(self, project):
         super().__init__()
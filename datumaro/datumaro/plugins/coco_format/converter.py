@@ -5,20 +5,20 @@
 
 from enum import Enum
 from itertools import groupby
-import json
 import logging as log
 import os
 import os.path as osp
 
 import pycocotools.mask as mask_utils
 
-from datumaro.components.converter import Converter
+from datumaro.components.converter import Converter, map_items
 from datumaro.components.extractor import (DEFAULT_SUBSET_NAME,
     AnnotationType, Points
 )
 from datumaro.components.cli_plugin import CliPlugin
 from datumaro.util import find, cast
 from datumaro.util.image import save_image
+from datumaro.util.json_stream import JsonArrayBuffer, dump_json
 import datumaro.util.mask_tools as mask_tools
 import datumaro.util.annotation_tools as anno_tools
 
@@ -27,17 +27,40 @@ from .format import CocoTask, CocoPath
 
 SegmentationMode = Enum('SegmentationMode', ['guess', 'polygons', 'mask'])
 
+class _AnnotationBuffer(JsonArrayBuffer):
+    # Annotations without ids get them when the file is written,
+    # after the ids of all other annotations are known
+    _NO_ID_PREFIX = '{"id":null'
+
+    def __init__(self, dir=None): # pylint: disable=redefined-builtin
+        super().__init__(dir=dir)
+        self._min_id = 1
+
+    def append(self, obj):
+        if obj['id']:
+            self._min_id = max(obj['id'], self._min_id)
+        super().append({ 'id': obj['id'], **obj }) # 'id' goes first
+
+    def __iter__(self):
+        next_id = self._min_id
+        for elem in super().__iter__():
+            if elem.startswith(self._NO_ID_PREFIX):
+                elem = '{"id":%d%s' % \
+                    (next_id, elem[len(self._NO_ID_PREFIX):])
+                next_id += 1
+            yield elem
+
 class _TaskConverter:
     def __init__(self, context):
-        self._min_ann_id = 1
         self._context = context
 
+        # Images and annotations are kept on disk until the file is written
         data = {
             'licenses': [],
             'info': {},
             'categories': [],
-            'images': [],
-            'annotations': []
+            'images': JsonArrayBuffer(dir=context._ann_dir),
+            'annotations': _AnnotationBuffer(dir=context._ann_dir),
             }
 
         data['licenses'].append({
@@ -84,17 +107,25 @@ class _TaskConverter:
         raise NotImplementedError()
 
     def save_annotations(self, item):
+        self.add_annotations(self.convert_annotations(item))
+
+    def convert_annotations(self, item):
+        """
+        Returns the list of COCO annotations of the item. Can be called
+        from several threads, the results are added by add_annotations().
+        """
         raise NotImplementedError()
 
-    def write(self, path):
-        next_id = self._min_ann_id
-        for ann in self.annotations:
-            if ann['id'] is None:
-                ann['id'] = next_id
-                next_id += 1
+    def add_annotations(self, annotations):
+        for ann in annotations:
+            self.annotations.append(ann)
 
+    def write(self, path):
         with open(path, 'w') as outfile:
-            json.dump(self._data, outfile)
+            dump_json(self._data, outfile)
+
+        self._data['images'].close()
+        self._data['annotations'].close()
 
     @property
     def annotations(self):
@@ -104,11 +135,9 @@ class _TaskConverter:
     def categories(self):
         return self._data['categories']
 
-    def _get_ann_id(self, annotation):
-        ann_id = annotation.id
-        if ann_id:
-            self._min_ann_id = max(ann_id, self._min_ann_id)
-        return ann_id
+    @staticmethod
+    def _get_ann_id(annotation):
+        return annotation.id
 
 class _ImageInfoConverter(_TaskConverter):
     def is_empty(self):
@@ -117,14 +146,15 @@ class _ImageInfoConverter(_TaskConverter):
     def save_categories(self, dataset):
         pass
 
-    def save_annotations(self, item):
-        pass
+    def convert_annotations(self, item):
+        return []
 
 class _CaptionsConverter(_TaskConverter):
     def save_categories(self, dataset):
         pass
 
-    def save_annotations(self, item):
+    def convert_annotations(self, item):
+        annotations = []
         for ann_idx, ann in enumerate(item.annotations):
             if ann.type != AnnotationType.caption:
                 continue
@@ -142,7 +172,8 @@ class _CaptionsConverter(_TaskConverter):
                     log.warning("Item '%s', ann #%s: failed to convert "
                         "attribute 'score': %e" % (item.id, ann_idx, e))
 
-            self.annotations.append(elem)
+            annotations.append(elem)
+        return annotations
 
 class _InstancesConverter(_TaskConverter):
     def save_categories(self, dataset):
@@ -244,33 +275,36 @@ class _InstancesConverter(_TaskConverter):
     def find_instances(cls, annotations):
         return anno_tools.find_instances(cls.find_instance_anns(annotations))
 
-    def save_annotations(self, item):
+    def convert_annotations(self, item):
         instances = self.find_instances(item.annotations)
         if not instances:
-            return
+            return []
 
         if not item.has_image:
             log.warn("Item '%s': skipping writing instances "
                 "since no image info available" % item.id)
-            return
+            return []
         h, w = item.image.size
         instances = [self.find_instance_parts(i, w, h) for i in instances]
 
         if self._context._crop_covered:
             instances = self.crop_segments(instances, w, h)
 
+        annotations = []
         for instance in instances:
             elem = self.convert_instance(instance, item)
             if elem:
-                self.annotations.append(elem)
+                annotations.append(elem)
+        return annotations
 
     def convert_instance(self, instance, item):
         ann, polygons, mask, bbox = instance
 
         is_crowd = mask is not None
         if is_crowd:
+            # RLE counts are kept in an array until they are written
             segmentation = {
-                'counts': list(int(c) for c in mask['counts']),
+                'counts': mask['counts'],
                 'size': list(int(c) for c in mask['size'])
             }
         else:
@@ -341,21 +375,23 @@ class _KeypointsConverter(_InstancesConverter):
                     })
             self.categories.append(cat)
 
-    def save_annotations(self, item):
+    def convert_annotations(self, item):
         point_annotations = [a for a in item.annotations
             if a.type == AnnotationType.points]
         if not point_annotations:
-            return
+            return []
 
         # Create annotations for solitary keypoints annotations
+        annotations = []
         for points in self.find_solitary_points(item.annotations):
             instance = [points, [], None, points.get_bbox()]
             elem = super().convert_instance(instance, item)
             elem.update(self.convert_points_object(points))
-            self.annotations.append(elem)
+            annotations.append(elem)
 
         # Create annotations for complete instance + keypoints annotations
-        super().save_annotations(item)
+        annotations.extend(super().convert_annotations(item))
+        return annotations
 
     @classmethod
     def find_solitary_points(cls, annotations):
@@ -412,7 +448,8 @@ class _LabelsConverter(_TaskConverter):
                 'supercategory': cast(cat.parent, str, ''),
             })
 
-    def save_annotations(self, item):
+    def convert_annotations(self, item):
+        annotations = []
         for ann in item.annotations:
             if ann.type != AnnotationType.label:
                 continue
@@ -429,7 +466,8 @@ class _LabelsConverter(_TaskConverter):
                     log.warning("Item '%s': failed to convert attribute "
                         "'score': %e" % (item.id, e))
 
-            self.annotations.append(elem)
+            annotations.append(elem)
+        return annotations
 
 class _Converter:
     _TASK_CONVERTER = {
@@ -442,7 +480,7 @@ class _Converter:
 
     def __init__(self, extractor, save_dir,
             tasks=None, save_images=False, segmentation_mode=None,
-            crop_covered=False):
+            crop_covered=False, jobs=1):
         assert tasks is None or isinstance(tasks, (CocoTask, list, str))
         if tasks is None:
             tasks = list(self._TASK_CONVERTER)
@@ -474,6 +512,8 @@ class _Converter:
 
         self._crop_covered = crop_covered
 
+        self._jobs = jobs
+
         self._image_ids = {}
 
     def _make_dirs(self):
@@ -500,6 +540,13 @@ class _Converter:
             self._image_ids[item.id] = image_id
         return image_id
 
+    def _assign_image_ids(self, items):
+        # Image ids depend on the order of items, so they are assigned
+        # before the items are passed to workers
+        for item in items:
+            self._get_image_id(item)
+            yield item
+
     def _save_image(self, item):
         image = item.image.data
         if image is None:
@@ -533,7 +580,8 @@ class _Converter:
             task_converters = self._make_task_converters()
             for task_conv in task_converters.values():
                 task_conv.save_categories(subset)
-            for item in subset:
+
+            def convert_item(item):
                 filename = ''
                 if item.has_image:
                     filename = item.image.path
@@ -542,9 +590,16 @@ class _Converter:
                         filename = self._save_image(item)
                     else:
                         log.debug("Item '%s' has no image info" % item.id)
-                for task_conv in task_converters.values():
+                annotations = [task_conv.convert_annotations(item)
+                    for task_conv in task_converters.values()]
+                return filename, annotations
+
+            for item, (filename, annotations) in map_items(convert_item,
+                    self._assign_image_ids(subset), self._jobs):
+                for task_conv, task_anns in zip(
+                        task_converters.values(), annotations):
                     task_conv.save_image_info(item, filename)
-                    task_conv.save_annotations(item)
+                    task_conv.add_annotations(task_anns)
 
             for task, task_conv in task_converters.items():
                 task_conv.write(osp.join(self._ann_dir,
@@ -584,7 +639,7 @@ class CocoConverter(Converter, CliPlugin):
 
     def __init__(self,
             tasks=None, save_images=False, segmentation_mode=None,
-            crop_covered=False):
+            crop_covered=False, jobs=1):
         super().__init__()
 
         self._options = {
@@ -592,6 +647,7 @@ class CocoConverter(Converter, CliPlugin):
             'save_images': save_images,
             'segmentation_mode': segmentation_mode,
             'crop_covered': crop_covered,
+            'jobs': jobs,
         }
 
     def __call__(self, extractor, save_dir):
@@ -4,9 +4,12 @@
 # SPDX-License-Identifier: MIT
 
 from collections import OrderedDict
+import json
 import logging as log
 import os.path as osp
+import re
 
+import numpy as np
 from pycocotools.coco import COCO
 import pycocotools.mask as mask_utils
 
@@ -16,12 +19,70 @@ from datumaro.components.extractor import (SourceExtractor,
     LabelCategories, PointsCategories
 )
 from datumaro.util.image import Image
+from datumaro.util.json_stream import (load_json_index, read_json,
+    scan_json_object)
 
 from .format import CocoTask, CocoPath
 
 
+_IMAGE_ID = re.compile(rb'"image_id"\s*:\s*(-?\d+)\s*[,}]')
+
+def _find_image_id(ann_data):
+    # Annotations can contain big segmentations, so
+    # only the required field is parsed when possible
+    matches = _IMAGE_ID.findall(ann_data)
+    if len(matches) == 1:
+        return int(matches[0])
+    return json.loads(ann_data).get('image_id')
+
+def _build_index(path):
+    image_offsets = []
+    image_ids = []
+    ann_offsets = []
+    ann_image_ids = []
+    image_idx = {}
+    categories = [-1, 0]
+    with open(path, 'rb') as f:
+        for key, _, offset, data in scan_json_object(f,
+                { 'images', 'annotations' }):
+            if key == 'images':
+                image_id = json.loads(data)['id']
+                if image_id in image_idx:
+                    continue
+                image_idx[image_id] = len(image_ids)
+                image_offsets.append((offset, len(data)))
+                image_ids.append(image_id)
+            elif key == 'annotations':
+                ann_offsets.append((offset, len(data)))
+                ann_image_ids.append(_find_image_id(data))
+            elif key == 'categories':
+                categories = [offset, len(data)]
+
+    ann_image_idx = np.array([image_idx.get(image_id, -1)
+        for image_id in ann_image_ids], dtype=np.int64)
+
+    # Annotations are grouped by images, each group is a slice
+    ann_order = np.argsort(ann_image_idx, kind='stable')
+    ann_offsets = np.array(ann_offsets, dtype=np.int64).reshape((-1, 2))
+    ann_bounds = np.searchsorted(ann_image_idx[ann_order],
+        np.arange(len(image_ids) + 1))
+
+    return {
+        'image_offsets': np.array(image_offsets,
+            dtype=np.int64).reshape((-1, 2)),
+        'image_ids': np.array([str(i) for i in image_ids], dtype=np.str_),
+        'ann_offsets': ann_offsets[ann_order],
+        'ann_bounds': ann_bounds.astype(np.int64),
+        'categories': np.array(categories, dtype=np.int64),
+    }
+
 class _CocoExtractor(SourceExtractor):
-    def __init__(self, path, task, merge_instance_polygons=False):
+    def __init__(self, path, task, merge_instance_polygons=False, lazy=False):
+        """
+        In the lazy mode only an index of the file is kept in memory and
+        items are loaded on access. The index is saved next to the file.
+        """
+
         assert osp.isfile(path), path
 
         subset = osp.splitext(osp.basename(path))[0].rsplit('_', maxsplit=1)[1]
@@ -40,32 +101,80 @@ class _CocoExtractor(SourceExtractor):
 
         self._merge_instance_polygons = merge_instance_polygons
 
-        loader = self._make_subset_loader(path)
+        self._path = path
+        if lazy:
+            self._index = load_json_index(path,
+                lambda: _build_index(path), version=1)
+            self._image_idx = { image_id: idx
+                for idx, image_id in enumerate(self._index['image_ids']) }
+            self._items = None
+            loader = self._make_categories_loader(path,
+                *self._index['categories'])
+        else:
+            self._index = None
+            loader = self._make_subset_loader(path)
         self._load_categories(loader)
-        self._items = self._load_items(loader)
+        if not lazy:
+            self._items = self._load_items(loader)
 
     def categories(self):
         return self._categories
 
     def __iter__(self):
-        for item in self._items.values():
-            yield item
+        if self._items is not None:
+            for item in self._items.values():
+                yield item
+        else:
+            with open(self._path, 'rb') as f:
+                for idx in range(len(self._index['image_offsets'])):
+                    yield self._read_item(f, idx)
 
     def __len__(self):
-        return len(self._items)
+        if self._items is not None:
+            return len(self._items)
+        return len(self._index['image_offsets'])
+
+    def get(self, item_id, subset=None, path=None):
+        if path:
+            raise KeyError("Requested dataset item path is not found")
+        if subset not in { None, self._subset }:
+            raise KeyError("Requested dataset item subset is not found")
+        item_id = str(item_id)
+        if self._items is not None:
+            return self._items[item_id]
+        with open(self._path, 'rb') as f:
+            return self._read_item(f, self._image_idx[item_id])
+
+    def _read_item(self, f, idx):
+        image_info = read_json(f, *self._index['image_offsets'][idx])
+        bounds = self._index['ann_bounds']
+        anns = [read_json(f, *ann_offset) for ann_offset in
+            self._index['ann_offsets'][bounds[idx] : bounds[idx + 1]]]
+        return self._load_item(image_info, anns)
 
     @staticmethod
     def _make_subset_loader(path):
         # COCO API has an 'unclosed file' warning
         coco_api = COCO()
         with open(path, 'r') as f:
-            import json
             dataset = json.load(f)
 
         coco_api.dataset = dataset
         coco_api.createIndex()
         return coco_api
 
+    @staticmethod
+    def _make_categories_loader(path, offset, size):
+        coco_api = COCO()
+        categories = []
+        if 0 <= offset:
+            with open(path, 'rb') as f:
+                categories = read_json(f, offset, size)
+
+        coco_api.dataset = { 'categories': categories }
+        coco_api.createIndex()
+        return coco_api
+
     def _load_categories(self, loader):
         self._categories = {}
 
@@ -110,22 +219,25 @@ class _CocoExtractor(SourceExtractor):
 
         for img_id in loader.getImgIds():
             image_info = loader.loadImgs(img_id)[0]
-            image_path = osp.join(self._images_dir, image_info['file_name'])
-            image_size = (image_info.get('height'), image_info.get('width'))
-            if all(image_size):
-                image_size = (int(image_size[0]), int(image_size[1]))
-            else:
-                image_size = None
-            image = Image(path=image_path, size=image_size)
+            anns = loader.loadAnns(loader.getAnnIds(imgIds=img_id))
+            item = self._load_item(image_info, anns)
+            items[item.id] = item
 
-            anns = loader.getAnnIds(imgIds=img_id)
-            anns = loader.loadAnns(anns)
-            anns = sum((self._load_annotations(a, image_info) for a in anns), [])
+        return items
 
-            items[img_id] = DatasetItem(id=img_id, subset=self._subset,
-                image=image, annotations=anns)
+    def _load_item(self, image_info, anns):
+        image_path = osp.join(self._images_dir, image_info['file_name'])
+        image_size = (image_info.get('height'), image_info.get('width'))
+        if all(image_size):
+            image_size = (int(image_size[0]), int(image_size[1]))
+        else:
+            image_size = None
+        image = Image(path=image_path, size=image_size)
 
-        return items
+        anns = sum((self._load_annotations(a, image_info) for a in anns), [])
+
+        return DatasetItem(id=image_info['id'], subset=self._subset,
+            image=image, annotations=anns)
 
     def _get_label_id(self, ann):
         cat_id = ann.get('category_id')
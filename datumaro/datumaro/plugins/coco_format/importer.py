@@ -8,13 +8,14 @@ from glob import glob
 import logging as log
 import os.path as osp
 
+from datumaro.components.cli_plugin import CliPlugin
 from datumaro.components.extractor import Importer
 from datumaro.util.log_utils import logging_disabled
 
 from .format import CocoTask
 
 
-class CocoImporter(Importer):
+class CocoImporter(Importer, CliPlugin):
     _COCO_EXTRACTORS = {
         CocoTask.instances: 'coco_instances',
         CocoTask.person_keypoints: 'coco_person_keypoints',
@@ -23,6 +24,14 @@ class CocoImporter(Importer):
         CocoTask.image_info: 'coco_image_info',
     }
 
+    @classmethod
+    def build_cmdline_parser(cls, **kwargs):
+        parser = super().build_cmdline_parser(**kwargs)
+        parser.add_argument('--lazy', action='store_true',
+            help="Load items on access using an index of the annotation "
+                "files, which is saved next to them (default: %(default)s)")
+        return parser
+
     @classmethod
     def detect(cls, path):
         with logging_disabled(log.WARN):
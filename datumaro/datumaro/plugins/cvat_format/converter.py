@@ -10,7 +10,7 @@ import os.path as osp
 from xml.sax.saxutils import XMLGenerator
 
 from datumaro.components.cli_plugin import CliPlugin
-from datumaro.components.converter import Converter
+from datumaro.components.converter import Converter, map_items
 from datumaro.components.extractor import DEFAULT_SUBSET_NAME, AnnotationType
 from datumaro.util import cast
 from datumaro.util.image import save_image
@@ -158,8 +158,10 @@ class _SubsetWriter:
         self._writer.open_root()
         self._write_meta()
 
-        for index, item in enumerate(self._extractor):
-            self._write_item(item, index)
+        for index, (item, filename) in enumerate(map_items(
+                self._get_image_filename, self._extractor,
+                self._context._jobs)):
+            self._write_item(item, index, filename)
 
         self._writer.close_root()
 
@@ -179,7 +181,14 @@ class _SubsetWriter:
         save_image(image_path, image)
         return filename
 
-    def _write_item(self, item, index):
+    def _get_image_filename(self, item):
+        if not item.has_image:
+            return None
+        if self._context._save_images:
+            return self._save_image(item)
+        return item.image.filename
+
+    def _write_item(self, item, index, filename):
         image_info = OrderedDict([
             ("id", str(cast(item.id, int, index))),
         ])
@@ -190,9 +199,6 @@ class _SubsetWriter:
                 image_info["width"] = str(w)
                 image_info["height"] = str(h)
 
-            filename = item.image.filename
-            if self._context._save_images:
-                filename = self._save_image(item)
             image_info["name"] = filename
         else:
             log.debug("Item '%s' has no image info" % item.id)
@@ -329,10 +335,11 @@ class _SubsetWriter:
         self._writer.close_tag()
 
 class _Converter:
-    def __init__(self, extractor, save_dir, save_images=False):
+    def __init__(self, extractor, save_dir, save_images=False, jobs=1):
         self._extractor = extractor
         self._save_dir = save_dir
         self._save_images = save_images
+        self._jobs = jobs
 
     def convert(self):
         os.makedirs(self._save_dir, exist_ok=True)
@@ -363,16 +370,17 @@ class _Converter:
 class CvatConverter(Converter, CliPlugin):
     @classmethod
     def build_cmdline_parser(cls, **kwargs):
-        parser = super().__init__(**kwargs)
+        parser = super().build_cmdline_parser(**kwargs)
         parser.add_argument('--save-images', action='store_true',
             help="Save images (default: %(default)s)")
         return parser
 
-    def __init__(self, save_images=False):
+    def __init__(self, save_images=False, jobs=1):
         super().__init__()
 
         self._options = {
             'save_images': save_images,
+            'jobs': jobs,
         }
 
     def __call__(self, extractor, save_dir):
@@ -5,12 +5,11 @@
 
 # pylint: disable=no-self-use
 
-import json
 import numpy as np
 import os
 import os.path as osp
 
-from datumaro.components.converter import Converter
+from datumaro.components.converter import Converter, map_items
 from datumaro.components.extractor import (
     DEFAULT_SUBSET_NAME, Annotation,
     Label, Mask, RleMask, Points, Polygon, PolyLine, Bbox, Caption,
@@ -18,6 +17,7 @@ from datumaro.components.extractor import (
 )
 from datumaro.util import cast
 from datumaro.util.image import save_image
+from datumaro.util.json_stream import JsonArrayBuffer, dump_json
 import pycocotools.mask as mask_utils
 from datumaro.components.cli_plugin import CliPlugin
 
@@ -29,10 +29,11 @@ class _SubsetWriter:
         self._name = name
         self._context = context
 
+        # Items are kept on disk until the file is written
         self._data = {
             'info': {},
             'categories': {},
-            'items': [],
+            'items': JsonArrayBuffer(dir=context._annotations_dir),
         }
 
     @property
@@ -44,6 +45,12 @@ class _SubsetWriter:
         return self._data['items']
 
     def write_item(self, item):
+        self.add_item(self.convert_item(item))
+
+    def add_item(self, item_desc):
+        self.items.append(item_desc)
+
+    def convert_item(self, item):
         annotations = []
         item_desc = {
             'id': item.id,
@@ -60,7 +67,6 @@ class _SubsetWriter:
                 'size': item.image.size,
                 'path': path,
             }
-        self.items.append(item_desc)
 
         for ann in item.annotations:
             if isinstance(ann, Label):
@@ -81,6 +87,8 @@ class _SubsetWriter:
                 raise NotImplementedError()
             annotations.append(converted_ann)
 
+        return item_desc
+
     def write_categories(self, categories):
         for ann_type, desc in categories.items():
             if isinstance(desc, LabelCategories):
@@ -95,7 +103,9 @@ class _SubsetWriter:
 
     def write(self, save_dir):
         with open(osp.join(save_dir, '%s.json' % (self._name)), 'w') as f:
-            json.dump(self._data, f)
+            dump_json(self._data, f)
+
+        self.items.close()
 
     def _convert_annotation(self, obj):
         assert isinstance(obj, Annotation)
@@ -217,10 +227,11 @@ class _SubsetWriter:
         return converted
 
 class _Converter:
-    def __init__(self, extractor, save_dir, save_images=False):
+    def __init__(self, extractor, save_dir, save_images=False, jobs=1):
         self._extractor = extractor
         self._save_dir = save_dir
         self._save_images = save_images
+        self._jobs = jobs
 
     def convert(self):
         os.makedirs(self._save_dir, exist_ok=True)
@@ -242,17 +253,23 @@ class _Converter:
         for subset, writer in subsets.items():
             writer.write_categories(self._extractor.categories())
 
-        for item in self._extractor:
-            subset = item.subset
-            if not subset:
-                subset = DEFAULT_SUBSET_NAME
-            writer = subsets[subset]
+        def convert_item(item):
+            return self._get_writer(subsets, item).convert_item(item)
 
-            writer.write_item(item)
+        for item, item_desc in map_items(convert_item,
+                self._extractor, self._jobs):
+            self._get_writer(subsets, item).add_item(item_desc)
 
         for subset, writer in subsets.items():
             writer.write(annotations_dir)
 
+    @staticmethod
+    def _get_writer(subsets, item):
+        subset = item.subset
+        if not subset:
+            subset = DEFAULT_SUBSET_NAME
+        return subsets[subset]
+
     def _save_image(self, item):
         image = item.image.data
         if image is None:
@@ -276,11 +293,12 @@ class DatumaroConverter(Converter, CliPlugin):
             help="Save images (default: %(default)s)")
         return parser
 
-    def __init__(self, save_images=False):
+    def __init__(self, save_images=False, jobs=1):
         super().__init__()
 
         self._options = {
             'save_images': save_images,
+            'jobs': jobs,
         }
 
     def __call__(self, extractor, save_dir):
@@ -6,17 +6,45 @@
 import json
 import os.path as osp
 
+import numpy as np
+
 from datumaro.components.extractor import (SourceExtractor, DatasetItem,
     AnnotationType, Label, RleMask, Points, Polygon, PolyLine, Bbox, Caption,
     LabelCategories, MaskCategories, PointsCategories
 )
 from datumaro.util.image import Image
+from datumaro.util.json_stream import (load_json_index, read_json,
+    scan_json_object)
 
 from .format import DatumaroPath
 
 
+def _build_index(path):
+    item_offsets = []
+    item_ids = []
+    categories = [-1, 0]
+    with open(path, 'rb') as f:
+        for key, _, offset, data in scan_json_object(f, { 'items' }):
+            if key == 'items':
+                item_offsets.append((offset, len(data)))
+                item_ids.append(str(json.loads(data)['id']))
+            elif key == 'categories':
+                categories = [offset, len(data)]
+
+    return {
+        'item_offsets': np.array(item_offsets,
+            dtype=np.int64).reshape((-1, 2)),
+        'item_ids': np.array(item_ids, dtype=np.str_),
+        'categories': np.array(categories, dtype=np.int64),
+    }
+
 class DatumaroExtractor(SourceExtractor):
-    def __init__(self, path):
+    def __init__(self, path, lazy=False):
+        """
+        In the lazy mode only an index of the file is kept in memory and
+        items are loaded on access. The index is saved next to the file.
+        """
+
         assert osp.isfile(path), path
         rootpath = ''
         if path.endswith(osp.join(DatumaroPath.ANNOTATIONS_DIR, osp.basename(path))):
@@ -28,20 +56,62 @@ class DatumaroExtractor(SourceExtractor):
 
         super().__init__(subset=osp.splitext(osp.basename(path))[0])
 
-        with open(path, 'r') as f:
-            parsed_anns = json.load(f)
-        self._categories = self._load_categories(parsed_anns)
-        self._items = self._load_items(parsed_anns)
+        self._path = path
+        if lazy:
+            self._index = load_json_index(path,
+                lambda: _build_index(path), version=1)
+            self._items = None
+            item_ids = self._index['item_ids']
+
+            offset, size = self._index['categories']
+            parsed_categories = {}
+            if 0 <= offset:
+                with open(path, 'rb') as f:
+                    parsed_categories = read_json(f, offset, size)
+            self._categories = self._load_categories(
+                { 'categories': parsed_categories })
+        else:
+            self._index = None
+            with open(path, 'r') as f:
+                parsed_anns = json.load(f)
+            self._categories = self._load_categories(parsed_anns)
+            self._items = self._load_items(parsed_anns)
+            item_ids = [item.id for item in self._items]
+
+        self._item_idx = {}
+        for idx, item_id in enumerate(item_ids):
+            self._item_idx.setdefault(str(item_id), idx)
 
     def categories(self):
         return self._categories
 
     def __iter__(self):
-        for item in self._items:
-            yield item
+        if self._items is not None:
+            for item in self._items:
+                yield item
+        else:
+            with open(self._path, 'rb') as f:
+                for idx in range(len(self._index['item_offsets'])):
+                    yield self._read_item(f, idx)
 
     def __len__(self):
-        return len(self._items)
+        if self._items is not None:
+            return len(self._items)
+        return len(self._index['item_offsets'])
+
+    def get(self, item_id, subset=None, path=None):
+        if path:
+            raise KeyError("Requested dataset item path is not found")
+        if subset not in { None, self._subset }:
+            raise KeyError("Requested dataset item subset is not found")
+        idx = self._item_idx[str(item_id)]
+        if self._items is not None:
+            return self._items[idx]
+        with open(self._path, 'rb') as f:
+            return self._read_item(f, idx)
+
+    def _read_item(self, f, idx):
+        return self._load_item(read_json(f, *self._index['item_offsets'][idx]))
 
     @staticmethod
     def _load_categories(parsed):
@@ -77,25 +147,20 @@ class DatumaroExtractor(SourceExtractor):
         return categories
 
     def _load_items(self, parsed):
-        items = []
-        for item_desc in parsed['items']:
-            item_id = item_desc['id']
-
-            image = None
-            image_info = item_desc.get('image', {})
-            if image_info:
-                image_path = osp.join(self._images_dir,
-                    image_info.get('path', '')) # relative or absolute fits
-                image = Image(path=image_path, size=image_info.get('size'))
-
-            annotations = self._load_annotations(item_desc)
+        return [self._load_item(item_desc) for item_desc in parsed['items']]
 
-            item = DatasetItem(id=item_id, subset=self._subset,
-                annotations=annotations, image=image)
+    def _load_item(self, item_desc):
+        image = None
+        image_info = item_desc.get('image', {})
+        if image_info:
+            image_path = osp.join(self._images_dir,
+                image_info.get('path', '')) # relative or absolute fits
+            image = Image(path=image_path, size=image_info.get('size'))
 
-            items.append(item)
+        annotations = self._load_annotations(item_desc)
 
-        return items
+        return DatasetItem(id=item_desc['id'], subset=self._subset,
+            annotations=annotations, image=image)
 
     def _load_annotations(self, item):
         parsed = item['annotations']
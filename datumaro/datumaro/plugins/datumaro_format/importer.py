@@ -7,14 +7,23 @@ from glob import glob
 import logging as log
 import os.path as osp
 
+from datumaro.components.cli_plugin import CliPlugin
 from datumaro.components.extractor import Importer
 
 from .format import DatumaroPath
 
 
-class DatumaroImporter(Importer):
+class DatumaroImporter(Importer, CliPlugin):
     EXTRACTOR_NAME = 'datumaro'
 
+    @classmethod
+    def build_cmdline_parser(cls, **kwargs):
+        parser = super().build_cmdline_parser(**kwargs)
+        parser.add_argument('--lazy', action='store_true',
+            help="Load items on access using an index of the annotation "
+                "files, which is saved next to them (default: %(default)s)")
+        return parser
+
     @classmethod
     def detect(cls, path):
         return len(cls.find_subsets(path)) != 0
@@ -8,7 +8,7 @@ import os
 import os.path as osp
 
 from datumaro.components.extractor import DatasetItem, SourceExtractor, Importer
-from datumaro.components.converter import Converter
+from datumaro.components.converter import Converter, map_items
 from datumaro.util.image import save_image
 
 
@@ -72,15 +72,25 @@ class ImageDirExtractor(SourceExtractor):
 
 
 class ImageDirConverter(Converter):
+    def __init__(self, jobs=1):
+        super().__init__()
+
+        self._jobs = jobs
+
     def __call__(self, extractor, save_dir):
         os.makedirs(save_dir, exist_ok=True)
 
-        for item in extractor:
-            if item.has_image and item.image.has_data:
-                filename = item.image.filename
-                if filename:
-                    filename = osp.splitext(filename)[0]
-                else:
-                    filename = item.id
-                filename += '.jpg'
-                save_image(osp.join(save_dir, filename), item.image.data)
\ No newline at end of file
+        for _ in map_items(lambda item: self._save_image(item, save_dir),
+                extractor, self._jobs):
+            pass
+
+    @staticmethod
+    def _save_image(item, save_dir):
+        if item.has_image and item.image.has_data:
+            filename = item.image.filename
+            if filename:
+                filename = osp.splitext(filename)[0]
+            else:
+                filename = item.id
+            filename += '.jpg'
+            save_image(osp.join(save_dir, filename), item.image.data)
\ No newline at end of file
@@ -14,7 +14,7 @@ from datumaro.components.extractor import (SourceExtractor, DEFAULT_SUBSET_NAME,
     DatasetItem, AnnotationType, Mask, Bbox, Polygon, LabelCategories
 )
 from datumaro.components.extractor import Importer
-from datumaro.components.converter import Converter
+from datumaro.components.converter import Converter, map_items
 from datumaro.components.cli_plugin import CliPlugin
 from datumaro.util.image import Image, save_image
 from datumaro.util.mask_tools import load_mask, find_mask_bbox
@@ -295,10 +295,11 @@ class LabelMeConverter(Converter, CliPlugin):
             help="Save images (default: %(default)s)")
         return parser
 
-    def __init__(self, save_images=False):
+    def __init__(self, save_images=False, jobs=1):
         super().__init__()
 
         self._save_images = save_images
+        self._jobs = jobs
 
     def __call__(self, extractor, save_dir):
         self._extractor = extractor
@@ -319,8 +320,9 @@ class LabelMeConverter(Converter, CliPlugin):
             os.makedirs(osp.join(subset_dir, LabelMePath.MASKS_DIR),
                 exist_ok=True)
 
-            for item in subset:
-                self._save_item(item, subset_dir)
+            for _ in map_items(lambda item: self._save_item(item, subset_dir),
+                    subset, self._jobs):
+                pass
 
     def _get_label(self, label_id):
         if label_id is None:
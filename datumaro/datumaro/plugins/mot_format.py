@@ -18,7 +18,7 @@ from datumaro.components.extractor import (SourceExtractor,
     DatasetItem, AnnotationType, Bbox, LabelCategories
 )
 from datumaro.components.extractor import Importer
-from datumaro.components.converter import Converter
+from datumaro.components.converter import Converter, map_items
 from datumaro.components.cli_plugin import CliPlugin
 from datumaro.util import cast
 from datumaro.util.image import Image, save_image
@@ -256,15 +256,16 @@ class MotSeqImporter(Importer):
 class MotSeqGtConverter(Converter, CliPlugin):
     @classmethod
     def build_cmdline_parser(cls, **kwargs):
-        parser = super().__init__(**kwargs)
+        parser = super().build_cmdline_parser(**kwargs)
         parser.add_argument('--save-images', action='store_true',
             help="Save images (default: %(default)s)")
         return parser
 
-    def __init__(self, save_images=False):
+    def __init__(self, save_images=False, jobs=1):
         super().__init__()
 
         self._save_images = save_images
+        self._jobs = jobs
 
     def __call__(self, extractor, save_dir):
         images_dir = osp.join(save_dir, MotPath.IMAGE_DIR)
@@ -277,12 +278,21 @@ class MotSeqGtConverter(Converter, CliPlugin):
         with open(anno_file, 'w', encoding="utf-8") as csv_file:
             writer = csv.DictWriter(csv_file, fieldnames=MotPath.FIELDS)
 
+            def save_item_image(entry):
+                idx, item = entry
+                frame_id = cast(item.id, int, 1 + idx)
+                if self._save_images:
+                    if item.has_image and item.image.has_data:
+                        self._save_image(item, index=frame_id)
+                    else:
+                        log.debug("Item '%s' has no image" % item.id)
+                return frame_id
+
             track_id_mapping = {-1: -1}
-            for idx, item in enumerate(extractor):
+            for (_, item), frame_id in map_items(save_item_image,
+                    enumerate(extractor), self._jobs):
                 log.debug("Converting item '%s'", item.id)
 
-                frame_id = cast(item.id, int, 1 + idx)
-
                 for anno in item.annotations:
                     if anno.type != AnnotationType.bbox:
                         continue
@@ -309,12 +319,6 @@ class MotSeqGtConverter(Converter, CliPlugin):
                         )
                     })
 
-                if self._save_images:
-                    if item.has_image and item.image.has_data:
-                        self._save_image(item, index=frame_id)
-                    else:
-                        log.debug("Item '%s' has no image" % item.id)
-
         labels_file = osp.join(anno_dir, MotPath.LABELS_FILE)
         with open(labels_file, 'w', encoding='utf-8') as f:
             f.write('\n'.join(l.name
@@ -13,7 +13,7 @@ import string
 from datumaro.components.extractor import (AnnotationType, DEFAULT_SUBSET_NAME,
     LabelCategories
 )
-from datumaro.components.converter import Converter
+from datumaro.components.converter import Converter, map_items
 from datumaro.components.cli_plugin import CliPlugin
 from datumaro.util.image import encode_image
 from datumaro.util.mask_tools import merge_masks
@@ -55,11 +55,12 @@ class TfDetectionApiConverter(Converter, CliPlugin):
             help="Include instance masks (default: %(default)s)")
         return parser
 
-    def __init__(self, save_images=False, save_masks=False):
+    def __init__(self, save_images=False, save_masks=False, jobs=1):
         super().__init__()
 
         self._save_images = save_images
         self._save_masks = save_masks
+        self._jobs = jobs
 
     def __call__(self, extractor, save_dir):
         os.makedirs(save_dir, exist_ok=True)
@@ -86,9 +87,10 @@ class TfDetectionApiConverter(Converter, CliPlugin):
                 )
         anno_path = osp.join(save_dir, '%s.tfrecord' % ("default"))
         with tf.io.TFRecordWriter(anno_path) as writer:
-            for item in extractor:
-                tf_example = self._make_tf_example(item)
-                writer.write(tf_example.SerializeToString())
+            for _, tf_example in map_items(
+                    lambda item: self._make_tf_example(item).SerializeToString(),
+                    extractor, self._jobs):
+                writer.write(tf_example)
 
     @staticmethod
     def _find_instances(annotations):
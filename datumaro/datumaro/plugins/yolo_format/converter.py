@@ -8,7 +8,7 @@ import logging as log
 import os
 import os.path as osp
 
-from datumaro.components.converter import Converter
+from datumaro.components.converter import Converter, map_items
 from datumaro.components.extractor import AnnotationType
 from datumaro.components.cli_plugin import CliPlugin
 from datumaro.util.image import save_image
@@ -36,9 +36,10 @@ class YoloConverter(Converter, CliPlugin):
             help="Save images (default: %(default)s)")
         return parser
 
-    def __init__(self, save_images=False):
+    def __init__(self, save_images=False, jobs=1):
         super().__init__()
         self._save_images = save_images
+        self._jobs = jobs
 
     def __call__(self, extractor, save_dir):
         os.makedirs(save_dir, exist_ok=True)
@@ -74,41 +75,12 @@ class YoloConverter(Converter, CliPlugin):
 
             image_paths = OrderedDict()
 
-            for item in subset:
-                if not item.has_image:
-                    raise Exception("Failed to export item '%s': "
-                        "item has no image info" % item.id)
-                height, width = item.image.size
-
-                image_name = item.image.filename
-                item_name = osp.splitext(item.image.filename)[0]
-                if self._save_images:
-                    if item.has_image and item.image.has_data:
-                        if not item_name:
-                            item_name = item.id
-                        image_name = item_name + '.jpg'
-                        save_image(osp.join(subset_dir, image_name),
-                            item.image.data)
-                    else:
-                        log.warning("Item '%s' has no image" % item.id)
+            for item, image_name in map_items(
+                    lambda item: self._save_item(item, subset_dir),
+                    subset, self._jobs):
                 image_paths[item.id] = osp.join('data',
                     osp.basename(subset_dir), image_name)
 
-                yolo_annotation = ''
-                for bbox in item.annotations:
-                    if bbox.type is not AnnotationType.bbox:
-                        continue
-                    if bbox.label is None:
-                        continue
-
-                    yolo_bb = _make_yolo_bbox((width, height), bbox.points)
-                    yolo_bb = ' '.join('%.6f' % p for p in yolo_bb)
-                    yolo_annotation += '%s %s\n' % (bbox.label, yolo_bb)
-
-                annotation_path = osp.join(subset_dir, '%s.txt' % item_name)
-                with open(annotation_path, 'w') as f:
-                    f.write(yolo_annotation)
-
             subset_list_name = '%s.txt' % subset_name
             subset_lists[subset_name] = subset_list_name
             with open(osp.join(save_dir, subset_list_name), 'w') as f:
@@ -122,4 +94,39 @@ class YoloConverter(Converter, CliPlugin):
                     osp.join('data', subset_list_name)))
 
             f.write('names = %s\n' % osp.join('data', 'obj.names'))
-            f.write('backup = backup/\n')
\ No newline at end of file
+            f.write('backup = backup/\n')
+
+    def _save_item(self, item, subset_dir):
+        if not item.has_image:
+            raise Exception("Failed to export item '%s': "
+                "item has no image info" % item.id)
+        height, width = item.image.size
+
+        image_name = item.image.filename
+        item_name = osp.splitext(item.image.filename)[0]
+        if self._save_images:
+            if item.has_image and item.image.has_data:
+                if not item_name:
+                    item_name = item.id
+                image_name = item_name + '.jpg'
+                save_image(osp.join(subset_dir, image_name),
+                    item.image.data)
+            else:
+                log.warning("Item '%s' has no image" % item.id)
+
+        yolo_annotation = ''
+        for bbox in item.annotations:
+            if bbox.type is not AnnotationType.bbox:
+                continue
+            if bbox.label is None:
+                continue
+
+            yolo_bb = _make_yolo_bbox((width, height), bbox.points)
+            yolo_bb = ' '.join('%.6f' % p for p in yolo_bb)
+            yolo_annotation += '%s %s\n' % (bbox.label, yolo_bb)
+
+        annotation_path = osp.join(subset_dir, '%s.txt' % item_name)
+        with open(annotation_path, 'w') as f:
+            f.write(yolo_annotation)
+
+        return image_name
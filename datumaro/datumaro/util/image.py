@@ -7,6 +7,7 @@
 
 from io import BytesIO
 import numpy as np
+import os
 import os.path as osp
 
 from enum import Enum
@@ -139,7 +140,7 @@ class lazy_image:
 
     def __call__(self):
         image = None
-        image_id = hash(self) # path is not necessary hashable or a file path
+        image_id = self._get_cache_key()
 
         cache = self._get_cache(self.cache)
         if cache is not None:
@@ -151,6 +152,17 @@ class lazy_image:
                 cache.push(image_id, image)
         return image
 
+    def _get_cache_key(self):
+        # Images from the same file are shared between instances,
+        # the file version makes changed files to be loaded again
+        if isinstance(self.path, str):
+            try:
+                stat = os.stat(self.path)
+                return (self.path, self.loader, stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                pass
+        return hash(self) # path is not necessary hashable or a file path
+
     @staticmethod
     def _get_cache(cache):
         if cache is None:
@@ -1,11 +1,29 @@
+# Copyright (C) 2019-2020 Intel Corporation
+#
+# SPDX-License-Identifier: MIT
+
 from collections import OrderedDict
+from threading import Lock
+import sys
 
 
 _instance = None
 
-DEFAULT_CAPACITY = 2
+DEFAULT_CAPACITY = None # unlimited number of items
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024 # bytes
+
+def _get_image_size(image):
+    size = getattr(image, 'nbytes', None)
+    if size is None:
+        size = sys.getsizeof(image)
+    return size
 
 class ImageCache:
+    """
+    Thread-safe LRU cache of loaded images, limited by the number of items
+    (capacity) and by their total size in bytes (max_size).
+    """
+
     @staticmethod
     def get_instance():
         global _instance
@@ -13,26 +31,75 @@ class ImageCache:
             _instance = ImageCache()
         return _instance
 
-    def __init__(self, capacity=DEFAULT_CAPACITY):
-        self.capacity = int(capacity)
-        self.items = OrderedDict()
+    def __init__(self, capacity=DEFAULT_CAPACITY, max_size=DEFAULT_MAX_SIZE):
+        self.capacity = int(capacity) if capacity is not None else None
+        self.max_size = int(max_size) if max_size is not None else None
+        self.items = OrderedDict() # item_id: (image, size)
+        self.used_size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = Lock()
+
+    def _is_full(self):
+        return self.capacity is not None and self.capacity < len(self.items) or \
+            self.max_size is not None and self.max_size < self.used_size
+
+    def _evict(self):
+        while self.items and self._is_full():
+            _, (_, size) = self.items.popitem(last=False)
+            self.used_size -= size
+            self.evictions += 1
 
     def push(self, item_id, image):
-        if self.capacity <= len(self.items):
-            self.items.popitem(last=True)
-        self.items[item_id] = image
+        size = _get_image_size(image)
+        with self._lock:
+            self._remove(item_id)
+            if self.max_size is not None and self.max_size < size or \
+                    self.capacity is not None and self.capacity < 1:
+                return
+            self.items[item_id] = (image, size)
+            self.used_size += size
+            self._evict()
 
     def get(self, item_id):
-        default = object()
-        item = self.items.get(item_id, default)
-        if item is default:
-            return None
+        with self._lock:
+            item = self.items.get(item_id)
+            if item is None:
+                self.misses += 1
+                return None
+
+            self.items.move_to_end(item_id)
+            self.hits += 1
+            return item[0]
 
-        self.items.move_to_end(item_id, last=False) # naive splay tree
-        return item
+    def _remove(self, item_id):
+        item = self.items.pop(item_id, None)
+        if item is not None:
+            self.used_size -= item[1]
+
+    def set_limits(self, capacity=DEFAULT_CAPACITY, max_size=DEFAULT_MAX_SIZE):
+        with self._lock:
+            self.capacity = int(capacity) if capacity is not None else None
+            self.max_size = int(max_size) if max_size is not None else None
+            self._evict()
 
     def size(self):
         return len(self.items)
 
+    def get_stats(self):
+        with self._lock:
+            return {
+                'items': len(self.items),
+                'size': self.used_size,
+                'capacity': self.capacity,
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
     def clear(self):
-        self.items.clear()
\ No newline at end of file
+        with self._lock:
+            self.items.clear()
+            self.used_size = 0
@@ -0,0 +1,231 @@
+# Copyright (C) 2020 Intel Corporation
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import logging as log
+import os
+import os.path as osp
+import re
+import tempfile
+
+import numpy as np
+
+
+def _encode_default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    raise TypeError("Object of type '%s' is not JSON serializable" % \
+        type(obj).__name__)
+
+_encoder = json.JSONEncoder(separators=(',', ':'), default=_encode_default)
+
+def encode_json(obj):
+    """
+    Encodes an object in compact JSON. Numpy arrays and numbers
+    are supported.
+    """
+    return _encoder.encode(obj)
+
+def dump_json(obj, f):
+    """
+    Writes a dict to a text file as a JSON object. The values, which are
+    JsonArrayBuffer-s, are copied to the file element by element.
+    """
+
+    f.write('{')
+    for idx, (key, value) in enumerate(obj.items()):
+        if idx != 0:
+            f.write(',')
+        f.write(encode_json(key))
+        f.write(':')
+        if isinstance(value, JsonArrayBuffer):
+            value.write(f)
+        else:
+            f.write(encode_json(value))
+    f.write('}')
+
+class JsonArrayBuffer:
+    """
+    Keeps elements of a JSON array in a temporary file. Elements are
+    encoded when they are added, so the memory use does not depend
+    on the array length.
+    """
+
+    def __init__(self, dir=None): # pylint: disable=redefined-builtin
+        self._file = tempfile.TemporaryFile('w+', encoding='utf-8', dir=dir)
+        self._length = 0
+
+    def append(self, obj):
+        # Encoded JSON has no line breaks, so elements are stored in lines
+        self._file.write(encode_json(obj))
+        self._file.write('\n')
+        self._length += 1
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        """Yields encoded elements"""
+
+        self._file.flush()
+        self._file.seek(0)
+        for line in self._file:
+            yield line[:-1]
+        self._file.seek(0, 2)
+
+    def write(self, f):
+        f.write('[')
+        for idx, elem in enumerate(self):
+            if idx != 0:
+                f.write(',')
+            f.write(elem)
+        f.write(']')
+
+    def close(self):
+        self._file.close()
+
+
+_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*(")?|[\[\]{}:,]')
+# Separators are not needed inside array elements, they are skipped
+_NESTED_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*(")?|[\[\]{}]')
+_SPACES = b' \t\r\n'
+
+def _strip(buf, begin, end):
+    while begin < end and buf[begin] in _SPACES:
+        begin += 1
+    while begin < end and buf[end - 1] in _SPACES:
+        end -= 1
+    return begin, end
+
+def scan_json_object(f, array_keys=(), chunk_size=1024 * 1024):
+    """
+    Scans a JSON object in a binary file without loading the whole file.
+    Yields (key, index, offset, data) for each element of the top-level
+    arrays with the given keys and (key, None, offset, data) for other
+    top-level values. Data is the encoded JSON value.
+    """
+
+    buf = bytearray()
+    base = 0 # file offset of buf[0]
+    pos = 0
+    depth = 0
+    key = None
+    after_colon = False
+    in_array = False
+    index = 0
+    value_start = None # the current element or value is kept in buf
+
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+
+        keep = pos if value_start is None else min(pos, value_start)
+        del buf[:keep]
+        buf += chunk
+        base += keep
+        pos -= keep
+        if value_start is not None:
+            value_start -= keep
+
+        while True:
+            token_re = _TOKEN if depth <= 2 else _NESTED_TOKEN
+            match = token_re.search(buf, pos)
+            if match is None:
+                pos = len(buf)
+                break
+            token = buf[match.start()]
+            if token == ord('"') and match.group(1) is None:
+                pos = match.start() # the string ends in the next chunk
+                break
+            pos = match.end()
+
+            value_begins = after_colon
+            after_colon = False
+
+            if token == ord('"'):
+                if depth == 1 and key is None:
+                    key = json.loads(bytes(buf[match.start():pos]))
+            elif token == ord(':'):
+                if depth == 1:
+                    after_colon = True
+                    value_start = pos
+            elif token == ord(','):
+                if depth == 2 and in_array:
+                    begin, end = _strip(buf, value_start, match.start())
+                    yield key, index, base + begin, bytes(buf[begin:end])
+                    index += 1
+                    value_start = pos
+                elif depth == 1:
+                    if value_start is not None:
+                        begin, end = _strip(buf, value_start, match.start())
+                        yield key, None, base + begin, bytes(buf[begin:end])
+                    key = None
+                    value_start = None
+            elif token in b'[{':
+                if depth == 1 and value_begins and token == ord('[') and \
+                        key in array_keys:
+                    in_array = True
+                    index = 0
+                    value_start = pos
+                depth += 1
+            else:
+                if depth == 2 and in_array:
+                    begin, end = _strip(buf, value_start, match.start())
+                    if begin != end:
+                        yield key, index, base + begin, bytes(buf[begin:end])
+                    in_array = False
+                    value_start = None
+                elif depth == 1 and value_start is not None:
+                    begin, end = _strip(buf, value_start, match.start())
+                    yield key, None, base + begin, bytes(buf[begin:end])
+                    value_start = None
+                depth -= 1
+
+def read_json(f, offset, size):
+    f.seek(offset)
+    return json.loads(f.read(size))
+
+_INDEX_EXT = '.index'
+
+def load_json_index(path, build, version=1):
+    """
+    Returns an index of a JSON file, which is a dict of numpy arrays
+    produced by the build() callback. The index is saved next to the file
+    and is rebuilt when the file or the index version changes.
+    """
+
+    stat = os.stat(path)
+    stamp = np.array([version, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+    index_path = path + _INDEX_EXT
+    if osp.isfile(index_path):
+        try:
+            with np.load(index_path) as index:
+                if np.array_equal(index['stamp'], stamp):
+                    return { k: index[k]
+                        for k in index.files if k != 'stamp' }
+        except Exception as e:
+            log.debug("Failed to load the index of '%s': %s", path, e)
+
+    index = build()
+
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=osp.dirname(index_path),
+            prefix=osp.basename(index_path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, stamp=stamp, **index)
+            os.replace(tmp_path, index_path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+    except OSError as e:
+        log.debug("Failed to save the index of '%s': %s", path, e)
+
+    return index
@@ -107,8 +107,23 @@ def load_mask(path, inverse_colormap=None):
             mask = unpaint_mask(mask, inverse_colormap)
     return mask
 
+class _MaskLoader:
+    # Equal loaders allow to share masks from the same file in the cache
+    def __init__(self, inverse_colormap):
+        self.inverse_colormap = inverse_colormap
+
+    def __call__(self, path):
+        return load_mask(path, self.inverse_colormap)
+
+    def __eq__(self, other):
+        return isinstance(other, _MaskLoader) and \
+            self.inverse_colormap is other.inverse_colormap
+
+    def __hash__(self):
+        return id(self.inverse_colormap)
+
 def lazy_mask(path, inverse_colormap=None):
-    return lazy_image(path, lambda path: load_mask(path, inverse_colormap))
+    return lazy_image(path, _MaskLoader(inverse_colormap))
 
 def mask_to_rle(binary_mask):
     # walk in row-major order as COCO format specifies
@@ -18,6 +18,7 @@ from datumaro.plugins.coco_format.converter import (
     CocoPersonKeypointsConverter,
     CocoLabelsConverter,
 )
+from datumaro.plugins.coco_format.extractor import CocoInstancesExtractor
 from datumaro.plugins.coco_format.importer import CocoImporter
 from datumaro.util.image import save_image, Image
 from datumaro.util.test_utils import TestDir, compare_datasets
@@ -136,6 +137,23 @@ class CocoImporterTest(TestCase):
 
             compare_datasets(self, DstExtractor(), dataset)
 
+    def test_can_import_lazily(self):
+        with TestDir() as test_dir:
+            self.COCO_dataset_generate(test_dir)
+            ann_path = osp.join(test_dir, 'annotations', 'instances_val.json')
+
+            expected = CocoInstancesExtractor(ann_path)
+            actual = CocoInstancesExtractor(ann_path, lazy=True)
+            self.assertTrue(osp.isfile(ann_path + '.index'))
+            compare_datasets(self, expected, actual)
+            self.assertEqual(expected.get(1), actual.get(1))
+
+            index_mtime = os.stat(ann_path + '.index').st_mtime_ns
+            actual = CocoInstancesExtractor(ann_path, lazy=True)
+            compare_datasets(self, expected, actual)
+            self.assertEqual(index_mtime,
+                os.stat(ann_path + '.index').st_mtime_ns)
+
     def test_can_detect(self):
         with TestDir() as test_dir:
             self.COCO_dataset_generate(test_dir)
@@ -657,4 +675,70 @@ class CocoConverterTest(TestCase):
 
         with TestDir() as test_dir:
             self._test_save_and_load(TestExtractor(),
-                CocoConverter(tasks='image_info'), test_dir)
\ No newline at end of file
+                CocoConverter(tasks='image_info'), test_dir)
+
+    def test_can_save_dataset_in_parallel(self):
+        class TestExtractor(Extractor):
+            def __iter__(self):
+                for i in range(20):
+                    yield DatasetItem(id=i, subset='train',
+                        image=np.ones((5, 5, 3)) * i,
+                        annotations=[
+                            Label(i % 10),
+                            Caption('caption %s' % i),
+                            Bbox(0, 1, 2, 2, label=i % 10, group=1),
+                            Polygon([0, 1, 2, 1, 2, 3, 0, 3], label=i % 10,
+                                group=1),
+                            Mask(np.eye(5), label=(i + 1) % 10, id=100 + i),
+                        ])
+
+            def categories(self):
+                label_cat = LabelCategories()
+                for label in range(10):
+                    label_cat.add('label_' + str(label))
+                return { AnnotationType.label: label_cat }
+
+        with TestDir() as test_dir:
+            serial_dir = osp.join(test_dir, 'serial')
+            parallel_dir = osp.join(test_dir, 'parallel')
+            CocoConverter(save_images=True)(TestExtractor(), serial_dir)
+            CocoConverter(save_images=True, jobs=4)(TestExtractor(),
+                parallel_dir)
+
+            ann_dir = 'annotations'
+            for ann_file in os.listdir(osp.join(serial_dir, ann_dir)):
+                with open(osp.join(serial_dir, ann_dir, ann_file)) as f:
+                    expected = f.read()
+                with open(osp.join(parallel_dir, ann_dir, ann_file)) as f:
+                    actual = f.read().replace(parallel_dir, serial_dir)
+                self.assertEqual(expected, actual, ann_file)
+            self.assertEqual(
+                sorted(os.listdir(osp.join(serial_dir, 'images'))),
+                sorted(os.listdir(osp.join(parallel_dir, 'images'))))
+
+    def test_can_generate_annotation_ids(self):
+        class TestExtractor(Extractor):
+            def __iter__(self):
+                return iter([
+                    DatasetItem(id=1, annotations=[
+                        Label(2), Label(3),
+                    ]),
+                    DatasetItem(id=2, annotations=[
+                        Label(3),
+                    ]),
+                ])
+
+            def categories(self):
+                label_cat = LabelCategories()
+                for label in range(10):
+                    label_cat.add('label_' + str(label))
+                return { AnnotationType.label: label_cat }
+
+        with TestDir() as test_dir:
+            CocoLabelsConverter()(TestExtractor(), test_dir)
+
+            with open(osp.join(test_dir,
+                    'annotations', 'labels_default.json')) as f:
+                annotations = json.load(f)['annotations']
+            self.assertEqual([1, 2, 3], [a['id'] for a in annotations])
+            self.assertEqual([1, 1, 2], [a['image_id'] for a in annotations])
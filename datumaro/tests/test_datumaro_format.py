@@ -1,4 +1,5 @@
 import numpy as np
+import os.path as osp
 
 from unittest import TestCase
 
@@ -8,11 +9,12 @@ from datumaro.components.extractor import (Extractor, DatasetItem,
     PolyLine, Bbox, Caption,
     LabelCategories, MaskCategories, PointsCategories
 )
+from datumaro.plugins.datumaro_format.extractor import DatumaroExtractor
 from datumaro.plugins.datumaro_format.importer import DatumaroImporter
 from datumaro.plugins.datumaro_format.converter import DatumaroConverter
 from datumaro.util.mask_tools import generate_colormap
 from datumaro.util.image import Image
-from datumaro.util.test_utils import TestDir, item_to_str
+from datumaro.util.test_utils import TestDir, compare_datasets, item_to_str
 
 
 class DatumaroConverterTest(TestCase):
@@ -101,6 +103,19 @@ class DatumaroConverterTest(TestCase):
                 source_dataset.categories(),
                 parsed_dataset.categories())
 
+    def test_can_load_lazily(self):
+        with TestDir() as test_dir:
+            DatumaroConverter()(self.TestExtractor(), save_dir=test_dir)
+
+            for subset in ['train', 'val', 'test']:
+                ann_path = osp.join(test_dir, 'annotations', subset + '.json')
+                expected = DatumaroExtractor(ann_path)
+                actual = DatumaroExtractor(ann_path, lazy=True)
+                self.assertTrue(osp.isfile(ann_path + '.index'))
+                compare_datasets(self, expected, actual)
+
+            self.assertEqual(expected.get(42), actual.get(42))
+
     def test_can_detect(self):
         with TestDir() as test_dir:
             DatumaroConverter()(self.TestExtractor(), save_dir=test_dir)
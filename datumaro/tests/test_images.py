@@ -38,6 +38,43 @@ class ImageCacheTest(TestCase):
         matches = sum([a is b for a, b in zip(first_request, second_request)])
         self.assertEqual(matches, len(first_request) - 1)
 
+    def test_cache_evicts_least_recently_used(self):
+        cache = ImageCache(capacity=2)
+        cache.push('a', 1)
+        cache.push('b', 2)
+        cache.get('a')
+        cache.push('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+
+    def test_cache_is_limited_by_size(self):
+        image = np.zeros((10, 10), dtype=np.uint8)
+        cache = ImageCache(max_size=2 * image.nbytes)
+
+        for i in range(3):
+            cache.push(i, image.copy())
+        cache.push('big', np.zeros((30, 10), dtype=np.uint8))
+
+        self.assertEqual(cache.size(), 2)
+        self.assertEqual(cache.get_stats()['size'], 2 * image.nbytes)
+        self.assertEqual(cache.get('big'), None)
+
+    def test_images_from_the_same_file_are_shared(self):
+        with TestDir() as test_dir:
+            image_path = osp.join(test_dir, 'image.jpg')
+            save_image(image_path, np.ones((10, 10, 3)))
+            cache = ImageCache()
+
+            first = lazy_image(image_path, cache=cache)()
+            second = lazy_image(image_path, cache=cache)()
+
+            self.assertTrue(first is second)
+            self.assertEqual(cache.get_stats()['misses'], 1)
+            self.assertEqual(cache.get_stats()['hits'], 1)
+
     def test_global_cache_is_accessible(self):
         loader = lazy_image(None, loader=lambda p: object())
 
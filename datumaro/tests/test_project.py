@@ -9,7 +9,7 @@ from datumaro.components.config_model import Source, Model
 from datumaro.components.launcher import Launcher, InferenceWrapper
 from datumaro.components.converter import Converter
 from datumaro.components.extractor import (Extractor, DatasetItem,
-    Label, Mask, Points, Polygon, PolyLine, Bbox, Caption,
+    Label, Mask, RleMask, Points, Polygon, PolyLine, Bbox, Caption,
 )
 from datumaro.util.image import Image
 from datumaro.components.config import Config, DefaultConfig, SchemaBuilder
@@ -531,6 +531,74 @@ class DatasetTest(TestCase):
 
         compare_datasets(self, DstExtractor(), dataset)
 
+    def test_can_merge_close_annotations(self):
+        class SrcExtractor1(Extractor):
+            def __iter__(self):
+                return iter([
+                    DatasetItem(id=1, subset='train', annotations=[
+                        Bbox(1, 2, 3, 4),
+                        Polygon([0, 0, 1, 1, 2, 2]),
+                        Label(4),
+                        # rounding to the precision grid separates these
+                        Bbox(10.0004999, 2, 3, 4, label=1),
+                        Bbox(20.0009999, 2, 3, 4, label=2),
+                    ]),
+                    DatasetItem(id=1, subset='val', annotations=[
+                        Label(4),
+                    ]),
+                ])
+
+        class SrcExtractor2(Extractor):
+            def __iter__(self):
+                return iter([
+                    DatasetItem(id=1, subset='train', annotations=[
+                        Bbox(1.00001, 2, 3, 4),
+                        Polygon([0, 0, 1, 1, 2, 2.1]),
+                        Label(4),
+                        Bbox(10.0005001, 2, 3, 4, label=1),
+                        Bbox(20.0010001, 2, 3, 4, label=2),
+                    ]),
+                    DatasetItem(id=1, subset='val', annotations=[
+                        Label(5),
+                    ]),
+                ])
+
+        dataset = Dataset.from_extractors(None, SrcExtractor1(), SrcExtractor2())
+
+        self.assertEqual([
+                Bbox(1, 2, 3, 4),
+                Polygon([0, 0, 1, 1, 2, 2]),
+                Label(4),
+                Bbox(10.0004999, 2, 3, 4, label=1),
+                Bbox(20.0009999, 2, 3, 4, label=2),
+                Polygon([0, 0, 1, 1, 2, 2.1]),
+            ], dataset.get('1', subset='train').annotations)
+        self.assertEqual([Label(4), Label(5)],
+            dataset.get('1', subset='val').annotations)
+
+    def test_can_merge_rle_masks(self):
+        from pycocotools import mask as mask_utils
+        rle = mask_utils.encode(np.asfortranarray(np.eye(3, dtype=np.uint8)))
+
+        class SrcExtractor(Extractor):
+            def __init__(self, label):
+                super().__init__()
+                self._label = label
+
+            def __iter__(self):
+                return iter([
+                    DatasetItem(id=1, annotations=[
+                        RleMask(rle=rle, label=self._label),
+                    ]),
+                ])
+
+        # equal masks are merged, masks with different labels are kept
+        dataset = Dataset.from_extractors(None,
+            SrcExtractor(0), SrcExtractor(0), SrcExtractor(1))
+
+        self.assertEqual([RleMask(rle=rle, label=0), RleMask(rle=rle, label=1)],
+            dataset.get('1').annotations)
+
 
 class DatasetItemTest(TestCase):
     def test_ctor_requires_id(self):
@@ -746,6 +746,35 @@ class VocConverterTest(TestCase):
             self._test_save_and_load(TestExtractor(),
                 VocConverter(label_map='voc'), test_dir)
 
+    def test_can_save_dataset_in_parallel(self):
+        class TestExtractor(TestExtractorBase):
+            def __iter__(self):
+                for i in range(20):
+                    yield DatasetItem(id=i, subset='a',
+                        image=np.ones((5, 5, 3)) * i,
+                        annotations=[
+                            Label(i % 10),
+                            Bbox(1, 2, 2, 2, label=i % 10),
+                            Mask(np.eye(5), label=(i + 1) % 10),
+                        ])
+
+        with TestDir() as test_dir:
+            serial_dir = osp.join(test_dir, 'serial')
+            parallel_dir = osp.join(test_dir, 'parallel')
+            VocConverter(label_map='voc', save_images=True)(
+                TestExtractor(), serial_dir)
+            VocConverter(label_map='voc', save_images=True, jobs=4)(
+                TestExtractor(), parallel_dir)
+
+            for root, _, files in os.walk(serial_dir):
+                for filename in files:
+                    path = osp.relpath(osp.join(root, filename), serial_dir)
+                    with open(osp.join(serial_dir, path), 'rb') as f:
+                        expected = f.read()
+                    with open(osp.join(parallel_dir, path), 'rb') as f:
+                        actual = f.read()
+                    self.assertEqual(expected, actual, path)
+
 class VocImportTest(TestCase):
     def test_can_import(self):
         with TestDir() as test_dir: